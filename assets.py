@@ -0,0 +1,228 @@
+import pygame
+from os import walk, cpu_count
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from settings import *
+from support import natural_key
+from atlas import Atlas
+
+COLORKEY = (255, 0, 255)
+
+def get_alpha_kind(surf):
+	"""'opaque', 'colorkey' (every pixel fully visible or invisible) or 'alpha'"""
+	if not surf.get_flags() & pygame.SRCALPHA:
+		return 'colorkey' if surf.get_colorkey() else 'opaque'
+
+	# masks set the pixels with an alpha above the threshold
+	visible = pygame.mask.from_surface(surf, 0).count()
+	opaque = pygame.mask.from_surface(surf, 254).count()
+	if opaque == surf.get_width() * surf.get_height():
+		return 'opaque'
+	return 'colorkey' if visible == opaque else 'alpha'
+
+class AssetManager:
+	"""
+	Loads every image file once, converted to the display format, and hands out
+	the asset groups of ASSET_GROUPS. Groups are reference counted; files are
+	dropped from the cache once no acquired group uses them anymore.
+	Files packed into an atlas sheet are cut from the sheet instead (the sheet
+	keeps per pixel alpha, the format is picked for each frame), and files in
+	the asset bundle are read from its raw pixels without decoding.
+	"""
+	def __init__(self, bundle = None):
+		self.atlas = Atlas()
+		self.sheet_paths = {frame[0] for frame in self.atlas.frames.values()}
+		self.bundle = bundle
+		self.surfaces = {} # path -> Surface
+		self.formats = {} # path -> format picked by convert_image
+		self.file_refs = {} # path -> number of loaded groups using the file
+
+		self.groups = {} # name -> asset dict
+		self.group_refs = {}
+		self.group_files = {}
+
+	# files
+	def decode_image(self, path):
+		surf = self.bundle.image(path) if self.bundle else None
+		if surf is None:
+			surf = pygame.image.load(path)
+		return surf
+
+	def convert_image(self, path, surf):
+		"""
+		Convert a decoded image to the cheapest display format that keeps its look:
+		convert() for opaque images, a colorkey for images with binary transparency
+		(RLE encoded unless the path is in NO_RLE_PATHS) and per pixel alpha otherwise
+		"""
+		kind = get_alpha_kind(surf)
+		if kind == 'opaque':
+			converted = surf.convert()
+		elif kind == 'colorkey':
+			converted = pygame.Surface(surf.get_size()).convert()
+			converted.fill(COLORKEY)
+			converted.blit(surf, (0, 0))
+			converted.set_colorkey(COLORKEY)
+
+			# fall back to alpha if the image itself uses the colorkey colour
+			if pygame.mask.from_surface(converted).count() != pygame.mask.from_surface(surf).count():
+				kind, converted = 'alpha', surf.convert_alpha()
+			elif not path.startswith(NO_RLE_PATHS):
+				kind = 'colorkey rle'
+				converted.set_colorkey(COLORKEY, pygame.RLEACCEL)
+		else:
+			# frames cut from an atlas sheet already are in the sheet's alpha format
+			converted = surf if surf.get_parent() else surf.convert_alpha()
+
+		self.formats[path] = kind
+		return converted
+
+	def load_image(self, path):
+		return self.convert_file(path, self.decode_image(path))
+
+	def convert_file(self, path, surf):
+		if path in self.sheet_paths:
+			return surf.convert_alpha()
+		return self.convert_image(path, surf)
+
+	def preload(self, paths, progress = None):
+		"""
+		Decode image files on a thread pool (SDL_image releases the GIL while decoding),
+		then convert them to the display format on the main thread in one batch
+
+		Args:
+			paths (iterable): Image files to load
+			progress (callable): Called with (loaded, total) after each decoded file
+		"""
+		paths = [path for path in dict.fromkeys(paths) if path not in self.surfaces]
+		if not paths:
+			return
+
+		decoded = {}
+		with ThreadPoolExecutor(max_workers = cpu_count()) as executor:
+			futures = {executor.submit(self.decode_image, path): path for path in paths}
+			for loaded, future in enumerate(as_completed(futures), 1):
+				decoded[futures[future]] = future.result()
+				if progress:
+					progress(loaded, len(paths))
+
+		for path in paths:
+			self.surfaces[path] = self.convert_file(path, decoded[path])
+
+	def sound(self, path):
+		sound = self.bundle.sound(path) if self.bundle else None
+		return sound if sound is not None else pygame.mixer.Sound(path)
+
+	def image(self, path, files = None):
+		frame = self.atlas.get(path)
+		if frame:
+			sheet_path, rect = frame
+			sheet = self.image(sheet_path, files)
+
+		if path not in self.surfaces:
+			self.surfaces[path] = self.convert_image(path, sheet.subsurface(rect)) if frame else self.load_image(path)
+		if files is not None:
+			files.add(path)
+		return self.surfaces[path]
+
+	def folder_files(self, path):
+		for folder_name, sub_folders, img_files in walk(path):
+			return sorted(img_files, key = natural_key)
+		return []
+
+	def sub_folders(self, path):
+		for folder_name, sub_folders, img_files in walk(path):
+			return sub_folders
+		return []
+
+	def get_spec_paths(self, spec):
+		"""Files that have to be decoded for a spec (the sheet for files packed into the atlas)"""
+		if isinstance(spec, dict):
+			for value in spec.values():
+				yield from self.get_spec_paths(value)
+			return
+
+		kind, path = spec
+		match kind:
+			case 'image':
+				paths = [path]
+			case 'folder' | 'folder dict':
+				paths = [f'{path}/{image_name}' for image_name in self.folder_files(path)]
+			case 'subfolders':
+				for folder in self.sub_folders(path):
+					yield from self.get_spec_paths(('folder', f'{path}/{folder}'))
+				return
+			case _:
+				return
+
+		for path in paths:
+			frame = self.atlas.get(path)
+			yield frame[0] if frame else path
+
+	def load_spec(self, spec, files):
+		if isinstance(spec, dict):
+			return {key: self.load_spec(value, files) for key, value in spec.items()}
+
+		kind, path = spec
+		match kind:
+			case 'image':
+				return self.image(path, files)
+			case 'folder':
+				return [self.image(f'{path}/{image_name}', files) for image_name in self.folder_files(path)]
+			case 'folder dict':
+				return {image_name.split('.')[0]: self.image(f'{path}/{image_name}', files) for image_name in self.folder_files(path)}
+			case 'subfolders':
+				return {folder: self.load_spec(('folder', f'{path}/{folder}'), files) for folder in self.sub_folders(path)}
+			case 'sound':
+				return self.sound(path)
+
+	# groups
+	def acquire(self, name, progress = None):
+		"""Load a group of ASSET_GROUPS on first use and return its asset dict"""
+		if name not in self.groups:
+			self.preload(self.get_spec_paths(ASSET_GROUPS[name]), progress)
+			files = set()
+			self.groups[name] = self.load_spec(ASSET_GROUPS[name], files)
+			self.group_files[name] = files
+			self.group_refs[name] = 0
+			for path in files:
+				self.file_refs[path] = self.file_refs.get(path, 0) + 1
+
+		self.group_refs[name] += 1
+		return self.groups[name]
+
+	def release(self, name):
+		"""Give a group back, its files are unloaded when nothing else references them"""
+		if name not in self.groups:
+			return
+
+		self.group_refs[name] -= 1
+		if self.group_refs[name] > 0:
+			return
+
+		for path in self.group_files.pop(name):
+			self.file_refs[path] -= 1
+			if self.file_refs[path] <= 0:
+				del self.file_refs[path]
+				self.surfaces.pop(path, None)
+				self.formats.pop(path, None)
+		del self.groups[name]
+		del self.group_refs[name]
+
+	# report
+	def get_format_report(self):
+		"""Lines with the display format picked for each loaded image file"""
+		lines = [f'{kind:<12} {path}' for path, kind in sorted(self.formats.items())]
+		counts = {}
+		for kind in self.formats.values():
+			counts[kind] = counts.get(kind, 0) + 1
+		lines.append(', '.join(f'{kind}: {count}' for kind, count in sorted(counts.items())))
+		return lines
+
+if __name__ == '__main__':
+	# python assets.py prints the format of every image of ASSET_GROUPS
+	pygame.init()
+	pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+	asset_manager = AssetManager()
+	for name in ASSET_GROUPS:
+		asset_manager.acquire(name)
+	print('\n'.join(asset_manager.get_format_report()))
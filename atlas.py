@@ -0,0 +1,87 @@
+import pygame
+import json
+import os
+from os import walk
+
+from settings import *
+from support import natural_key
+
+class Atlas:
+	"""Index of the sheets written by build_atlases, maps image files to their rect on a sheet"""
+	def __init__(self, directory = ATLAS_DIRECTORY):
+		self.frames = {}
+
+		index_path = os.path.join(directory, 'index.json')
+		if os.path.exists(index_path):
+			try:
+				with open(index_path, 'r') as f:
+					self.frames = json.load(f)['frames']
+			except Exception as e:
+				print(f"Error reading atlas index: {e}")
+
+	def get(self, path):
+		"""
+		Find an image file on the sheets
+
+		Args:
+			path (str): Path of the original image file
+
+		Returns:
+			tuple or None: (sheet path, Rect), None if the file is not packed
+			or was modified after the atlas was built
+		"""
+		frame = self.frames.get(path)
+		if not frame:
+			return None
+
+		sheet_path, rect, mtime = frame
+		if os.path.exists(path) and os.stat(path).st_mtime_ns != mtime:
+			return None
+		return sheet_path, pygame.Rect(rect)
+
+def pack(sizes, width):
+	"""Shelf packing of (w, h) sizes into a sheet of the given width, returns positions and the sheet height"""
+	positions = [None] * len(sizes)
+	x = y = shelf_height = 0
+	for index in sorted(range(len(sizes)), key = lambda index: -sizes[index][1]):
+		w, h = sizes[index]
+		if x + w > width:
+			x = 0
+			y += shelf_height
+			shelf_height = 0
+		positions[index] = (x, y)
+		x += w
+		shelf_height = max(shelf_height, h)
+	return positions, y + shelf_height
+
+def build_atlases(directory = ATLAS_DIRECTORY):
+	"""Pack the animation folders of ATLAS_SOURCES into one sheet each plus an index of frame rects"""
+	os.makedirs(directory, exist_ok = True)
+	frames = {}
+
+	for name, root in ATLAS_SOURCES.items():
+		paths = []
+		for folder_name, sub_folders, img_files in walk(root):
+			folder_name = folder_name.replace(os.sep, '/')
+			for image_name in sorted(img_files, key = natural_key):
+				paths.append(f'{folder_name}/{image_name}')
+
+		images = [pygame.image.load(path) for path in paths]
+		width = max([ATLAS_WIDTH] + [image.get_width() for image in images])
+		positions, height = pack([image.get_size() for image in images], width)
+
+		sheet = pygame.Surface((width, height), pygame.SRCALPHA)
+		sheet.fill((0, 0, 0, 0))
+		sheet_path = f'{directory}/{name}.png'
+		for path, image, pos in zip(paths, images, positions):
+			# copy the pixels as they are instead of blending them onto the empty sheet
+			sheet.blit(image, pos, special_flags = pygame.BLEND_RGBA_MAX)
+			frames[path] = [sheet_path, [pos[0], pos[1], *image.get_size()], os.stat(path).st_mtime_ns]
+		pygame.image.save(sheet, sheet_path)
+		print(f"Packed {len(paths)} frames into {sheet_path} ({width}x{height})")
+
+	with open(os.path.join(directory, 'index.json'), 'w') as f:
+		json.dump({'frames': frames}, f)
+
+if __name__ == '__main__':
+	build_atlases()
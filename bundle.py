@@ -0,0 +1,169 @@
+import pygame
+import hashlib
+import json
+import mmap
+import os
+import struct
+from os import walk
+
+from settings import *
+
+BUNDLE_MAGIC = b'PYRB'
+BUNDLE_VERSION = 1
+FOOTER = struct.Struct('<QI') # header offset, header length
+
+def to_bytes(surf):
+	# pygame.image.tostring is deprecated since pygame 2.1.3
+	return getattr(pygame.image, 'tobytes', pygame.image.tostring)(surf, 'RGBA')
+
+class AssetBundle:
+	"""
+	Pre-decoded assets in a single file: raw RGBA pixels of every image under
+	graphics/ and the raw samples of BUNDLE_SOUNDS. The file is memory-mapped
+	and surfaces are created with pygame.image.frombuffer, so nothing is decoded
+	at startup. The mtime and size of every source file (the manifest) and a
+	hash of their contents are stored with the bundle: the files are only
+	hashed when the manifest differs, and the bundle is baked again when the
+	hash does not match anymore.
+	"""
+	def __init__(self, path = ASSET_BUNDLE):
+		self.path = path
+		self.entries = {}
+		self.file = None
+		self.data = None
+
+		images, sounds = self.get_sources()
+		try:
+			if not self.is_fresh(images, sounds):
+				self.bake(images, sounds)
+			self.open()
+		except Exception as e:
+			print(f"Asset bundle not available: {e}")
+			self.close()
+
+	# sources
+	def get_sources(self):
+		images = []
+		for folder_name, sub_folders, img_files in walk('graphics'):
+			folder_name = folder_name.replace(os.sep, '/')
+			images.extend(f'{folder_name}/{image_name}' for image_name in img_files if image_name.endswith('.png'))
+		sounds = BUNDLE_SOUNDS if pygame.mixer.get_init() else []
+		return sorted(images), list(sounds)
+
+	def get_manifest(self, images, sounds):
+		files = {}
+		for path in images + sounds:
+			stat = os.stat(path)
+			files[path] = [stat.st_mtime_ns, stat.st_size]
+		return {'mixer': str(pygame.mixer.get_init()), 'files': files}
+
+	def get_source_hash(self, images, sounds):
+		source_hash = hashlib.blake2b(digest_size = 16)
+		source_hash.update(f'{BUNDLE_VERSION} {pygame.mixer.get_init()}'.encode())
+		for path in images + sounds:
+			source_hash.update(path.encode())
+			with open(path, 'rb') as f:
+				source_hash.update(f.read())
+		return source_hash.hexdigest()
+
+	def is_fresh(self, images, sounds):
+		"""True if the bundle holds the current sources, the files are only read if their stats changed"""
+		found = self.read_header()
+		if found is None:
+			return False
+		header_offset, header = found
+		if header.get('version') != BUNDLE_VERSION:
+			return False
+
+		manifest = self.get_manifest(images, sounds)
+		if header.get('manifest') == manifest:
+			return True
+		if header.get('hash') != self.get_source_hash(images, sounds):
+			return False
+
+		# same contents with new mtimes (e.g. a fresh checkout): only the header is rewritten
+		header['manifest'] = manifest
+		with open(self.path, 'r+b') as f:
+			self.write_header(f, header_offset, header)
+		return True
+
+	# file
+	def read_header(self):
+		"""(header offset, header) of the bundle file, None if it is missing or broken"""
+		try:
+			with open(self.path, 'rb') as f:
+				if f.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+					return None
+				f.seek(-FOOTER.size, os.SEEK_END)
+				header_offset, header_length = FOOTER.unpack(f.read(FOOTER.size))
+				f.seek(header_offset)
+				return header_offset, json.loads(f.read(header_length))
+		except (OSError, ValueError, struct.error):
+			return None
+
+	def write_header(self, f, header_offset, header):
+		data = json.dumps(header).encode()
+		f.seek(header_offset)
+		f.write(data)
+		f.write(FOOTER.pack(header_offset, len(data)))
+		f.truncate()
+
+	def bake(self, images, sounds):
+		"""Decode all sources once and write them to the bundle (magic, data, header, footer)"""
+		header = {'version': BUNDLE_VERSION, 'hash': self.get_source_hash(images, sounds), 'manifest': self.get_manifest(images, sounds)}
+		entries = {}
+		temp_path = f'{self.path}.tmp'
+		with open(temp_path, 'wb') as f:
+			f.write(BUNDLE_MAGIC)
+			offset = f.tell()
+
+			for path in images:
+				surf = pygame.image.load(path)
+				data = to_bytes(surf)
+				entries[path] = ['image', offset, len(data), *surf.get_size()]
+				offset += f.write(data)
+
+			for path in sounds:
+				data = pygame.mixer.Sound(path).get_raw()
+				entries[path] = ['sound', offset, len(data), 0, 0]
+				offset += f.write(data)
+
+			header['entries'] = entries
+			self.write_header(f, offset, header)
+		os.replace(temp_path, self.path)
+		print(f"Baked {len(entries)} assets into {self.path}")
+
+	def open(self):
+		"""Map the bundle checked by is_fresh"""
+		header_offset, header = self.read_header()
+		self.file = open(self.path, 'rb')
+		self.data = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+		self.entries = header['entries']
+
+	def close(self):
+		self.entries = {}
+		if self.data:
+			try:
+				self.data.close()
+			except BufferError:
+				pass # surfaces still reference the mapping, it is released with them
+			self.data = None
+		if self.file:
+			self.file.close()
+			self.file = None
+
+	# assets
+	def image(self, path):
+		"""Surface viewing the mapped pixels (not converted), None if the file is not bundled"""
+		entry = self.entries.get(path)
+		if not entry or entry[0] != 'image':
+			return None
+		kind, offset, length, width, height = entry
+		return pygame.image.frombuffer(memoryview(self.data)[offset:offset + length], (width, height), 'RGBA')
+
+	def sound(self, path):
+		entry = self.entries.get(path)
+		if not entry or entry[0] != 'sound':
+			return None
+		kind, offset, length, width, height = entry
+		return pygame.mixer.Sound(buffer = memoryview(self.data)[offset:offset + length])
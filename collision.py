@@ -0,0 +1,53 @@
+def sweep(rect, delta, sprites, ignore = None):
+	"""
+	Swept AABB test of a rect moving by delta against the rects of the given sprites
+
+	Args:
+		rect (Rect): Rect at the start of the step
+		delta (tuple): Movement (dx, dy) for this step
+		sprites (iterable): Sprites whose rects block the movement
+		ignore (Sprite): Sprite that never blocks (e.g. the shooter of a projectile)
+
+	Returns:
+		tuple: (time, sprite) of the first hit, time is the fraction of delta that
+		can be moved (0 to 1). (1, None) if nothing is in the way.
+	"""
+	dx, dy = delta
+	swept_rect = rect.union(rect.move(dx, dy)).inflate(2, 2)
+
+	first_time, first_sprite = 1, None
+	for sprite in sprites:
+		if sprite is ignore or not sprite.rect.colliderect(swept_rect):
+			continue
+		obstacle = sprite.rect
+
+		# entry and exit times per axis
+		if dx > 0:
+			x_entry, x_exit = (obstacle.left - rect.right) / dx, (obstacle.right - rect.left) / dx
+		elif dx < 0:
+			x_entry, x_exit = (obstacle.right - rect.left) / dx, (obstacle.left - rect.right) / dx
+		elif rect.right > obstacle.left and rect.left < obstacle.right:
+			x_entry, x_exit = float('-inf'), float('inf')
+		else:
+			continue
+
+		if dy > 0:
+			y_entry, y_exit = (obstacle.top - rect.bottom) / dy, (obstacle.bottom - rect.top) / dy
+		elif dy < 0:
+			y_entry, y_exit = (obstacle.bottom - rect.top) / dy, (obstacle.top - rect.bottom) / dy
+		elif rect.bottom > obstacle.top and rect.top < obstacle.bottom:
+			y_entry, y_exit = float('-inf'), float('inf')
+		else:
+			continue
+
+		entry = max(x_entry, y_entry)
+		exit = min(x_exit, y_exit)
+
+		# overlapping at the start is left to the discrete collision response
+		if entry < 0 or entry >= exit or entry > 1:
+			continue
+
+		if entry < first_time:
+			first_time, first_sprite = entry, sprite
+
+	return first_time, first_sprite
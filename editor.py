@@ -2,39 +2,42 @@ import pygame, sys
 from pygame.math import Vector2 as vector
 from pygame.mouse import get_pressed as mouse_buttons
 from pygame.mouse import get_pos as mouse_pos
-from pygame.image import load
 
 from settings import *
 from support import *
 
 from menu import Menu
-from timer import Timer
-from save_manager import SaveManager, SaveSlotUI
+from render import get_backend, render_text
+from timer import Timer, TimerWheel
+from save_manager import create_save_manager, SaveSlotUI, SaveNotice
 
 from random import choice, randint
 
 class Editor:
-	def __init__(self, land_tiles, switch, return_to_menu=None):
+	def __init__(self, assets, switch, music, return_to_menu=None):
 		
 		# main setup 
-		self.display_surface = pygame.display.get_surface()
+		self.backend = get_backend()
 		self.canvas_data = {}
 		self.switch = switch
 		self.return_to_menu = return_to_menu
 		
 		# save/load system
-		self.save_manager = SaveManager(num_slots=3)
+		self.save_manager = create_save_manager()
 		self.save_slot_ui = None
 
 		# imports 
-		self.land_tiles = land_tiles
-		self.imports()
+		self.imports(assets)
+
+		# timers of the editor, advanced by the main loop
+		self.timers = TimerWheel()
+		self.save_notice = SaveNotice(self.save_manager, self.timers)
 
 		# clouds
 		self.current_clouds = []
-		self.cloud_surf = import_folder('graphics/clouds')
-		self.cloud_timer = pygame.USEREVENT + 1
-		pygame.time.set_timer(self.cloud_timer, 2000)
+		self.cloud_surf = assets['clouds']
+		self.cloud_timer = Timer(2000, self.timers, self.create_clouds, repeat = True)
+		self.cloud_timer.activate()
 		self.startup_clouds()
 
 		# navigation
@@ -43,23 +46,21 @@ class Editor:
 		self.pan_offset = vector()
 
 		# support lines 
-		self.support_line_surf = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-		self.support_line_surf.set_colorkey('green')
-		self.support_line_surf.set_alpha(30)
+		self.support_line_color = (*pygame.Color(LINE_COLOR)[:3], 30)
 
 		# selection
 		self.selection_index = 2
 		self.last_selected_cell = None
 
 		# menu 
-		self.menu = Menu()
+		self.menu = Menu(assets['menu'])
 
 		# objects
 		self.canvas_objects = pygame.sprite.Group()
 		self.foreground = pygame.sprite.Group()
 		self.background = pygame.sprite.Group()
 		self.object_drag_active = False
-		self.object_timer = Timer(400)
+		self.object_timer = Timer(400, self.timers)
 		
 		# help overlay
 		self.show_help = False
@@ -83,10 +84,9 @@ class Editor:
 			origin = self.origin,
 			group = [self.canvas_objects, self.background])
 
-		# music (volume will be set by main.py when editor is created)
-		self.editor_music = pygame.mixer.Sound('audio/Explorer.ogg')
-		self.editor_music.set_volume(0.4)  # Default, will be overridden immediately
-		self.editor_music.play(loops = -1)
+		# music (volume is set by main.py)
+		self.music = music
+		self.music.play('editor')
 
 	# support
 	def get_current_cell(self, obj = None):
@@ -130,23 +130,23 @@ class Editor:
 						if self.canvas_data[neighbor_cell].has_terrain:
 							self.canvas_data[cell].terrain_neighbors.append(name)
 
-	def imports(self):
-		self.water_bottom = load('graphics/terrain/water/water_bottom.png').convert_alpha()
-		self.sky_handle_surf = load('graphics/cursors/handle.png').convert_alpha()
+	def imports(self, assets):
+		self.land_tiles = assets['land']
+		self.water_bottom = assets['water bottom']
+		self.sky_handle_surf = assets['sky handle']
 
 		# animations
 		self.animations = {}
-		for key, value in EDITOR_DATA.items():
-			if value['graphics']:
-				graphics = import_folder(value['graphics'])
-				self.animations[key] = {
-					'frame index': 0,
-					'frames': graphics,
-					'length': len(graphics)
-				}
+		for key, graphics in assets['animations'].items():
+			self.animations[key] = {
+				'frame index': 0,
+				'frames': graphics,
+				'length': len(graphics)
+			}
 
 		# preview
-		self.preview_surfs = {key: load(value['preview']) for key, value in EDITOR_DATA.items() if value['preview']}
+		self.preview_surfs = assets['previews']
+		self.preview_alpha_surfs = {} # selection index -> translucent copy of the preview
 
 	def animation_update(self, dt):
 		for value in self.animations.values():
@@ -345,12 +345,11 @@ class Editor:
 				sys.exit()
 			if event.type == pygame.KEYDOWN:
 				if event.key == pygame.K_RETURN:
-					self.switch(self.create_grid())
-					self.editor_music.stop()
+					self.switch(self.create_grid()) # the level's music fades out the editor track
 				elif event.key == pygame.K_ESCAPE:
 					# Return to main menu
 					if self.return_to_menu:
-						self.editor_music.stop()
+						self.music.stop()
 						self.return_to_menu()
 			
 			# Save/Load hotkeys
@@ -377,8 +376,6 @@ class Editor:
 			self.canvas_add()
 			self.canvas_remove()
 
-			self.create_clouds(event)
-
 	def pan_input(self, event): 
 
 		# middle mouse button pressed / released 
@@ -478,44 +475,43 @@ class Editor:
 
 	# drawing 
 	def draw_tile_lines(self):
-		cols = WINDOW_WIDTH // TILE_SIZE
-		rows = WINDOW_HEIGHT// TILE_SIZE
-
 		origin_offset = vector(
 			x = self.origin.x - int(self.origin.x / TILE_SIZE) * TILE_SIZE,
 			y = self.origin.y - int(self.origin.y / TILE_SIZE) * TILE_SIZE)
 
-		self.support_line_surf.fill('green')
+		cols = WINDOW_WIDTH // TILE_SIZE
+		rows = WINDOW_HEIGHT// TILE_SIZE
 
 		for col in range(cols + 1):
 			x = origin_offset.x + col * TILE_SIZE
-			pygame.draw.line(self.support_line_surf,LINE_COLOR, (x,0), (x,WINDOW_HEIGHT))
+			self.backend.draw_line(self.support_line_color, (x,0), (x,WINDOW_HEIGHT))
 
+		# the rows are drawn between the columns, the crossings would be shaded twice
 		for row in range(rows + 1):
 			y = origin_offset.y + row * TILE_SIZE
-			pygame.draw.line(self.support_line_surf,LINE_COLOR, (0,y), (WINDOW_WIDTH,y))
-
-		self.display_surface.blit(self.support_line_surf,(0,0))
+			for col in range(-1, cols + 1):
+				x = origin_offset.x + col * TILE_SIZE
+				self.backend.draw_line(self.support_line_color, (x + 1,y), (x + TILE_SIZE - 1,y))
 
 	def draw_level(self):
-		self.background.draw(self.display_surface)
+		self.backend.draw_batch([(sprite.image, sprite.rect) for sprite in self.background])
 		for cell_pos, tile in self.canvas_data.items():
 			pos = self.origin + vector(cell_pos) * TILE_SIZE
 
 			# water
 			if tile.has_water:
 				if tile.water_on_top:
-					self.display_surface.blit(self.water_bottom, pos)
+					self.backend.blit(self.water_bottom, pos)
 				else:
 					frames = self.animations[3]['frames']
 					index  = int(self.animations[3]['frame index'])
 					surf = frames[index]
-					self.display_surface.blit(surf, pos)
+					self.backend.blit(surf, pos)
 
 			if tile.has_terrain:
 				terrain_string = ''.join(tile.terrain_neighbors)
 				terrain_style = terrain_string if terrain_string in self.land_tiles else 'X'
-				self.display_surface.blit(self.land_tiles[terrain_style], pos)
+				self.backend.blit(self.land_tiles[terrain_style], pos)
 
 			# coins
 			if tile.coin:
@@ -523,7 +519,7 @@ class Editor:
 				index = int(self.animations[tile.coin]['frame index'])
 				surf = frames[index]
 				rect = surf.get_rect(center = (pos[0] + TILE_SIZE // 2,pos[1]+ TILE_SIZE // 2))
-				self.display_surface.blit(surf, rect)
+				self.backend.blit(surf, rect)
 
 			# enemies
 			if tile.enemy:
@@ -531,8 +527,8 @@ class Editor:
 				index = int(self.animations[tile.enemy]['frame index'])
 				surf = frames[index]
 				rect = surf.get_rect(midbottom = (pos[0] + TILE_SIZE // 2,pos[1]+ TILE_SIZE))
-				self.display_surface.blit(surf, rect)
-		self.foreground.draw(self.display_surface)
+				self.backend.blit(surf, rect)
+		self.backend.draw_batch([(sprite.image, sprite.rect) for sprite in self.foreground])
 
 	def preview(self):
 		selected_object = self.mouse_on_object()
@@ -543,19 +539,18 @@ class Editor:
 				width = 3
 				size = 15
 
-				# topleft
-				pygame.draw.lines(self.display_surface, color, False, ((rect.left,rect.top + size), rect.topleft, (rect.left + size,rect.top)), width)
-				#topright
-				pygame.draw.lines(self.display_surface, color, False, ((rect.right - size,rect.top), rect.topright, (rect.right,rect.top + size)), width)
-				# bottomright
-				pygame.draw.lines(self.display_surface, color, False, ((rect.right - size, rect.bottom), rect.bottomright, (rect.right,rect.bottom - size)), width)
-				# bottomleft
-				pygame.draw.lines(self.display_surface, color, False, ((rect.left,rect.bottom - size), rect.bottomleft, (rect.left + size,rect.bottom)), width)
+				# corners: topleft, topright, bottomright, bottomleft
+				for corner, (dx, dy) in ((rect.topleft, (1, 1)), (rect.topright, (-1, 1)), (rect.bottomright, (-1, -1)), (rect.bottomleft, (1, -1))):
+					self.backend.draw_line(color, corner, (corner[0] + dx * size, corner[1]), width)
+					self.backend.draw_line(color, corner, (corner[0], corner[1] + dy * size), width)
 				
 			else:
 				type_dict = {key: value['type'] for key, value in EDITOR_DATA.items()}
-				surf = self.preview_surfs[self.selection_index].copy()
-				surf.set_alpha(200)
+				surf = self.preview_alpha_surfs.get(self.selection_index)
+				if surf is None:
+					surf = self.preview_surfs[self.selection_index].copy()
+					surf.set_alpha(200)
+					self.preview_alpha_surfs[self.selection_index] = surf
 				
 				# tile 
 				if type_dict[self.selection_index] == 'tile':
@@ -564,10 +559,10 @@ class Editor:
 				# object 
 				else:
 					rect = surf.get_rect(center = mouse_pos())
-				self.display_surface.blit(surf, rect)
+				self.backend.blit(surf, rect)
 
 	def display_sky(self,dt):
-		self.display_surface.fill(SKY_COLOR)
+		self.backend.fill(SKY_COLOR)
 		y = self.sky_handle.rect.centery
 
 		# horizon lines
@@ -575,37 +570,36 @@ class Editor:
 			horizon_rect1 = pygame.Rect(0,y - 10,WINDOW_WIDTH,10)
 			horizon_rect2 = pygame.Rect(0,y - 16,WINDOW_WIDTH,4)
 			horizon_rect3 = pygame.Rect(0,y - 20,WINDOW_WIDTH,2)
-			pygame.draw.rect(self.display_surface, HORIZON_TOP_COLOR, horizon_rect1)
-			pygame.draw.rect(self.display_surface, HORIZON_TOP_COLOR, horizon_rect2)
-			pygame.draw.rect(self.display_surface, HORIZON_TOP_COLOR, horizon_rect3)
+			self.backend.draw_rect(HORIZON_TOP_COLOR, horizon_rect1)
+			self.backend.draw_rect(HORIZON_TOP_COLOR, horizon_rect2)
+			self.backend.draw_rect(HORIZON_TOP_COLOR, horizon_rect3)
 
 			self.display_clouds(dt, y)
 
 		# sea 
 		if 0 < y < WINDOW_HEIGHT:
 			sea_rect = pygame.Rect(0,y,WINDOW_WIDTH,WINDOW_HEIGHT)
-			pygame.draw.rect(self.display_surface, SEA_COLOR, sea_rect)
-			pygame.draw.line(self.display_surface, HORIZON_COLOR, (0,y), (WINDOW_WIDTH,y),3)
+			self.backend.draw_rect(SEA_COLOR, sea_rect)
+			self.backend.draw_line(HORIZON_COLOR, (0,y), (WINDOW_WIDTH,y),3)
 		if y < 0:
-			self.display_surface.fill(SEA_COLOR)
+			self.backend.fill(SEA_COLOR)
 
 	def display_clouds(self, dt, horizon_y):
 		for cloud in self.current_clouds: # [{surf, pos, speed}]
 			cloud['pos'][0] -= cloud['speed'] * dt
 			x = cloud['pos'][0]
 			y = horizon_y - cloud['pos'][1]
-			self.display_surface.blit(cloud['surf'], (x,y))
+			self.backend.blit(cloud['surf'], (x,y))
 
-	def create_clouds(self, event):
-		if event.type == self.cloud_timer:
-			surf = choice(self.cloud_surf)
-			surf = pygame.transform.scale2x(surf) if randint(0,4) < 2 else surf
-		
-			pos = [WINDOW_WIDTH + randint(50,100),randint(0,WINDOW_HEIGHT)]
-			self.current_clouds.append({'surf': surf, 'pos': pos, 'speed': randint(20,50)})
+	def create_clouds(self):
+		surf = choice(self.cloud_surf)
+		surf = pygame.transform.scale2x(surf) if randint(0,4) < 2 else surf
+	
+		pos = [WINDOW_WIDTH + randint(50,100),randint(0,WINDOW_HEIGHT)]
+		self.current_clouds.append({'surf': surf, 'pos': pos, 'speed': randint(20,50)})
 
-			# remove clouds
-			self.current_clouds = [cloud for cloud in self.current_clouds if cloud['pos'][0] > -400]
+		# remove clouds
+		self.current_clouds = [cloud for cloud in self.current_clouds if cloud['pos'][0] > -400]
 
 	def startup_clouds(self):
 		for i in range(20):
@@ -615,27 +609,21 @@ class Editor:
 		"""Draw help overlay with controls"""
 		if not self.show_help:
 			# Show hint in corner
-			hint_surf = self.help_font.render("Press H for help", True, (255, 255, 255))
+			hint_surf = render_text(self.help_font, "Press H for help", (255, 255, 255))
 			hint_rect = hint_surf.get_rect(topleft=(10, 10))
 			# Semi-transparent background
 			bg_rect = hint_rect.inflate(20, 10)
-			bg_surf = pygame.Surface(bg_rect.size)
-			bg_surf.set_alpha(180)
-			bg_surf.fill((0, 0, 0))
-			self.display_surface.blit(bg_surf, bg_rect)
-			self.display_surface.blit(hint_surf, hint_rect)
+			self.backend.fill((0, 0, 0, 180), bg_rect)
+			self.backend.blit(hint_surf, hint_rect)
 			return
 		
 		# Full help overlay
-		overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-		overlay.set_alpha(230)
-		overlay.fill((20, 20, 40))
-		self.display_surface.blit(overlay, (0, 0))
+		self.backend.fill((20, 20, 40, 230))
 		
 		# Title
-		title = self.help_title_font.render("LEVEL EDITOR CONTROLS", True, (255, 215, 0))
+		title = render_text(self.help_title_font, "LEVEL EDITOR CONTROLS", (255, 215, 0))
 		title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, 40))
-		self.display_surface.blit(title, title_rect)
+		self.backend.blit(title, title_rect)
 		
 		# Controls
 		controls = [
@@ -670,13 +658,13 @@ class Editor:
 		for line in controls:
 			if line and not line.startswith("  "):
 				# Section headers
-				surf = self.help_title_font.render(line, True, (100, 200, 255))
+				surf = render_text(self.help_title_font, line, (100, 200, 255))
 			else:
 				# Regular text
-				surf = self.help_font.render(line, True, (255, 255, 255))
+				surf = render_text(self.help_font, line, (255, 255, 255))
 			
 			rect = surf.get_rect(centerx=WINDOW_WIDTH // 2, top=y)
-			self.display_surface.blit(surf, rect)
+			self.backend.blit(surf, rect)
 			y += 30 if line and not line.startswith("  ") else 26
 			pos = [randint(0, WINDOW_WIDTH),randint(0, WINDOW_HEIGHT)]
 			self.current_clouds.append({'surf': surf, 'pos': pos, 'speed': randint(20,50)})
@@ -689,16 +677,17 @@ class Editor:
 		# updating
 		self.animation_update(dt)
 		self.canvas_objects.update(dt)
-		self.object_timer.update()
 
 		# drawing
-		self.display_surface.fill('gray')
+		self.backend.fill('gray')
 		self.display_sky(dt)
 		self.draw_level()
 		self.draw_tile_lines()
 		# pygame.draw.circle(self.display_surface, 'red', self.origin, 10)
 		self.preview()
 		self.menu.display(self.selection_index)
+		self.save_notice.update()
+		self.save_notice.draw()
 
 class CanvasTile:
 	def __init__(self, tile_id, offset = vector()):
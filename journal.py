@@ -0,0 +1,181 @@
+import json
+import struct
+import zlib
+from pathlib import Path
+
+from settings import *
+
+JOURNAL_MAGIC = b'PYJL'
+JOURNAL_HEADER = struct.Struct('<4sII') # magic, level id, generation
+RECORD = struct.Struct('<IIiiHBfH') # crc32 of the rest, sequence, x, y, coins collected, health, play time, new coins
+COIN = struct.Struct('<ii')
+
+class AutosaveJournal:
+	"""
+	Autosave of the running level as an append-only log. Each record holds the
+	player state and the coins collected since the previous record, so appending
+	one is a struct.pack and a small unbuffered write. Every AUTOSAVE_COMPACT_RECORDS
+	records the state is written as a snapshot by the save writer thread and the
+	log continues in a new generation file; older generations are deleted once
+	the snapshot is on disk.
+
+	Files (in save_data/autosave): snapshot.json, journal_<generation>.bin.
+	A session that ends normally deletes them, after a crash recover() replays
+	them: the snapshot, then every record of the later generations up to the
+	first torn or corrupt one.
+	"""
+	def __init__(self, directory, level_id, writer):
+		self.directory = Path(directory)
+		self.directory.mkdir(parents = True, exist_ok = True)
+		self.snapshot_path = self.directory / 'snapshot.json'
+		self.level_id = level_id
+		self.writer = writer
+
+		self.file = None
+		self.generation = 0
+		self.records = 0 # records in the current generation
+		self.sequence = 0
+		self.state = None # (x, y, coins collected, health, play time) of the last record
+		self.coins = set() # every collected coin of the session, for the snapshots
+		self.new_coins = [] # collected since the last record
+
+	def get_journal_paths(self):
+		"""(generation, path) of the journal files, oldest first"""
+		paths = []
+		for path in self.directory.glob('journal_*.bin'):
+			try:
+				paths.append((int(path.stem.split('_')[1]), path))
+			except ValueError:
+				pass
+		return sorted(paths)
+
+	# recovery
+	def recover(self):
+		"""
+		State left by a crashed session of this level
+
+		Returns:
+			dict or None: position, coins_collected, health, play_time and coins (set of positions)
+		"""
+		state = None
+		coins = set()
+		first_generation = 0
+
+		try:
+			with open(self.snapshot_path, 'r') as f:
+				snapshot = json.load(f)
+			if snapshot['level_id'] == self.level_id:
+				state = tuple(snapshot['state'])
+				coins = {tuple(pos) for pos in snapshot['coins']}
+				first_generation = snapshot['generation']
+		except (OSError, ValueError, KeyError):
+			pass
+
+		for generation, path in self.get_journal_paths():
+			if generation < first_generation:
+				continue
+			with open(path, 'rb') as f:
+				data = f.read()
+			if len(data) < JOURNAL_HEADER.size:
+				continue
+			magic, level_id, file_generation = JOURNAL_HEADER.unpack_from(data)
+			if magic != JOURNAL_MAGIC or level_id != self.level_id:
+				continue
+
+			offset = JOURNAL_HEADER.size
+			while offset + RECORD.size <= len(data):
+				crc, sequence, x, y, coins_collected, health, play_time, new_coins = RECORD.unpack_from(data, offset)
+				end = offset + RECORD.size + new_coins * COIN.size
+				if end > len(data) or zlib.crc32(data[offset + 4:end]) != crc:
+					break # torn write at the end of the log
+				coins.update(COIN.iter_unpack(data[offset + RECORD.size:end]))
+				state = (x, y, coins_collected, health, play_time)
+				offset = end
+
+		if state is None:
+			return None
+		x, y, coins_collected, health, play_time = state
+		return {
+			'position': (x, y),
+			'coins_collected': coins_collected,
+			'health': health,
+			'play_time': play_time,
+			'coins': coins
+		}
+
+	# logging
+	def start(self, coins = ()):
+		"""Begin a new session, coins are the already collected ones (e.g. recovered)"""
+		self.writer.cancel(self.snapshot_path) # a queued snapshot of the previous session would replace the new log
+		self.remove_files()
+		self.coins = set(coins)
+		self.new_coins = list(self.coins)
+		self.generation = 0
+		self.open_generation()
+
+	def open_generation(self):
+		if self.file:
+			self.file.close()
+		path = self.directory / f'journal_{self.generation}.bin'
+		self.file = open(path, 'wb', buffering = 0)
+		self.file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, self.level_id, self.generation))
+		self.records = 0
+
+	def collect(self, pos):
+		pos = (int(pos[0]), int(pos[1]))
+		self.coins.add(pos)
+		self.new_coins.append(pos)
+
+	def append(self, pos, coins_collected, health, play_time):
+		"""Log the current state, skipped if nothing changed since the last record"""
+		if self.file is None:
+			return
+		state = (int(pos[0]), int(pos[1]), coins_collected, max(health, 0), play_time)
+		if state == self.state and not self.new_coins:
+			return
+
+		self.sequence += 1
+		body = RECORD.pack(0, self.sequence, *state, len(self.new_coins))[4:]
+		body += b''.join(COIN.pack(*coin) for coin in self.new_coins)
+		self.file.write(struct.pack('<I', zlib.crc32(body)) + body)
+		self.state = state
+		self.new_coins = []
+		self.records += 1
+
+		if self.records >= AUTOSAVE_COMPACT_RECORDS:
+			self.compact()
+
+	def compact(self):
+		"""Continue in a new generation and write the snapshot that replaces the older ones"""
+		self.generation += 1
+		self.open_generation()
+
+		generation = self.generation
+		snapshot = {
+			'level_id': self.level_id,
+			'generation': generation,
+			'state': list(self.state),
+			'coins': [list(pos) for pos in self.coins]
+		}
+
+		def on_done(success):
+			# runs on the writer thread
+			if success:
+				for old_generation, path in self.get_journal_paths():
+					if old_generation < generation:
+						path.unlink(missing_ok = True)
+
+		self.writer.write(self.snapshot_path, lambda: snapshot, on_done)
+
+	def close(self):
+		"""End the session normally, nothing is left to recover"""
+		if self.file:
+			self.file.close()
+			self.file = None
+		self.writer.cancel(self.snapshot_path)
+		self.remove_files()
+
+	def remove_files(self):
+		self.snapshot_path.unlink(missing_ok = True)
+		for generation, path in self.get_journal_paths():
+			path.unlink(missing_ok = True)
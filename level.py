@@ -5,18 +5,26 @@ from settings import *
 from support import *
 
 from sprites import Generic, Block, Animated, Particle, Coin, Player, Spikes, Tooth, Shell, Cloud
-from save_manager import SaveManager, SaveSlotUI
+from save_manager import create_save_manager, SaveSlotUI, SaveNotice
+from journal import AutosaveJournal
+from snapshot import LevelSnapshot
+from rewind import RewindBuffer
+from trigger import TriggerZones
+from timer import Timer, TimerWheel
+from render import get_surface, get_world
+from level_format import ChunkedLevel, GridLevel
 
 from random import choice, randint
 
 class Level:
-	def __init__(self, grid, switch, asset_dict, audio, return_to_menu=None):
-		self.display_surface = pygame.display.get_surface()
+	def __init__(self, grid, switch, asset_dict, sfx, music, return_to_menu=None):
+		self.display_surface = get_surface()
+		self.world = get_world()
 		self.switch = switch
 		self.return_to_menu = return_to_menu
 		
 		# Save manager for game state
-		self.save_manager = SaveManager(num_slots=3)
+		self.save_manager = create_save_manager()
 		
 		# Game state tracking
 		self.coins_collected = 0
@@ -38,27 +46,60 @@ class Level:
 		self.collision_sprites = pygame.sprite.Group()
 		self.shell_sprites = pygame.sprite.Group()
 
-		self.build_level(grid, asset_dict, audio['jump'])
+		# proximity triggers (shells)
+		self.triggers = TriggerZones()
+
+		# timers of this level, advanced by the main loop
+		self.timers = TimerWheel()
+		self.save_notice = SaveNotice(self.save_manager, self.timers)
+
+		# the level is streamed in chunks around the player, from the chunked file or the grid in memory
+		self.level_file = grid if isinstance(grid, ChunkedLevel) else GridLevel(grid)
+		self.asset_dict = asset_dict
+		self.sfx = sfx
+		self.loaded_chunks = {} # (cx, cy) -> sprites built from the chunk
+		self.roaming_teeth = {} # spawn position -> tooth that walked into another chunk
+		self.collected_coins = set() # positions, so coins stay collected when their chunk is built again
+
+		self.build_level(self.level_file.fixed, asset_dict, sfx)
+		self.total_coins = self.level_file.counts.get('coins', 0)
+		self.update_chunks()
 
 		# level limits
 		self.level_limits = {
 		'left': -WINDOW_WIDTH,
-		'right': sorted(list(grid['terrain'].keys()), key = lambda pos: pos[0])[-1][0] + 500
+		'right': self.level_file.terrain_right + 500
 		}
 
 		# additional stuff
 		self.particle_surfs = asset_dict['particle']
 		self.cloud_surfs = asset_dict['clouds']
-		self.cloud_timer = pygame.USEREVENT + 2
-		pygame.time.set_timer(self.cloud_timer, 2000)
+		self.cloud_timer = Timer(2000, self.timers, self.create_cloud, repeat = True)
+		self.cloud_timer.activate()
 		self.startup_clouds()
 
 		# sounds (volumes are already set before Level is created)
-		self.bg_music = audio['music']
-		self.bg_music.play(loops = -1)
+		self.music = music
+		self.music.play('level')
+
+		self.sfx.listener = self.all_sprites.offset
 
-		self.coin_sound = audio['coin']
-		self.hit_sound = audio['hit']
+		# autosave journal, replayed when the last session of this level crashed
+		self.journal = AutosaveJournal(self.save_manager.save_directory / 'autosave', self.level_file.get_id(), self.save_manager.writer)
+		recovered = self.journal.recover()
+		if recovered:
+			self.restore_autosave(recovered)
+		self.journal.start(self.collected_coins)
+		self.autosave_timer = Timer(AUTOSAVE_INTERVAL, self.timers, self.autosave, repeat = True)
+		self.autosave_timer.activate()
+
+		# in memory snapshots: retry after death, F6 / F7 quick save and load
+		self.start_snapshot = self.snapshot()
+		self.quick_snapshot = None
+
+		# rewind history (hold backspace)
+		self.rewind = RewindBuffer()
+		self.rewinding = False
 		
 		# Death screen
 		self.death_screen_active = False
@@ -66,79 +107,124 @@ class Level:
 		self.death_font = pygame.font.Font(None, 100)
 		self.death_subfont = pygame.font.Font(None, 50)
 
-	def build_level(self, grid, asset_dict, jump_sound):
+	def build_level(self, grid, asset_dict, sfx, nav_graph = None):
+		"""Create the sprites of a grid (the whole level or one chunk, nav_graph has its walkable platforms), returns them"""
+		sprites = []
+		add = sprites.append
 		for layer_name, layer in grid.items():
 			for pos, data in layer.items():
 				if layer_name == 'terrain':
-					Generic(pos, asset_dict['land'][data], [self.all_sprites, self.collision_sprites])
+					add(Generic(pos, asset_dict['land'][data], [self.all_sprites, self.collision_sprites]))
 				if layer_name == 'water':
 					if data == 'top':
-						Animated(asset_dict['water top'], pos, self.all_sprites, LEVEL_LAYERS['water'])
+						add(Animated(asset_dict['water top'], pos, self.all_sprites, LEVEL_LAYERS['water']))
 					else:
-						Generic(pos, asset_dict['water bottom'], self.all_sprites, LEVEL_LAYERS['water'])
+						add(Generic(pos, asset_dict['water bottom'], self.all_sprites, LEVEL_LAYERS['water']))
 
 				match data:
 					case 0: 
-						self.player = Player(pos, asset_dict['player'], self.all_sprites, self.collision_sprites, jump_sound)
+						self.player = Player(pos, asset_dict['player'], self.all_sprites, self.collision_sprites, sfx, self.timers)
 						self.player_start_pos = vector(pos)  # Store starting position for respawn
 					case 1: 
 						self.horizon_y = pos[1]
 						self.all_sprites.horizon_y = pos[1]
 					# coins
-					case 4: Coin('gold', asset_dict['gold'], pos, [self.all_sprites, self.coin_sprites])
-					case 5: Coin('silver', asset_dict['silver'], pos, [self.all_sprites, self.coin_sprites])
-					case 6: Coin('diamond', asset_dict['diamond'], pos, [self.all_sprites, self.coin_sprites])
+					case 4 | 5 | 6 if pos in self.collected_coins:
+						pass
+					case 4: add(Coin('gold', asset_dict['gold'], pos, [self.all_sprites, self.coin_sprites]))
+					case 5: add(Coin('silver', asset_dict['silver'], pos, [self.all_sprites, self.coin_sprites]))
+					case 6: add(Coin('diamond', asset_dict['diamond'], pos, [self.all_sprites, self.coin_sprites]))
 
 					# enemies
-					case 7: Spikes(asset_dict['spikes'], pos, [self.all_sprites, self.damage_sprites])
+					case 7: add(Spikes(asset_dict['spikes'], pos, [self.all_sprites, self.damage_sprites]))
+					case 8 if pos in self.roaming_teeth and self.roaming_teeth[pos].alive():
+						pass # still walking in another chunk
 					case 8: 
-						Tooth(asset_dict['tooth'], pos, [self.all_sprites, self.damage_sprites], self.collision_sprites)
+						self.roaming_teeth.pop(pos, None)
+						add(Tooth(asset_dict['tooth'], pos, [self.all_sprites, self.damage_sprites], nav_graph))
 					case 9: 
-						Shell(
+						add(Shell(
 							orientation = 'left', 
 							assets = asset_dict['shell'], 
 							pos =  pos, 
 							group =  [self.all_sprites, self.collision_sprites, self.shell_sprites],
 							pearl_surf = asset_dict['pearl'],
-							damage_sprites = self.damage_sprites)
+							damage_sprites = self.damage_sprites,
+							collision_sprites = self.collision_sprites,
+							triggers = self.triggers,
+							timers = self.timers))
 					case 10: 
-						Shell(
+						add(Shell(
 							orientation = 'right', 
 							assets = asset_dict['shell'], 
 							pos =  pos, 
 							group =  [self.all_sprites, self.collision_sprites, self.shell_sprites],
 							pearl_surf = asset_dict['pearl'],
-							damage_sprites = self.damage_sprites)
+							damage_sprites = self.damage_sprites,
+							collision_sprites = self.collision_sprites,
+							triggers = self.triggers,
+							timers = self.timers))
 
 					# palm trees
 					case 11: 
-						Animated(asset_dict['palms']['small_fg'], pos, self.all_sprites)
-						Block(pos, (76,50), self.collision_sprites)
+						add(Animated(asset_dict['palms']['small_fg'], pos, self.all_sprites))
+						add(Block(pos, (76,50), self.collision_sprites))
 					case 12: 
-						Animated(asset_dict['palms']['large_fg'], pos, self.all_sprites)
-						Block(pos, (76,50), self.collision_sprites)
+						add(Animated(asset_dict['palms']['large_fg'], pos, self.all_sprites))
+						add(Block(pos, (76,50), self.collision_sprites))
 					case 13: 
-						Animated(asset_dict['palms']['left_fg'], pos, self.all_sprites)
-						Block(pos, (76,50), self.collision_sprites)
+						add(Animated(asset_dict['palms']['left_fg'], pos, self.all_sprites))
+						add(Block(pos, (76,50), self.collision_sprites))
 					case 14: 
-						Animated(asset_dict['palms']['right_fg'], pos, self.all_sprites)
-						Block(pos + vector(50,0), (76,50), self.collision_sprites)
+						add(Animated(asset_dict['palms']['right_fg'], pos, self.all_sprites))
+						add(Block(pos + vector(50,0), (76,50), self.collision_sprites))
 					
-					case 15: Animated(asset_dict['palms']['small_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg'])
-					case 16: Animated(asset_dict['palms']['large_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg'])
-					case 17: Animated(asset_dict['palms']['left_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg'])
-					case 18: Animated(asset_dict['palms']['right_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg'])
+					case 15: add(Animated(asset_dict['palms']['small_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg']))
+					case 16: add(Animated(asset_dict['palms']['large_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg']))
+					case 17: add(Animated(asset_dict['palms']['left_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg']))
+					case 18: add(Animated(asset_dict['palms']['right_bg'], pos, self.all_sprites, LEVEL_LAYERS['bg']))
+		return sprites
 
-		for sprite in self.shell_sprites:
-			sprite.player = self.player
-		
-		# Count total coins
-		self.total_coins = len(self.coin_sprites)
+	def get_view_rect(self, margin):
+		"""Screen area around the player, grown by margin pixels on every side"""
+		rect = pygame.Rect(0, 0, WINDOW_WIDTH + margin * 2, WINDOW_HEIGHT + margin * 2)
+		rect.center = self.player.rect.center
+		return rect
+
+	def update_chunks(self):
+		"""Build the chunks coming near the screen and remove the sprites of distant ones"""
+		for key in self.level_file.get_chunk_keys(self.get_view_rect(CHUNK_LOAD_MARGIN)):
+			if key not in self.loaded_chunks:
+				chunk = self.level_file.read_chunk(key)
+				if chunk:
+					chunk_grid, nav_graph = chunk
+					self.loaded_chunks[key] = self.build_level(chunk_grid, self.asset_dict, self.sfx, nav_graph)
+				else:
+					self.loaded_chunks[key] = []
+
+		# teeth belong to the loaded chunk they are in, so one that walked along a long
+		# platform is removed with the chunk around it and not with its spawn chunk
+		chunk_size = CHUNK_TILES * TILE_SIZE
+		for key, sprites in self.loaded_chunks.items():
+			for tooth in [sprite for sprite in sprites if isinstance(sprite, Tooth)]:
+				tooth_key = (tooth.rect.centerx // chunk_size, tooth.rect.centery // chunk_size)
+				if tooth_key != key and tooth_key in self.loaded_chunks:
+					sprites.remove(tooth)
+					self.loaded_chunks[tooth_key].append(tooth)
+					self.roaming_teeth[tooth.spawn_pos] = tooth
+
+		keep = self.level_file.get_chunk_keys(self.get_view_rect(CHUNK_EVICT_MARGIN))
+		for key in [key for key in self.loaded_chunks if key not in keep]:
+			for sprite in self.loaded_chunks.pop(key):
+				sprite.kill()
 
 	def get_coins(self):
 		collided_coins = pygame.sprite.spritecollide(self.player, self.coin_sprites, True)
 		for sprite in collided_coins:
-			self.coin_sound.play()
+			self.collected_coins.add(sprite.rect.center)
+			self.journal.collect(sprite.rect.center)
+			self.rewind.collect(sprite.rect.center)
+			self.sfx.play('coin', sprite.rect.center)
 			Particle(self.particle_surfs, sprite.rect.center, self.all_sprites)
 			self.coins_collected += 1
 			
@@ -149,7 +235,7 @@ class Level:
 	def get_damage(self):
 		collision_sprites = pygame.sprite.spritecollide(self.player, self.damage_sprites, False, pygame.sprite.collide_mask)
 		if collision_sprites:
-			self.hit_sound.play()
+			self.sfx.play('hit')
 			self.player.damage()
 	
 	def check_death(self):
@@ -159,8 +245,8 @@ class Level:
 		
 		if self.player.rect.top > death_y:
 			# Player fell off - respawn at start position
-			self.hit_sound.play()
-			self.player.rect.topleft = self.player_start_pos
+			self.sfx.play('hit')
+			self.player.teleport(self.player_start_pos)
 			self.player.direction.y = 0  # Reset falling velocity
 			self.player.on_ground = False
 			self.player.damage()  # Take damage for falling off
@@ -169,23 +255,26 @@ class Level:
 		if self.player.is_dead and not self.death_screen_active:
 			self.death_screen_active = True
 			self.death_timer = 0
-			self.bg_music.stop()
+			self.music.stop()
+			self.autosave_timer.deactivate()
 
 	def event_loop(self):
 		for event in pygame.event.get():
 			if event.type == pygame.QUIT:
+				self.end_session()
 				pygame.quit()
 				sys.exit()
 			if event.type == pygame.KEYDOWN:
 				if event.key == pygame.K_ESCAPE:
+					self.end_session()
 					# Return to main menu
 					if self.return_to_menu:
-						self.bg_music.stop()
+						self.music.stop()
 						self.return_to_menu()
 					else:
 						# Fallback to editor if no menu callback
 						self.switch()
-						self.bg_music.stop()
+						self.music.stop()
 			
 			# Save/Load hotkeys for game state
 			if event.type == pygame.KEYDOWN:
@@ -193,19 +282,18 @@ class Level:
 					self.show_help = not self.show_help
 				elif event.key == pygame.K_F6:  # Quick save game state
 					self.save_game_state(0)
-				elif event.key == pygame.K_F7:  # Quick load game state
-					self.load_game_state(0)
+					self.quick_snapshot = self.snapshot()
+				elif event.key == pygame.K_F7:  # Quick load game state (from memory if saved in this session)
+					if self.quick_snapshot:
+						self.restore(self.quick_snapshot)
+					else:
+						self.load_game_state(0)
+				elif event.key == pygame.K_r and self.death_screen_active:  # Retry from the last quick save or the start
+					self.restore(self.quick_snapshot or self.start_snapshot)
 				elif pygame.key.get_pressed()[pygame.K_LCTRL] and event.key == pygame.K_s:  # Ctrl+S: Save with UI
 					self.save_with_ui()
 				elif pygame.key.get_pressed()[pygame.K_LCTRL] and event.key == pygame.K_l:  # Ctrl+L: Load with UI
 					self.load_with_ui()
-
-			if event.type == self.cloud_timer:
-				surf = choice(self.cloud_surfs)
-				surf = pygame.transform.scale2x(surf) if randint(0,5) > 3 else surf
-				x = self.level_limits['right'] + randint(100,300)
-				y = self.horizon_y - randint(-50,600)
-				Cloud((x,y), surf, self.all_sprites, self.level_limits['left'])
 	
 	def draw_ui(self):
 		"""Draw UI elements showing game state"""
@@ -233,11 +321,10 @@ class Level:
 		if not self.show_help:
 			hint_surf = self.help_font.render("Press H for help", True, (255, 255, 255))
 			hint_rect = hint_surf.get_rect(topright=(WINDOW_WIDTH - 10, 10))
-			# Semi-transparent background
+			# Semi-transparent background (per pixel alpha, the HUD can be drawn onto a transparent layer)
 			bg_rect = hint_rect.inflate(20, 10)
-			bg_surf = pygame.Surface(bg_rect.size)
-			bg_surf.set_alpha(180)
-			bg_surf.fill((0, 0, 0))
+			bg_surf = pygame.Surface(bg_rect.size, pygame.SRCALPHA)
+			bg_surf.fill((0, 0, 0, 180))
 			self.display_surface.blit(bg_surf, bg_rect)
 			self.display_surface.blit(hint_surf, hint_rect)
 		
@@ -254,9 +341,8 @@ class Level:
 			return
 		
 		# Full help overlay
-		overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-		overlay.set_alpha(230)
-		overlay.fill((20, 20, 40))
+		overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+		overlay.fill((20, 20, 40, 230))
 		self.display_surface.blit(overlay, (0, 0))
 		
 		# Title
@@ -305,9 +391,8 @@ class Level:
 	def draw_death_screen(self):
 		"""Draw the 'You Died' screen overlay"""
 		# Semi-transparent dark overlay
-		overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-		overlay.fill((0, 0, 0))
-		overlay.set_alpha(200)
+		overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+		overlay.fill((0, 0, 0, 200))
 		self.display_surface.blit(overlay, (0, 0))
 		
 		# "YOU DIED" text
@@ -317,11 +402,18 @@ class Level:
 		self.display_surface.blit(death_surf, death_rect)
 		
 		# "Returning to menu..." text
-		sub_text = "Returning to menu..."
+		sub_text = "Press R to retry  |  Returning to menu..."
 		sub_surf = self.death_subfont.render(sub_text, True, (200, 200, 200))
 		sub_rect = sub_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 50))
 		self.display_surface.blit(sub_surf, sub_rect)
 	
+	def create_cloud(self):
+		surf = choice(self.cloud_surfs)
+		surf = pygame.transform.scale2x(surf) if randint(0,5) > 3 else surf
+		x = self.level_limits['right'] + randint(100,300)
+		y = self.horizon_y - randint(-50,600)
+		Cloud((x,y), surf, self.all_sprites, self.level_limits['left'])
+
 	def startup_clouds(self):
 		for i in range(40):
 			surf = choice(self.cloud_surfs)
@@ -330,6 +422,50 @@ class Level:
 			y = self.horizon_y - randint(-50,600)
 			Cloud((x,y), surf, self.all_sprites, self.level_limits['left'])
 	
+	# autosave
+	def autosave(self):
+		self.journal.append(self.player.rect.topleft, self.coins_collected, self.player.health, self.play_time)
+
+	def restore_autosave(self, state):
+		"""Continue from the state of the autosave journal"""
+		self.player.teleport(state['position'])
+		self.coins_collected = state['coins_collected']
+		self.player.health = state['health']
+		self.play_time = state['play_time']
+		self.level_complete = self.coins_collected >= self.total_coins
+
+		self.collected_coins |= state['coins']
+		for sprite in self.coin_sprites:
+			if sprite.rect.center in self.collected_coins:
+				sprite.kill()
+		self.update_chunks()
+		print("Recovered the autosave of the last session")
+
+	# snapshots
+	def snapshot(self):
+		"""State of the running level in memory, see LevelSnapshot"""
+		return LevelSnapshot(self)
+
+	def restore(self, snapshot):
+		"""Go back to a snapshot in place, without building the level again"""
+		snapshot.restore(self)
+		self.update_chunks()
+		self.rewind.clear()
+
+		if self.death_screen_active:
+			self.death_screen_active = False
+			self.death_timer = 0
+			self.music.play('level')
+
+		# the journal can't take coins back, it starts over from the restored state
+		self.journal.start(self.collected_coins)
+		self.autosave_timer.activate()
+
+	def end_session(self):
+		"""The level is left normally, its autosave is no longer needed"""
+		self.autosave_timer.deactivate()
+		self.journal.close()
+
 	# Save/Load game state functionality
 	def save_game_state(self, slot=0):
 		"""Save the current game state to a slot"""
@@ -343,7 +479,7 @@ class Level:
 		level_progress = {
 			'level_complete': self.level_complete,
 			'total_coins': self.total_coins,
-			'coins_remaining': len(self.coin_sprites)
+			'coins_remaining': self.total_coins - self.coins_collected
 		}
 		
 		success = self.save_manager.save_game_state(slot, player_data, level_progress)
@@ -364,9 +500,7 @@ class Level:
 			self.play_time = player_data['play_time']
 			
 			# Restore player position
-			self.player.rect.x = player_data['position']['x']
-			self.player.rect.y = player_data['position']['y']
-			self.player.pos = vector(self.player.rect.center)
+			self.player.teleport((player_data['position']['x'], player_data['position']['y']))
 			
 			# Restore level progress
 			level_progress = game_state['level_progress']
@@ -399,8 +533,19 @@ class Level:
 		if self.death_screen_active:
 			self.death_timer += dt
 			if self.death_timer >= 3.0:  # Show death screen for 3 seconds
+				self.end_session()
 				return 'menu'  # Signal to return to main menu
+		elif pygame.key.get_pressed()[pygame.K_BACKSPACE]:
+			self.rewinding = True
+			self.rewind.step_back(self, dt)
 		else:
+			if self.rewinding:
+				# coins may have been taken back, the journal starts over
+				self.rewinding = False
+				self.journal.start(self.collected_coins)
+			
+			self.update_chunks()
+			self.triggers.update(self.player.rect.center)
 			self.all_sprites.update(dt)
 			self.get_coins()
 			self.get_damage()
@@ -408,13 +553,16 @@ class Level:
 			
 			# Track play time
 			self.play_time += dt
+			self.rewind.record(self, dt)
 
 		# drawing
-		self.display_surface.fill(SKY_COLOR)
+		self.world.fill(SKY_COLOR)
 		self.all_sprites.custom_draw(self.player)
 		
 		# Display game state info
 		self.draw_ui()
+		self.save_notice.update()
+		self.save_notice.draw()
 		
 		# Draw death screen if active
 		if self.death_screen_active:
@@ -423,7 +571,7 @@ class Level:
 class CameraGroup(pygame.sprite.Group):
 	def __init__(self):
 		super().__init__()
-		self.display_surface = pygame.display.get_surface()
+		self.world = get_world()
 		self.offset = vector()
 
 	def draw_horizon(self):
@@ -431,35 +579,35 @@ class CameraGroup(pygame.sprite.Group):
 
 		if horizon_pos < WINDOW_HEIGHT:
 			sea_rect = pygame.Rect(0,horizon_pos,WINDOW_WIDTH,WINDOW_HEIGHT - horizon_pos)
-			pygame.draw.rect(self.display_surface, SEA_COLOR, sea_rect)
+			self.world.fill(SEA_COLOR, sea_rect)
 
 			# horizon line 
 			# 3 extra rectangles 
 			horizon_rect1 = pygame.Rect(0,horizon_pos - 10,WINDOW_WIDTH,10)
 			horizon_rect2 = pygame.Rect(0,horizon_pos - 16,WINDOW_WIDTH,4)
 			horizon_rect3 = pygame.Rect(0,horizon_pos - 20,WINDOW_WIDTH,2)
-			pygame.draw.rect(self.display_surface, HORIZON_TOP_COLOR, horizon_rect1)
-			pygame.draw.rect(self.display_surface, HORIZON_TOP_COLOR, horizon_rect2)
-			pygame.draw.rect(self.display_surface, HORIZON_TOP_COLOR, horizon_rect3)
-			pygame.draw.line(self.display_surface, HORIZON_COLOR, (0,horizon_pos), (WINDOW_WIDTH,horizon_pos), 3)
+			self.world.fill(HORIZON_TOP_COLOR, horizon_rect1)
+			self.world.fill(HORIZON_TOP_COLOR, horizon_rect2)
+			self.world.fill(HORIZON_TOP_COLOR, horizon_rect3)
+			# 3 px line
+			self.world.fill(HORIZON_COLOR, pygame.Rect(0,horizon_pos - 1,WINDOW_WIDTH,3))
 
 		if horizon_pos < 0:
-			self.display_surface.fill(SEA_COLOR)
+			self.world.fill(SEA_COLOR)
 
 	def custom_draw(self, player):
 		self.offset.x = player.rect.centerx - WINDOW_WIDTH / 2
 		self.offset.y = player.rect.centery - WINDOW_HEIGHT / 2
+		offset_x, offset_y = int(self.offset.x), int(self.offset.y)
 
+		# one (surface, position) sequence per layer, drawn with a single call each
+		layers = {layer: [] for layer in LEVEL_LAYERS.values()}
 		for sprite in self:
-			if sprite.z == LEVEL_LAYERS['clouds']:
-				offset_rect = sprite.rect.copy()
-				offset_rect.center -= self.offset
-				self.display_surface.blit(sprite.image, offset_rect)
+			rect = sprite.rect
+			layers[sprite.z].append((sprite.image, (rect.x - offset_x, rect.y - offset_y)))
 
+		self.world.draw_batch(layers.pop(LEVEL_LAYERS['clouds']))
 		self.draw_horizon()
-		for sprite in self:
-			for layer in LEVEL_LAYERS.values():
-				if sprite.z == layer and sprite.z != LEVEL_LAYERS['clouds']:
-					offset_rect = sprite.rect.copy()
-					offset_rect.center -= self.offset
-					self.display_surface.blit(sprite.image, offset_rect)
\ No newline at end of file
+		for batch in layers.values():
+			self.world.draw_batch(batch)
+		self.world.flush()
@@ -0,0 +1,388 @@
+import json
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+
+from settings import *
+from navigation import NavGraph
+
+LEVEL_MAGIC = b'PYLV'
+LEVEL_VERSION = 1
+LEVEL_EXTENSION = '.lvl'
+HEADER = struct.Struct('<4sHI') # magic, version, length of the JSON header
+
+# Binary level file:
+#	HEADER
+#	JSON header: info (level name, timestamp), palette of tile values, layer layouts
+#	zlib compressed arrays of the layers
+#
+# Each layer is stored either dense, as one palette index (+1, 0 is empty) per cell
+# of the TILE_SIZE grid covering it, or sparse, as x, y and palette index arrays
+# (objects placed off the grid), whichever is smaller.
+#
+# Chunked level file (streamed while playing, see ChunkedLevel):
+#	HEADER with CHUNK_MAGIC
+#	JSON header: info, palette, layer names, entry counts, the player / sky handle
+#	and the number of chunks
+#	chunk directory, CHUNK_ENTRY per chunk sorted by (cx, cy)
+#	one zlib compressed block per chunk: entry count per layer, then x, y and palette index arrays per layer,
+#	then the segment and link counts and the arrays of the chunk's part of the enemy navigation graph
+
+CHUNK_MAGIC = b'PYLC'
+CHUNK_VERSION = 2
+CHUNK_EXTENSION = '.lvc'
+CHUNK_ENTRY = struct.Struct('<iiII') # cx, cy, offset from the first block, length
+FIXED_TILES = (0, 1) # player and sky handle, built once instead of with their chunk
+
+def get_dense_layout(layer):
+	"""(left, top, cols, rows) if every position lies on one TILE_SIZE grid, else None"""
+	xs = [x for x, y in layer]
+	ys = [y for x, y in layer]
+	if len({x % TILE_SIZE for x in xs}) != 1 or len({y % TILE_SIZE for y in ys}) != 1:
+		return None
+	left, top = min(xs), min(ys)
+	return left, top, (max(xs) - left) // TILE_SIZE + 1, (max(ys) - top) // TILE_SIZE + 1
+
+def encode_level(grid, info):
+	"""
+	Pack a level grid (see Editor.create_grid) into the binary format
+
+	Args:
+		grid (dict): layer name -> {(x, y): tile value}
+		info (dict): Level name, timestamp, stored uncompressed in the header
+
+	Returns:
+		bytes: File contents
+	"""
+	palette = {}
+	layouts = []
+	parts = []
+	offset = 0
+
+	for name, layer in grid.items():
+		ids = [palette.setdefault(value, len(palette)) + 1 for value in layer.values()]
+		dense = get_dense_layout(layer) if layer else None
+		if dense and dense[2] * dense[3] * 2 <= len(layer) * 10:
+			left, top, cols, rows = dense
+			cells = array('H', bytes(cols * rows * 2))
+			for (x, y), tile_id in zip(layer, ids):
+				cells[(y - top) // TILE_SIZE * cols + (x - left) // TILE_SIZE] = tile_id
+			arrays = [cells]
+			layouts.append({'name': name, 'encoding': 'dense', 'offset': offset, 'left': left, 'top': top, 'cols': cols, 'rows': rows})
+		else:
+			arrays = [array('i', [x for x, y in layer]), array('i', [y for x, y in layer]), array('H', ids)]
+			layouts.append({'name': name, 'encoding': 'sparse', 'offset': offset, 'count': len(layer)})
+
+		for data in arrays:
+			data = data.tobytes()
+			data += bytes(-len(data) % 4) # keep the arrays aligned
+			parts.append(data)
+			offset += len(data)
+
+	header = json.dumps({
+		'info': info,
+		'byteorder': sys.byteorder,
+		'palette': list(palette),
+		'layers': layouts
+	}).encode()
+	return HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, len(header)) + header + zlib.compress(b''.join(parts))
+
+def read_header(data, file_magic = LEVEL_MAGIC, file_version = LEVEL_VERSION):
+	magic, version, header_length = HEADER.unpack_from(data)
+	if magic != file_magic or version != file_version:
+		raise ValueError(f"not a {file_magic.decode()} file of version {file_version}")
+	return json.loads(bytes(data[HEADER.size:HEADER.size + header_length])), HEADER.size + header_length
+
+def get_array(payload, typecode, offset, count, swap):
+	"""Typed view of the payload (a copy if the byte order differs), returns it and the next offset"""
+	length = count * array(typecode).itemsize
+	view = payload[offset:offset + length]
+	if swap:
+		values = array(typecode, view.tobytes())
+		values.byteswap()
+	else:
+		values = view.cast(typecode)
+	return values, offset + length + (-length % 4)
+
+def decode_level(data):
+	"""
+	Unpack a binary level
+
+	Args:
+		data (bytes): File contents
+
+	Returns:
+		tuple: (info dict, level grid)
+	"""
+	header, start = read_header(data)
+	payload = memoryview(zlib.decompress(memoryview(data)[start:]))
+	swap = header['byteorder'] != sys.byteorder
+	palette = header['palette']
+
+	grid = {}
+	for layout in header['layers']:
+		if layout['encoding'] == 'dense':
+			left, top, cols = layout['left'], layout['top'], layout['cols']
+			cells, offset = get_array(payload, 'H', layout['offset'], cols * layout['rows'], swap)
+			grid[layout['name']] = {
+				(left + index % cols * TILE_SIZE, top + index // cols * TILE_SIZE): palette[tile_id - 1]
+				for index, tile_id in enumerate(cells) if tile_id}
+		else:
+			count = layout['count']
+			xs, offset = get_array(payload, 'i', layout['offset'], count, swap)
+			ys, offset = get_array(payload, 'i', offset, count, swap)
+			ids, offset = get_array(payload, 'H', offset, count, swap)
+			grid[layout['name']] = {(x, y): palette[tile_id - 1] for x, y, tile_id in zip(xs, ys, ids)}
+	return header['info'], grid
+
+def split_grid(grid):
+	"""
+	Sort the tiles of a level grid into chunks of CHUNK_TILES x CHUNK_TILES tiles
+
+	Args:
+		grid (dict): layer name -> {(x, y): tile value}
+
+	Returns:
+		tuple: (fixed tiles as a grid, (cx, cy) -> grid of the chunk), the fixed tiles
+		(player and sky handle) are in no chunk
+	"""
+	chunk_size = CHUNK_TILES * TILE_SIZE
+	fixed = {name: {} for name in grid}
+	chunks = {}
+	for name, layer in grid.items():
+		for (x, y), value in layer.items():
+			if value in FIXED_TILES:
+				fixed[name][(x, y)] = value
+			else:
+				chunks.setdefault((x // chunk_size, y // chunk_size), {}).setdefault(name, {})[(x, y)] = value
+	return fixed, chunks
+
+def encode_chunked_level(grid, info):
+	"""
+	Pack a level grid into the chunked format read by ChunkedLevel
+
+	Args:
+		grid (dict): layer name -> {(x, y): tile value}
+		info (dict): Level name, timestamp
+
+	Returns:
+		bytes: File contents
+	"""
+	fixed, chunks = split_grid(grid)
+	nav_graph = NavGraph(grid)
+	nav_chunks = nav_graph.get_chunk_segments()
+
+	palette = {}
+	directory = []
+	blocks = []
+	offset = 0
+	for cx, cy in sorted(chunks.keys() | nav_chunks.keys()):
+		layers = chunks.get((cx, cy), {})
+		arrays = [array('I', [len(layers.get(name, ())) for name in grid])]
+		for name, layer in layers.items():
+			arrays += [array('i', [x for x, y in layer]), array('i', [y for x, y in layer]), array('H', [palette.setdefault(value, len(palette)) + 1 for value in layer.values()])]
+
+		# the part of the navigation graph the enemies of the chunk walk on
+		nav = nav_graph.get_subgraph(nav_chunks.get((cx, cy), ()))
+		arrays += [array('I', [len(nav.segment_rows), len(nav.link_targets)])] + nav.to_arrays()
+
+		parts = []
+		for data in arrays:
+			data = data.tobytes()
+			parts.append(data + bytes(-len(data) % 4))
+		block = zlib.compress(b''.join(parts))
+		directory.append(CHUNK_ENTRY.pack(cx, cy, offset, len(block)))
+		blocks.append(block)
+		offset += len(block)
+
+	header = json.dumps({
+		'info': info,
+		'byteorder': sys.byteorder,
+		'palette': list(palette),
+		'layers': list(grid),
+		'counts': {name: len(layer) for name, layer in grid.items()},
+		'terrain_right': max((x for x, y in grid.get('terrain', ())), default = 0),
+		'fixed': [[name, x, y, value] for name, layer in fixed.items() for (x, y), value in layer.items()],
+		'chunk_count': len(directory)
+	}).encode()
+	return HEADER.pack(CHUNK_MAGIC, CHUNK_VERSION, len(header)) + header + b''.join(directory) + b''.join(blocks)
+
+class ChunkedLevel:
+	"""
+	Chunked level, read one chunk at a time from a buffer (the mapped file, see
+	open). Only the header is parsed up front, chunks are found by a binary search
+	of the directory.
+	"""
+	def __init__(self, data):
+		self.data = data
+		header, start = read_header(data, CHUNK_MAGIC, CHUNK_VERSION)
+		self.info = header['info']
+		self.swap = header['byteorder'] != sys.byteorder
+		self.palette = header['palette']
+		self.layers = header['layers']
+		self.counts = header['counts']
+		self.terrain_right = header['terrain_right']
+		self.chunk_count = header['chunk_count']
+		self.directory_start = start
+		self.blocks_start = start + self.chunk_count * CHUNK_ENTRY.size
+
+		self.fixed = {name: {} for name in self.layers}
+		for name, x, y, value in header['fixed']:
+			self.fixed[name][(x, y)] = value
+
+	@classmethod
+	def open(cls, path):
+		with open(path, 'rb') as f:
+			return cls(mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ))
+
+	def get_id(self):
+		"""
+		Checksum of the header and the chunk directory (plus the data size), tells apart
+		the levels of autosave journals without reading the chunk blocks
+		"""
+		return zlib.crc32(self.data[:self.blocks_start], len(self.data))
+
+	def get_entry(self, index):
+		return CHUNK_ENTRY.unpack_from(self.data, self.directory_start + index * CHUNK_ENTRY.size)
+
+	def find_chunk(self, key):
+		"""(offset, length) of a chunk block, None for empty chunks"""
+		low, high = 0, self.chunk_count
+		while low < high:
+			middle = (low + high) // 2
+			cx, cy, offset, length = self.get_entry(middle)
+			if (cx, cy) == key:
+				return self.blocks_start + offset, length
+			if (cx, cy) < key:
+				low = middle + 1
+			else:
+				high = middle
+		return None
+
+	def read_chunk(self, key):
+		"""
+		One chunk of the level
+
+		Args:
+			key (tuple): (cx, cy)
+
+		Returns:
+			tuple: (grid of the chunk, NavGraph the enemies of the chunk walk on), None if the chunk is empty
+		"""
+		location = self.find_chunk(key)
+		if location is None:
+			return None
+		offset, length = location
+		payload = memoryview(zlib.decompress(self.data[offset:offset + length]))
+
+		counts, offset = get_array(payload, 'I', 0, len(self.layers), self.swap)
+		grid = {}
+		for name, count in zip(self.layers, counts):
+			if not count:
+				continue
+			xs, offset = get_array(payload, 'i', offset, count, self.swap)
+			ys, offset = get_array(payload, 'i', offset, count, self.swap)
+			ids, offset = get_array(payload, 'H', offset, count, self.swap)
+			grid[name] = {(x, y): self.palette[tile_id - 1] for x, y, tile_id in zip(xs, ys, ids)}
+
+		(segments, links), offset = get_array(payload, 'I', offset, 2, self.swap)
+		nav = []
+		for typecode, count in (('i', segments), ('i', segments), ('i', segments), ('i', segments), ('i', segments + 1), ('i', links), ('b', links)):
+			values, offset = get_array(payload, typecode, offset, count, self.swap)
+			nav.append(values)
+		return grid, NavGraph.from_arrays(*nav)
+
+	def get_chunk_keys(self, rect):
+		"""Keys of the chunks overlapping a pixel rect (pygame.Rect)"""
+		chunk_size = CHUNK_TILES * TILE_SIZE
+		return {
+			(cx, cy)
+			for cx in range(rect.left // chunk_size, (rect.right - 1) // chunk_size + 1)
+			for cy in range(rect.top // chunk_size, (rect.bottom - 1) // chunk_size + 1)}
+
+class GridLevel:
+	"""
+	Level grid in memory read like a ChunkedLevel (the editor's level and decoded
+	saves): the tiles are sorted into chunks and the navigation graph is built
+	once, without packing the level
+	"""
+	def __init__(self, grid, info = None):
+		self.grid = grid
+		self.info = info or {}
+		self.layers = list(grid)
+		self.counts = {name: len(layer) for name, layer in grid.items()}
+		self.terrain_right = max((x for x, y in grid.get('terrain', ())), default = 0)
+		self.fixed, self.chunks = split_grid(grid)
+		self.nav_graph = NavGraph(grid)
+		self.nav_chunks = self.nav_graph.get_chunk_segments()
+
+	def get_id(self):
+		"""Checksum of the tiles, the same whatever order they were placed in"""
+		checksum = 0
+		for name in sorted(self.grid):
+			checksum = zlib.crc32(repr((name, sorted(self.grid[name].items()))).encode(), checksum)
+		return checksum
+
+	def read_chunk(self, key):
+		"""(grid of the chunk, NavGraph the enemies of the chunk walk on), None if the chunk is empty"""
+		if key not in self.chunks and key not in self.nav_chunks:
+			return None
+		return self.chunks.get(key, {}), self.nav_graph.get_subgraph(self.nav_chunks.get(key, ()))
+
+	get_chunk_keys = ChunkedLevel.get_chunk_keys
+
+def is_level_file(path, magic = LEVEL_MAGIC):
+	with open(path, 'rb') as f:
+		return f.read(len(magic)) == magic
+
+def read_level_info(path):
+	"""Only the info of a level file (name, timestamp), without unpacking the layers"""
+	with open(path, 'rb') as f:
+		data = f.read(HEADER.size)
+		magic, version, header_length = HEADER.unpack(data)
+		return read_header(data + f.read(header_length))[0]['info']
+
+def load_level_file(path):
+	with open(path, 'rb') as f:
+		return decode_level(f.read())
+
+# JSON (the previous save format), kept for import and export
+def grid_to_json(grid):
+	"""Level grid with "x,y" string keys"""
+	return {name: {f'{x},{y}': value for (x, y), value in layer.items()} for name, layer in grid.items()}
+
+def grid_from_json(data):
+	grid = {}
+	for name, layer in data.items():
+		grid[name] = {}
+		for key, value in layer.items():
+			x, y = map(int, key.split(','))
+			grid[name][(x, y)] = value
+	return grid
+
+def import_json(path):
+	"""Read a JSON level save, returns (info, grid)"""
+	with open(path, 'r') as f:
+		data = json.load(f)
+	info = {key: value for key, value in data.items() if key != 'level_data'}
+	return info, grid_from_json(data['level_data'])
+
+def export_json(path, grid, info):
+	with open(path, 'w') as f:
+		json.dump({**info, 'level_data': grid_to_json(grid)}, f, indent=4)
+
+if __name__ == '__main__':
+	# python level_format.py <source> <destination>, converts between .json and .lvl, or to .lvc (chunked)
+	source, destination = sys.argv[1:3]
+	info, grid = load_level_file(source) if is_level_file(source) else import_json(source)
+	if destination.endswith(LEVEL_EXTENSION):
+		with open(destination, 'wb') as f:
+			f.write(encode_level(grid, info))
+	elif destination.endswith(CHUNK_EXTENSION):
+		with open(destination, 'wb') as f:
+			f.write(encode_chunked_level(grid, info))
+	else:
+		export_json(destination, grid, info)
+	print(f"Converted {source} to {destination}")
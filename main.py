@@ -3,21 +3,27 @@ from pygame.math import Vector2 as vector
 from settings import *
 from support import *
 
-from pygame.image import load
-
 from editor import Editor
 from level import Level
 from main_menu import MainMenu
+from assets import AssetManager
+from bundle import AssetBundle
+from music import MusicPlayer
+from sfx import SoundEffects
+from render import create_backend, get_surface, mark_drawn, present
 
-from os import walk
 import sys
+import json
 
 class Main:
 	def __init__(self):
+		pygame.mixer.pre_init(buffer = self.get_setting('audio_buffer', MIXER_BUFFER))
 		pygame.init()
-		pygame.display.set_caption('PyRush - 2D Platformer')
-		self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+		self.display_surface = create_backend('PyRush - 2D Platformer', self.get_setting('render_scale', RENDER_SCALE)).surface
 		self.clock = pygame.time.Clock()
+		self.loading_font = pygame.font.Font(None, 48)
+		self.loading_percent = None # last drawn progress of the loading screen
+		self.assets = AssetManager(AssetBundle())
 		self.imports()
 
 		# Game states: 'menu', 'editor', 'level'
@@ -26,6 +32,7 @@ class Main:
 		
 		# Initialize menu first
 		self.main_menu = MainMenu(self.switch_to_editor, self.switch_to_level, self.quit_game)
+		self.music = MusicPlayer(self.main_menu.get_volumes()['music'])
 		
 		# Editor and level will be initialized when needed
 		self.editor = None
@@ -34,40 +41,27 @@ class Main:
 		# Default cursor (will change in editor)
 		pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
 
-	def imports(self):
-		# terrain
-		self.land_tiles = import_folder_dict('graphics/terrain/land')
-		self.water_bottom = load('graphics/terrain/water/water_bottom.png').convert_alpha()
-		self.water_top_animation = import_folder('graphics/terrain/water/animation')
-
-		# coins
-		self.gold = import_folder('graphics/items/gold')
-		self.silver = import_folder('graphics/items/silver')
-		self.diamond = import_folder('graphics/items/diamond')
-		self.particle = import_folder('graphics/items/particle')
-
-		# palm trees
-		self.palms = {folder: import_folder(f'graphics/terrain/palm/{folder}') for folder in list(walk('graphics/terrain/palm'))[0][1]}
+	def get_setting(self, key, default):
+		"""
+		Optional integer setting from game_settings.json, read before pygame starts:
+		audio_buffer (mixer buffer size, smaller values lower the latency of sound effects)
+		and render_scale (see RENDER_SCALE)
+		"""
+		try:
+			with open('game_settings.json', 'r') as f:
+				return int(json.load(f).get(key, default))
+		except (OSError, ValueError, TypeError):
+			return default
 
-		# enemies
-		self.spikes = load('graphics/enemies/spikes/spikes.png').convert_alpha()
-		self.tooth = {folder: import_folder(f'graphics/enemies/tooth/{folder}') for folder in list(walk('graphics/enemies/tooth'))[0][1]}
-		self.shell = {folder: import_folder(f'graphics/enemies/shell_left/{folder}') for folder in list(walk('graphics/enemies/shell_left/'))[0][1]}
-		self.pearl = load('graphics/enemies/pearl/pearl.png').convert_alpha()
-
-		# player
-		self.player_graphics = {folder: import_folder(f'graphics/player/{folder}') for folder in list(walk('graphics/player/'))[0][1]}
-
-		# clouds
-		self.clouds = import_folder('graphics/clouds')
+	def imports(self):
+		# graphics are loaded per game state by the asset manager
 
 		# sounds
-		self.level_sounds = {
-			'coin': pygame.mixer.Sound('audio/coin.wav'),
-			'hit': pygame.mixer.Sound('audio/hit.wav'),
-			'jump': pygame.mixer.Sound('audio/jump.wav'),
-			'music': pygame.mixer.Sound('audio/SuperHero.ogg'),
-		}
+		self.sfx = SoundEffects({
+			'coin': self.assets.sound('audio/coin.wav'),
+			'hit': self.assets.sound('audio/hit.wav'),
+			'jump': self.assets.sound('audio/jump.wav'),
+		})
 		# Initial volume will be set when switching to level
 
 	def toggle(self):
@@ -77,7 +71,7 @@ class Main:
 		elif self.game_state == 'level':
 			self.game_state = 'editor'
 			if self.editor:
-				self.editor.editor_music.play()
+				self.music.play('editor')
 	
 	def switch_to_menu(self):
 		"""Return to main menu"""
@@ -85,23 +79,29 @@ class Main:
 		pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
 		# Update volumes in case they were changed
 		self.update_volumes()
+		self.main_menu.prefetch_start_level()
+
+		# The level is rebuilt when it is started again
+		if self.level:
+			self.assets.release('level')
+			self.level = None
 	
 	def switch_to_editor(self):
 		"""Switch to level editor"""
 		if not self.editor:
-			self.editor = Editor(self.land_tiles, self.switch, self.switch_to_menu)
+			editor_assets = self.assets.acquire('editor', self.draw_loading)
+			self.editor = Editor(editor_assets, self.switch, self.music, self.switch_to_menu)
 			# Set custom cursor for editor
-			surf = load('graphics/cursors/mouse.png').convert_alpha()
-			cursor = pygame.cursors.Cursor((0,0), surf)
+			cursor = pygame.cursors.Cursor((0,0), editor_assets['cursor'])
 			pygame.mouse.set_cursor(cursor)
 		
 		# Always apply volume settings (in case they changed in settings)
 		volumes = self.main_menu.get_volumes()
-		self.editor.editor_music.set_volume(volumes['music'])
+		self.music.set_volume(volumes['music'])
 		
 		self.game_state = 'editor'
 		if self.editor:
-			self.editor.editor_music.play()
+			self.music.play('editor')
 	
 	def switch_to_level(self, grid=None):
 		"""Switch to gameplay level"""
@@ -110,33 +110,49 @@ class Main:
 			volumes = self.main_menu.get_volumes()
 			
 			# Apply volume to sound effects
-			self.level_sounds['coin'].set_volume(volumes['sfx'])
-			self.level_sounds['hit'].set_volume(volumes['sfx'])
-			self.level_sounds['jump'].set_volume(volumes['sfx'])
-			self.level_sounds['music'].set_volume(volumes['music'])
+			self.sfx.set_volume(volumes['sfx'])
+			self.music.set_volume(volumes['music'])
 			
-			self.level = Level(
-				grid, 
-				self.switch,{
-					'land': self.land_tiles,
-					'water bottom': self.water_bottom,
-					'water top': self.water_top_animation,
-					'gold': self.gold,
-					'silver': self.silver,
-					'diamond': self.diamond,
-					'particle': self.particle,
-					'palms': self.palms,
-					'spikes': self.spikes,
-					'tooth': self.tooth,
-					'shell': self.shell,
-					'player': self.player_graphics,
-					'pearl': self.pearl,
-					'clouds': self.clouds},
-				self.level_sounds,
-				return_to_menu=self.switch_to_menu)
+			self.create_level(grid)
 		self.game_state = 'level'
 		pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
 	
+	def create_level(self, grid):
+		"""Create a new level, the previous level's graphics are released afterwards"""
+		asset_dict = self.assets.acquire('level', self.draw_loading)
+		if self.level:
+			self.assets.release('level')
+
+		self.level = Level(
+			grid, 
+			self.switch,
+			asset_dict,
+			self.sfx,
+			self.music,
+			return_to_menu=self.switch_to_menu)
+
+	def draw_loading(self, loaded, total):
+		"""Loading screen, called by the asset manager while it decodes files"""
+		# only redrawn when the percentage changes, the callback runs once per decoded file
+		percent = loaded * 100 // total
+		if loaded > 1 and percent == self.loading_percent:
+			return
+		self.loading_percent = percent
+
+		pygame.event.pump()
+		self.display_surface.fill((20, 30, 50))
+
+		text_surf = self.loading_font.render('Loading...', True, (255, 215, 0))
+		self.display_surface.blit(text_surf, text_surf.get_rect(center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 50)))
+
+		bar_rect = pygame.Rect(0, 0, 400, 30)
+		bar_rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 10)
+		fill_rect = bar_rect.copy()
+		fill_rect.width = int(bar_rect.width * loaded / total)
+		pygame.draw.rect(self.display_surface, (100, 150, 100), fill_rect)
+		pygame.draw.rect(self.display_surface, (180, 180, 180), bar_rect, 3)
+		present()
+
 	def quit_game(self):
 		"""Quit the game"""
 		pygame.quit()
@@ -146,21 +162,11 @@ class Main:
 		"""Update volume for all active audio based on menu settings"""
 		volumes = self.main_menu.get_volumes()
 		
-		# Update editor music if editor exists
-		if self.editor:
-			self.editor.editor_music.set_volume(volumes['music'])
-		
-		# Update level sounds
-		self.level_sounds['coin'].set_volume(volumes['sfx'])
-		self.level_sounds['hit'].set_volume(volumes['sfx'])
-		self.level_sounds['jump'].set_volume(volumes['sfx'])
-		self.level_sounds['music'].set_volume(volumes['music'])
+		# Update music
+		self.music.set_volume(volumes['music'])
 		
-		# Update level audio if level exists
-		if self.level:
-			self.level.bg_music.set_volume(volumes['music'])
-			self.level.coin_sound.set_volume(volumes['sfx'])
-			self.level.hit_sound.set_volume(volumes['sfx'])
+		# Update sound effects
+		self.sfx.set_volume(volumes['sfx'])
 
 	def switch(self, grid = None):
 		"""Switch between editor and level with transition effect"""
@@ -168,55 +174,39 @@ class Main:
 		if grid:
 			# Get volume settings from menu and apply to sounds
 			volumes = self.main_menu.get_volumes()
-			self.level_sounds['coin'].set_volume(volumes['sfx'])
-			self.level_sounds['hit'].set_volume(volumes['sfx'])
-			self.level_sounds['jump'].set_volume(volumes['sfx'])
-			self.level_sounds['music'].set_volume(volumes['music'])
+			self.sfx.set_volume(volumes['sfx'])
+			self.music.set_volume(volumes['music'])
 			
 			# Pass return_to_menu callback when creating level
-			self.level = Level(
-				grid, 
-				self.switch,{
-					'land': self.land_tiles,
-					'water bottom': self.water_bottom,
-					'water top': self.water_top_animation,
-					'gold': self.gold,
-					'silver': self.silver,
-					'diamond': self.diamond,
-					'particle': self.particle,
-					'palms': self.palms,
-					'spikes': self.spikes,
-					'tooth': self.tooth,
-					'shell': self.shell,
-					'player': self.player_graphics,
-					'pearl': self.pearl,
-					'clouds': self.clouds},
-				self.level_sounds,
-				return_to_menu=self.switch_to_menu)
+			self.create_level(grid)
 
 	def run(self):
 		while True:
 			dt = self.clock.tick() / 1000
+			self.music.update()
 			
 			# Handle different game states
 			if self.game_state == 'menu':
 				self.main_menu.run(dt)
 			elif self.game_state == 'editor':
 				if self.editor:
+					self.editor.timers.update(dt)
 					self.editor.run(dt)
 			elif self.game_state == 'level':
 				if self.level:
+					self.level.timers.update(dt)
 					result = self.level.run(dt)
 					if result == 'menu':
 						self.switch_to_menu()
 			
+			self.sfx.update()
 			self.transition.display(dt)
-			pygame.display.update()
+			present()
 
 
 class Transition:
 	def __init__(self, toggle):
-		self.display_surface = pygame.display.get_surface()
+		self.display_surface = get_surface()
 		self.toggle = toggle
 		self.active = False
 
@@ -237,7 +227,7 @@ class Transition:
 				self.active = False
 				self.border_width = 0
 				self.direction = 1
-			pygame.draw.circle(self.display_surface, 'black',self.center, self.radius, int(self.border_width))
+			mark_drawn(pygame.draw.circle(self.display_surface, 'black',self.center, self.radius, int(self.border_width)))
 
 if __name__ == '__main__':
 	main = Main()
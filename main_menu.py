@@ -1,17 +1,19 @@
 import pygame
 from settings import *
-from save_manager import SaveManager
+from save_manager import create_save_manager
+from render import get_backend, render_text
+from level_format import LEVEL_EXTENSION, CHUNK_EXTENSION, ChunkedLevel, load_level_file, grid_from_json
 from os.path import exists
 import json
 from pathlib import Path
 
 class MainMenu:
 	def __init__(self, switch_to_editor, switch_to_level, quit_game):
-		self.display_surface = pygame.display.get_surface()
+		self.backend = get_backend()
 		self.switch_to_editor = switch_to_editor
 		self.switch_to_level = switch_to_level
 		self.quit_game = quit_game
-		self.save_manager = SaveManager()
+		self.save_manager = create_save_manager()
 		
 		# Menu options
 		self.menu_options = [
@@ -28,6 +30,7 @@ class MainMenu:
 		self.title_font = pygame.font.Font(None, 85)
 		self.option_font = pygame.font.Font(None, 48)
 		self.subtitle_font = pygame.font.Font(None, 32)
+		self.control_font = pygame.font.Font(None, 24)
 		
 		# Colors
 		self.bg_color = (20, 30, 50)
@@ -53,6 +56,11 @@ class MainMenu:
 		self.settings_option = 0  # For sound controls: 0=music, 1=sfx
 		self.load_settings()
 		self.apply_volume_settings()
+		self.prefetch_start_level()
+	
+	def prefetch_start_level(self):
+		"""Load the 'Start Game' level in the background while the player looks at the menu"""
+		self.save_manager.prefetch_level(0)
 		
 	def handle_input(self):
 		keys = pygame.key.get_pressed()
@@ -85,11 +93,7 @@ class MainMenu:
 			
 		if self.submenu_type == 'saved_levels':
 			# Get available save slots
-			available_slots = []
-			for i in range(3):
-				slot_data = self.save_manager.get_slot_info(i)
-				if slot_data:
-					available_slots.append(i)
+			available_slots = self.save_manager.get_used_slots()
 			
 			if not available_slots:
 				if key == pygame.K_RETURN:
@@ -229,15 +233,15 @@ class MainMenu:
 		
 		# Title
 		title_text = "PyRush"
-		title_surf = self.title_font.render(title_text, True, self.title_color)
+		title_surf = render_text(self.title_font, title_text, self.title_color)
 		title_rect = title_surf.get_rect(center=(WINDOW_WIDTH // 2, 110))
-		self.display_surface.blit(title_surf, title_rect)
+		self.backend.blit(title_surf, title_rect)
 		
 		# Subtitle
 		subtitle_text = "2D Platformer Adventure"
-		subtitle_surf = self.subtitle_font.render(subtitle_text, True, self.normal_color)
+		subtitle_surf = render_text(self.subtitle_font, subtitle_text, self.normal_color)
 		subtitle_rect = subtitle_surf.get_rect(center=(WINDOW_WIDTH // 2, 160))
-		self.display_surface.blit(subtitle_surf, subtitle_rect)
+		self.backend.blit(subtitle_surf, subtitle_rect)
 		
 		# Menu options
 		start_y = 240
@@ -254,62 +258,59 @@ class MainMenu:
 				y_offset = 0
 				prefix = "  "
 			
-			option_surf = self.option_font.render(prefix + option, True, color)
+			option_surf = render_text(self.option_font, prefix + option, color)
 			option_rect = option_surf.get_rect(center=(WINDOW_WIDTH // 2, start_y + i * spacing + y_offset))
-			self.display_surface.blit(option_surf, option_rect)
+			self.backend.blit(option_surf, option_rect)
 			
 		# Controls hint
 		hint_text = "↑↓ Navigate  |  Enter: Select  |  ESC: Quit"
-		hint_surf = self.subtitle_font.render(hint_text, True, self.normal_color)
+		hint_surf = render_text(self.subtitle_font, hint_text, self.normal_color)
 		hint_rect = hint_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT - 50))
-		self.display_surface.blit(hint_surf, hint_rect)
+		self.backend.blit(hint_surf, hint_rect)
 		
 	def draw_saved_levels_submenu(self):
 		# Semi-transparent overlay
-		overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-		overlay.fill((0, 0, 0))
-		overlay.set_alpha(180)
-		self.display_surface.blit(overlay, (0, 0))
+		self.backend.fill((0, 0, 0, 180))
 		
 		# Title
 		title_text = "Saved Levels"
-		title_surf = self.title_font.render(title_text, True, self.title_color)
+		title_surf = render_text(self.title_font, title_text, self.title_color)
 		title_rect = title_surf.get_rect(center=(WINDOW_WIDTH // 2, 100))
-		self.display_surface.blit(title_surf, title_rect)
+		self.backend.blit(title_surf, title_rect)
 		
-		# List saved levels
-		available_slots = []
+		# List saved levels (only the ones around the selection fit on screen)
+		available_slots = self.save_manager.get_used_slots()
+		first = max(0, min(self.submenu_selected - 2, len(available_slots) - 5))
+		visible_slots = available_slots[first:first + 5]
 		slot_info = []
 		
-		for i in range(3):
-			slot_data = self.save_manager.get_slot_info(i)
-			if slot_data:
-				available_slots.append(i)
-				timestamp = slot_data.get('timestamp', 'Unknown')
-				# Format timestamp
-				if timestamp != 'Unknown':
-					from datetime import datetime
-					dt = datetime.fromisoformat(timestamp)
-					timestamp = dt.strftime('%Y-%m-%d %H:%M')
-				slot_info.append(f"Slot {i + 1}: {timestamp}")
+		for i in visible_slots:
+			slot_data = self.save_manager.get_slot_info(i) or {}
+			timestamp = slot_data.get('timestamp', 'Unknown')
+			# Format timestamp
+			if timestamp != 'Unknown':
+				from datetime import datetime
+				dt = datetime.fromisoformat(timestamp)
+				timestamp = dt.strftime('%Y-%m-%d %H:%M')
+			slot_info.append(f"Slot {i + 1}: {timestamp}")
 		
 		if not available_slots:
 			# No saved levels
 			text = "No saved levels found"
-			surf = self.option_font.render(text, True, self.normal_color)
+			surf = render_text(self.option_font, text, self.normal_color)
 			rect = surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
-			self.display_surface.blit(surf, rect)
+			self.backend.blit(surf, rect)
 			
 			hint_text = "Press Enter or ESC to go back"
-			hint_surf = self.subtitle_font.render(hint_text, True, self.normal_color)
+			hint_surf = render_text(self.subtitle_font, hint_text, self.normal_color)
 			hint_rect = hint_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT - 50))
-			self.display_surface.blit(hint_surf, hint_rect)
+			self.backend.blit(hint_surf, hint_rect)
 		else:
 			# Display available slots
 			start_y = 250
 			spacing = 80
 			
-			for i, info in enumerate(slot_info):
+			for i, info in enumerate(slot_info, first):
 				if i == self.submenu_selected:
 					color = self.selected_color
 					prefix = "> "
@@ -317,15 +318,22 @@ class MainMenu:
 					color = self.normal_color
 					prefix = "  "
 				
-				surf = self.option_font.render(prefix + info, True, color)
-				rect = surf.get_rect(center=(WINDOW_WIDTH // 2, start_y + i * spacing))
-				self.display_surface.blit(surf, rect)
+				surf = render_text(self.option_font, prefix + info, color)
+				rect = surf.get_rect(center=(WINDOW_WIDTH // 2, start_y + (i - first) * spacing))
+				self.backend.blit(surf, rect)
+				
+				# Thumbnail, loaded in the background when the row is first shown
+				thumbnail = self.save_manager.get_thumbnail(visible_slots[i - first])
+				if thumbnail:
+					thumb_rect = thumbnail.get_rect(midleft=(rect.right + 30, rect.centery))
+					self.backend.blit(thumbnail, thumb_rect)
+					self.backend.draw_rect(color, thumb_rect, 1)
 			
 			# Controls hint
 			hint_text = "↑↓ Navigate  |  Enter: Load  |  DEL/D: Delete  |  ESC: Back"
-			hint_surf = self.subtitle_font.render(hint_text, True, self.normal_color)
+			hint_surf = render_text(self.subtitle_font, hint_text, self.normal_color)
 			hint_rect = hint_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT - 50))
-			self.display_surface.blit(hint_surf, hint_rect)
+			self.backend.blit(hint_surf, hint_rect)
 			
 	def draw_settings_submenu(self):
 		"""Draw settings menu based on current mode"""
@@ -339,16 +347,13 @@ class MainMenu:
 	def draw_settings_main(self):
 		"""Draw main settings menu with options"""
 		# Semi-transparent overlay
-		overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-		overlay.fill((0, 0, 0))
-		overlay.set_alpha(180)
-		self.display_surface.blit(overlay, (0, 0))
+		self.backend.fill((0, 0, 0, 180))
 		
 		# Title
 		title_text = "Settings"
-		title_surf = self.title_font.render(title_text, True, self.title_color)
+		title_surf = render_text(self.title_font, title_text, self.title_color)
 		title_rect = title_surf.get_rect(center=(WINDOW_WIDTH // 2, 120))
-		self.display_surface.blit(title_surf, title_rect)
+		self.backend.blit(title_surf, title_rect)
 		
 		# Game info
 		info_items = [
@@ -359,9 +364,9 @@ class MainMenu:
 		
 		info_y = 210
 		for item in info_items:
-			surf = self.subtitle_font.render(item, True, self.normal_color)
+			surf = render_text(self.subtitle_font, item, self.normal_color)
 			rect = surf.get_rect(center=(WINDOW_WIDTH // 2, info_y))
-			self.display_surface.blit(surf, rect)
+			self.backend.blit(surf, rect)
 			info_y += 35
 		
 		# Settings options
@@ -377,29 +382,26 @@ class MainMenu:
 				color = self.normal_color
 				prefix = "  "
 			
-			surf = self.option_font.render(prefix + option, True, color)
+			surf = render_text(self.option_font, prefix + option, color)
 			rect = surf.get_rect(center=(WINDOW_WIDTH // 2, start_y + i * spacing))
-			self.display_surface.blit(surf, rect)
+			self.backend.blit(surf, rect)
 		
 		# Instructions
 		hint_text = "↑↓: Navigate  |  Enter: Select  |  ESC: Back"
-		hint_surf = self.subtitle_font.render(hint_text, True, self.normal_color)
+		hint_surf = render_text(self.subtitle_font, hint_text, self.normal_color)
 		hint_rect = hint_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT - 50))
-		self.display_surface.blit(hint_surf, hint_rect)
+		self.backend.blit(hint_surf, hint_rect)
 	
 	def draw_sound_controls(self):
 		"""Draw sound control sliders"""
 		# Semi-transparent overlay
-		overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-		overlay.fill((0, 0, 0))
-		overlay.set_alpha(180)
-		self.display_surface.blit(overlay, (0, 0))
+		self.backend.fill((0, 0, 0, 180))
 		
 		# Title
 		title_text = "Settings"
-		title_surf = self.title_font.render(title_text, True, self.title_color)
+		title_surf = render_text(self.title_font, title_text, self.title_color)
 		title_rect = title_surf.get_rect(center=(WINDOW_WIDTH // 2, 100))
-		self.display_surface.blit(title_surf, title_rect)
+		self.backend.blit(title_surf, title_rect)
 		
 		# Game info
 		info_items = [
@@ -410,15 +412,15 @@ class MainMenu:
 		
 		info_y = 180
 		for item in info_items:
-			surf = self.subtitle_font.render(item, True, self.normal_color)
+			surf = render_text(self.subtitle_font, item, self.normal_color)
 			rect = surf.get_rect(center=(WINDOW_WIDTH // 2, info_y))
-			self.display_surface.blit(surf, rect)
+			self.backend.blit(surf, rect)
 			info_y += 40
 		
 		# Volume controls section
-		volume_title = self.option_font.render("Sound Controls", True, self.title_color)
+		volume_title = render_text(self.option_font, "Sound Controls", self.title_color)
 		volume_title_rect = volume_title.get_rect(center=(WINDOW_WIDTH // 2, 340))
-		self.display_surface.blit(volume_title, volume_title_rect)
+		self.backend.blit(volume_title, volume_title_rect)
 		
 		# Music volume slider
 		self.draw_volume_slider("Music Volume", self.music_volume, 420, self.settings_option == 0)
@@ -433,9 +435,9 @@ class MainMenu:
 		
 		instr_y = WINDOW_HEIGHT - 60
 		for instr in instructions:
-			surf = self.subtitle_font.render(instr, True, self.normal_color)
+			surf = render_text(self.subtitle_font, instr, self.normal_color)
 			rect = surf.get_rect(center=(WINDOW_WIDTH // 2, instr_y))
-			self.display_surface.blit(surf, rect)
+			self.backend.blit(surf, rect)
 			instr_y += 35
 	
 	def draw_volume_slider(self, label, volume, y_pos, selected):
@@ -443,9 +445,9 @@ class MainMenu:
 		# Label
 		color = self.selected_color if selected else self.normal_color
 		prefix = "> " if selected else "  "
-		label_surf = self.option_font.render(prefix + label, True, color)
+		label_surf = render_text(self.option_font, prefix + label, color)
 		label_rect = label_surf.get_rect(center=(WINDOW_WIDTH // 2, y_pos))
-		self.display_surface.blit(label_surf, label_rect)
+		self.backend.blit(label_surf, label_rect)
 		
 		# Slider bar
 		bar_width = 400
@@ -454,39 +456,36 @@ class MainMenu:
 		bar_y = y_pos + 40
 		
 		# Background
-		pygame.draw.rect(self.display_surface, (60, 60, 60),
+		self.backend.draw_rect((60, 60, 60),
 						(bar_x, bar_y, bar_width, bar_height))
 		
 		# Fill (volume level)
 		fill_width = int(bar_width * volume)
 		fill_color = self.selected_color if selected else (100, 150, 100)
-		pygame.draw.rect(self.display_surface, fill_color,
+		self.backend.draw_rect(fill_color,
 						(bar_x, bar_y, fill_width, bar_height))
 		
 		# Border
 		border_color = self.selected_color if selected else self.normal_color
-		pygame.draw.rect(self.display_surface, border_color,
+		self.backend.draw_rect(border_color,
 						(bar_x, bar_y, bar_width, bar_height), 3)
 		
 		# Percentage text
 		percent_text = f"{int(volume * 100)}%"
-		percent_surf = self.subtitle_font.render(percent_text, True, (255, 255, 255))
+		percent_surf = render_text(self.subtitle_font, percent_text, (255, 255, 255))
 		percent_rect = percent_surf.get_rect(center=(WINDOW_WIDTH // 2, bar_y + bar_height // 2))
-		self.display_surface.blit(percent_surf, percent_rect)
+		self.backend.blit(percent_surf, percent_rect)
 	
 	def draw_controls_reference(self):
 		"""Draw comprehensive controls reference"""
 		# Semi-transparent overlay
-		overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-		overlay.fill((0, 0, 0))
-		overlay.set_alpha(180)
-		self.display_surface.blit(overlay, (0, 0))
+		self.backend.fill((0, 0, 0, 180))
 		
 		# Title
 		title_text = "Keyboard Controls"
-		title_surf = self.title_font.render(title_text, True, self.title_color)
+		title_surf = render_text(self.title_font, title_text, self.title_color)
 		title_rect = title_surf.get_rect(center=(WINDOW_WIDTH // 2, 50))
-		self.display_surface.blit(title_surf, title_rect)
+		self.backend.blit(title_surf, title_rect)
 		
 		# Controls organized in two columns
 		left_column_x = 150
@@ -495,16 +494,12 @@ class MainMenu:
 		line_spacing = 28
 		section_spacing = 40
 		
-		# Font for text
-		control_font = pygame.font.Font(None, 24)
-		header_font = pygame.font.Font(None, 32)
-		
 		# Left Column - Main Menu & Editor
 		y = start_y
 		
 		# Main Menu
-		header = header_font.render("MAIN MENU:", True, self.title_color)
-		self.display_surface.blit(header, (left_column_x, y))
+		header = render_text(self.subtitle_font, "MAIN MENU:", self.title_color)
+		self.backend.blit(header, (left_column_x, y))
 		y += section_spacing
 		
 		menu_controls = [
@@ -514,15 +509,15 @@ class MainMenu:
 		]
 		
 		for control in menu_controls:
-			surf = control_font.render(control, True, self.normal_color)
-			self.display_surface.blit(surf, (left_column_x, y))
+			surf = render_text(self.control_font, control, self.normal_color)
+			self.backend.blit(surf, (left_column_x, y))
 			y += line_spacing
 		
 		y += section_spacing - 5
 		
 		# Level Editor
-		header = header_font.render("LEVEL EDITOR:", True, self.title_color)
-		self.display_surface.blit(header, (left_column_x, y))
+		header = render_text(self.subtitle_font, "LEVEL EDITOR:", self.title_color)
+		self.backend.blit(header, (left_column_x, y))
 		y += section_spacing
 		
 		editor_controls = [
@@ -542,15 +537,15 @@ class MainMenu:
 		]
 		
 		for control in editor_controls:
-			surf = control_font.render(control, True, self.normal_color)
-			self.display_surface.blit(surf, (left_column_x, y))
+			surf = render_text(self.control_font, control, self.normal_color)
+			self.backend.blit(surf, (left_column_x, y))
 			y += line_spacing
 		
 		# Right Column - Gameplay
 		y = start_y
 		
-		header = header_font.render("GAMEPLAY:", True, self.title_color)
-		self.display_surface.blit(header, (right_column_x, y))
+		header = render_text(self.subtitle_font, "GAMEPLAY:", self.title_color)
+		self.backend.blit(header, (right_column_x, y))
 		y += section_spacing
 		
 		gameplay_controls = [
@@ -565,15 +560,15 @@ class MainMenu:
 		]
 		
 		for control in gameplay_controls:
-			surf = control_font.render(control, True, self.normal_color)
-			self.display_surface.blit(surf, (right_column_x, y))
+			surf = render_text(self.control_font, control, self.normal_color)
+			self.backend.blit(surf, (right_column_x, y))
 			y += line_spacing
 		
 		y += section_spacing - 5
 		
 		# Save System
-		header = header_font.render("SAVE SYSTEM:", True, self.title_color)
-		self.display_surface.blit(header, (right_column_x, y))
+		header = render_text(self.subtitle_font, "SAVE SYSTEM:", self.title_color)
+		self.backend.blit(header, (right_column_x, y))
 		y += section_spacing
 		
 		save_controls = [
@@ -584,15 +579,15 @@ class MainMenu:
 		]
 		
 		for control in save_controls:
-			surf = control_font.render(control, True, self.normal_color)
-			self.display_surface.blit(surf, (right_column_x, y))
+			surf = render_text(self.control_font, control, self.normal_color)
+			self.backend.blit(surf, (right_column_x, y))
 			y += line_spacing
 		
 		# Instructions at bottom
 		hint_text = "Press Enter or ESC to go back"
-		hint_surf = self.subtitle_font.render(hint_text, True, self.selected_color)
+		hint_surf = render_text(self.subtitle_font, hint_text, self.selected_color)
 		hint_rect = hint_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT - 40))
-		self.display_surface.blit(hint_surf, hint_rect)
+		self.backend.blit(hint_surf, hint_rect)
 	
 	def load_settings(self):
 		"""Load volume settings from config file"""
@@ -610,10 +605,13 @@ class MainMenu:
 		"""Save volume settings to config file"""
 		try:
 			config_path = Path('game_settings.json')
-			data = {
-				'music_volume': self.music_volume,
-				'sfx_volume': self.sfx_volume
-			}
+			data = {}
+			if config_path.exists():
+				# keep the other settings (e.g. audio_buffer)
+				with open(config_path, 'r') as f:
+					data = json.load(f)
+			data['music_volume'] = self.music_volume
+			data['sfx_volume'] = self.sfx_volume
 			with open(config_path, 'w') as f:
 				json.dump(data, f, indent=2)
 			print(f"Settings saved: Music {int(self.music_volume*100)}%, SFX {int(self.sfx_volume*100)}%")
@@ -636,33 +634,30 @@ class MainMenu:
 	def draw_custom_level_submenu(self):
 		"""Draw custom level loading submenu"""
 		# Semi-transparent overlay
-		overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-		overlay.fill((0, 0, 0))
-		overlay.set_alpha(180)
-		self.display_surface.blit(overlay, (0, 0))
+		self.backend.fill((0, 0, 0, 180))
 		
 		# Title
 		title_text = "Load Custom Level"
-		title_surf = self.title_font.render(title_text, True, self.title_color)
+		title_surf = render_text(self.title_font, title_text, self.title_color)
 		title_rect = title_surf.get_rect(center=(WINDOW_WIDTH // 2, 100))
-		self.display_surface.blit(title_surf, title_rect)
+		self.backend.blit(title_surf, title_rect)
 		
 		if not self.custom_level_files:
 			# No custom levels found
 			text = "No custom level files found"
-			surf = self.option_font.render(text, True, self.normal_color)
+			surf = render_text(self.option_font, text, self.normal_color)
 			rect = surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
-			self.display_surface.blit(surf, rect)
+			self.backend.blit(surf, rect)
 			
 			text2 = "Place .json level files in game folder or save_data/"
-			surf2 = self.subtitle_font.render(text2, True, self.normal_color)
+			surf2 = render_text(self.subtitle_font, text2, self.normal_color)
 			rect2 = surf2.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 50))
-			self.display_surface.blit(surf2, rect2)
+			self.backend.blit(surf2, rect2)
 			
 			hint_text = "Press Enter or ESC to go back"
-			hint_surf = self.subtitle_font.render(hint_text, True, self.normal_color)
+			hint_surf = render_text(self.subtitle_font, hint_text, self.normal_color)
 			hint_rect = hint_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT - 50))
-			self.display_surface.blit(hint_surf, hint_rect)
+			self.backend.blit(hint_surf, hint_rect)
 		else:
 			# Display available custom level files
 			start_y = 200
@@ -677,57 +672,56 @@ class MainMenu:
 					prefix = "  "
 				
 				filename = file_path.name
-				surf = self.option_font.render(prefix + filename, True, color)
+				surf = render_text(self.option_font, prefix + filename, color)
 				rect = surf.get_rect(center=(WINDOW_WIDTH // 2, start_y + i * spacing))
-				self.display_surface.blit(surf, rect)
+				self.backend.blit(surf, rect)
 			
 			# Controls hint
 			hint_text = "↑↓ Navigate  |  Enter: Load  |  ESC: Back"
-			hint_surf = self.subtitle_font.render(hint_text, True, self.normal_color)
+			hint_surf = render_text(self.subtitle_font, hint_text, self.normal_color)
 			hint_rect = hint_surf.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT - 50))
-			self.display_surface.blit(hint_surf, hint_rect)
+			self.backend.blit(hint_surf, hint_rect)
 		
 	def get_custom_level_files(self):
-		"""Get list of custom level JSON files in current directory"""
+		"""Get list of custom level files (JSON, binary or chunked) in current directory"""
 		level_files = []
 		try:
-			# Look for JSON files in current directory
-			for file_path in Path('.').glob('*.json'):
-				if file_path.stem.startswith('level_') or file_path.stem.startswith('custom_'):
-					level_files.append(file_path)
-			# Also check save_data directory
-			save_dir = Path('save_data')
-			if save_dir.exists():
-				for file_path in save_dir.glob('*.json'):
-					if not file_path.stem.startswith('gamestate_'):
+			for pattern in ('*.json', f'*{LEVEL_EXTENSION}', f'*{CHUNK_EXTENSION}'):
+				# Look for level files in current directory
+				for file_path in Path('.').glob(pattern):
+					if file_path.stem.startswith('level_') or file_path.stem.startswith('custom_'):
+						level_files.append(file_path)
+				# Also check save_data directory (the slot index is not a level)
+				save_dir = Path('save_data')
+				if save_dir.exists():
+					for file_path in save_dir.glob(pattern):
+						if not file_path.stem.startswith('gamestate_') and file_path.name != 'index.json':
+							level_files.append(file_path)
+				# Check save_data/levels directory
+				levels_dir = Path('save_data/levels')
+				if levels_dir.exists():
+					for file_path in levels_dir.glob(pattern):
 						level_files.append(file_path)
-			# Check save_data/levels directory
-			levels_dir = Path('save_data/levels')
-			if levels_dir.exists():
-				for file_path in levels_dir.glob('*.json'):
-					level_files.append(file_path)
 		except Exception as e:
 			print(f"Error scanning for custom levels: {e}")
 		return sorted(level_files)
 	
 	def load_custom_level(self, file_path):
-		"""Load a custom level from a JSON file"""
+		"""Load a custom level from a JSON or binary level file, chunked levels are streamed while playing"""
 		try:
+			if Path(file_path).suffix == CHUNK_EXTENSION:
+				return ChunkedLevel.open(file_path)
+			if Path(file_path).suffix == LEVEL_EXTENSION:
+				info, level_data = load_level_file(file_path)
+				return level_data
+			
 			with open(file_path, 'r') as f:
 				data = json.load(f)
 				level_data = data.get('level_data', None)
 				
 				if level_data:
-					# Convert string keys back to tuples
-					converted_data = {}
-					for layer_name, layer_content in level_data.items():
-						converted_layer = {}
-						for pos_str, value in layer_content.items():
-							# Convert "x,y" string to (x, y) tuple
-							x, y = map(int, pos_str.split(','))
-							converted_layer[(x, y)] = value
-						converted_data[layer_name] = converted_layer
-					return converted_data
+					# Convert "x,y" string keys back to tuples
+					return grid_from_json(level_data)
 				return None
 		except Exception as e:
 			print(f"Error loading custom level: {e}")
@@ -737,7 +731,7 @@ class MainMenu:
 		self.handle_input()
 		
 		# Clear screen
-		self.display_surface.fill(self.bg_color)
+		self.backend.fill(self.bg_color)
 		
 		if self.in_submenu:
 			if self.submenu_type == 'saved_levels':
@@ -1,21 +1,21 @@
 import pygame
 from settings import *
-from pygame.image import load
+from render import get_backend
 
 class Menu:
-	def __init__(self):
-		self.display_surface = pygame.display.get_surface()
-		self.create_data()
+	def __init__(self, surfs):
+		self.backend = get_backend()
+		self.create_data(surfs)
 		self.create_buttons()
 
-	def create_data(self):
+	def create_data(self, surfs):
 		self.menu_surfs = {}
 		for key, value in EDITOR_DATA.items():
 			if value['menu']:
 				if not value['menu'] in self.menu_surfs:
-					self.menu_surfs[value['menu']] = [(key,load(value['menu_surf']))]
+					self.menu_surfs[value['menu']] = [(key,surfs[key])]
 				else:
-					self.menu_surfs[value['menu']].append((key,load(value['menu_surf'])))
+					self.menu_surfs[value['menu']].append((key,surfs[key]))
 
 	def create_buttons(self):
 		
@@ -52,24 +52,24 @@ class Menu:
 
 	def highlight_indicator(self, index):
 		if EDITOR_DATA[index]['menu'] == 'terrain':
-			pygame.draw.rect(self.display_surface, BUTTON_LINE_COLOR, self.tile_button_rect.inflate(4,4),5,4)
+			self.backend.draw_rect(BUTTON_LINE_COLOR, self.tile_button_rect.inflate(4,4),5,4)
 		if EDITOR_DATA[index]['menu'] == 'coin':
-			pygame.draw.rect(self.display_surface, BUTTON_LINE_COLOR, self.coin_button_rect.inflate(4,4),5,4)
+			self.backend.draw_rect(BUTTON_LINE_COLOR, self.coin_button_rect.inflate(4,4),5,4)
 		if EDITOR_DATA[index]['menu'] == 'enemy':
-			pygame.draw.rect(self.display_surface, BUTTON_LINE_COLOR, self.enemy_button_rect.inflate(4,4),5,4)
+			self.backend.draw_rect(BUTTON_LINE_COLOR, self.enemy_button_rect.inflate(4,4),5,4)
 		if EDITOR_DATA[index]['menu'] in ('palm bg', 'palm fg'):
-			pygame.draw.rect(self.display_surface, BUTTON_LINE_COLOR, self.palm_button_rect.inflate(4,4),5,4)
+			self.backend.draw_rect(BUTTON_LINE_COLOR, self.palm_button_rect.inflate(4,4),5,4)
 
 	def display(self, index):
-		self.buttons.update()
-		self.buttons.draw(self.display_surface)
+		for button in self.buttons:
+			button.draw(self.backend)
 		self.highlight_indicator(index)
 
 class Button(pygame.sprite.Sprite):
 	def __init__(self, rect, group, items, items_alt = None):
 		super().__init__(group)
-		self.image = pygame.Surface(rect.size)
 		self.rect = rect
+		self.images = {} # (main_active, index) -> button with the item, made the first time it is shown
 
 		# items 
 		self.items = {'main': items, 'alt': items_alt}
@@ -83,8 +83,12 @@ class Button(pygame.sprite.Sprite):
 		self.index += 1
 		self.index = 0 if self.index >= len(self.items['main' if self.main_active else 'alt']) else self.index
 
-	def update(self):
-		self.image.fill(BUTTON_BG_COLOR)
-		surf = self.items['main' if self.main_active else 'alt'][self.index][1]
-		rect = surf.get_rect(center = (self.rect.width / 2, self.rect.height / 2))
-		self.image.blit(surf, rect)
\ No newline at end of file
+	def draw(self, backend):
+		image = self.images.get((self.main_active, self.index))
+		if image is None:
+			image = pygame.Surface(self.rect.size)
+			image.fill(BUTTON_BG_COLOR)
+			surf = self.items['main' if self.main_active else 'alt'][self.index][1]
+			image.blit(surf, surf.get_rect(center = (self.rect.width / 2, self.rect.height / 2)))
+			self.images[(self.main_active, self.index)] = image
+		backend.blit(image, self.rect)
\ No newline at end of file
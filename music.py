@@ -0,0 +1,51 @@
+import pygame
+
+from settings import *
+
+class MusicPlayer:
+	"""
+	Background music streamed from disk with pygame.mixer.music instead of
+	decoding whole tracks into Sound objects. Switching tracks fades the current
+	one out and the next one in; there is only one music stream, so the fades
+	run one after the other.
+	"""
+	def __init__(self, volume = 0.4, fade_ms = MUSIC_FADE):
+		self.volume = volume
+		self.fade_ms = fade_ms
+		self.track = None # name in MUSIC_TRACKS that is playing or fading in
+		self.pending = False # the track starts once the previous one has faded out
+
+	def play(self, track):
+		"""Switch to a track of MUSIC_TRACKS, None fades the music out"""
+		if track == self.track or not pygame.mixer.get_init():
+			return
+
+		self.track = track
+		if pygame.mixer.music.get_busy():
+			pygame.mixer.music.fadeout(self.fade_ms)
+			self.pending = track is not None
+		else:
+			self.pending = False
+			if track:
+				self.start()
+
+	def stop(self):
+		self.play(None)
+
+	def start(self):
+		try:
+			pygame.mixer.music.load(MUSIC_TRACKS[self.track])
+			pygame.mixer.music.set_volume(self.volume)
+			pygame.mixer.music.play(loops = -1, fade_ms = self.fade_ms)
+		except pygame.error as e:
+			print(f"Error playing music: {e}")
+
+	def set_volume(self, volume):
+		self.volume = volume
+		if pygame.mixer.get_init():
+			pygame.mixer.music.set_volume(volume)
+
+	def update(self):
+		if self.pending and not pygame.mixer.music.get_busy():
+			self.pending = False
+			self.start()
@@ -0,0 +1,172 @@
+from array import array
+from bisect import bisect_right
+
+from settings import *
+
+DROP = 0
+JUMP = 1
+
+class NavGraph:
+	"""
+	Walkable platform segments and the drop / jump links between them,
+	built once from a level grid (see Editor.create_grid)
+
+	A segment is a horizontal run of free cells standing on terrain. Lookups
+	are a dict access plus a bisect within one row, links are stored as flat arrays.
+
+	Chunked levels store the part of the graph around each chunk (get_subgraph),
+	the enemies of a chunk walk on the graph loaded with it. Segments keep their
+	id in the level graph (segment_ids), link targets are those ids.
+	"""
+	def __init__(self, grid = None):
+		# segments: id in the level graph, row, first col, last col
+		self.segment_ids = array('i')
+		self.segment_rows = array('i')
+		self.segment_lefts = array('i')
+		self.segment_rights = array('i')
+
+		# row -> (sorted lefts, segment ids)
+		self.rows = {}
+
+		# links of segment i are link_targets[link_offsets[i]:link_offsets[i + 1]]
+		self.link_offsets = array('i', [0])
+		self.link_targets = array('i')
+		self.link_kinds = array('b')
+
+		if grid is not None:
+			self.build(grid)
+
+	# building
+	def get_cells(self, grid):
+		solid = {(x // TILE_SIZE, y // TILE_SIZE) for x, y in grid['terrain']}
+
+		# shells and the collision blocks of foreground palms stop walkers as well
+		blocked = set()
+		for (x, y), tile_id in grid['enemies'].items():
+			if tile_id in (9, 10):
+				blocked.add((x // TILE_SIZE, y // TILE_SIZE))
+		for (x, y), tile_id in grid['fg objects'].items():
+			if EDITOR_DATA[tile_id]['style'] == 'palm_fg':
+				left = x + 50 if tile_id == 14 else x
+				for col in range(left // TILE_SIZE, (left + 75) // TILE_SIZE + 1):
+					for row in range(y // TILE_SIZE, (y + 49) // TILE_SIZE + 1):
+						blocked.add((col, row))
+		return solid, blocked
+
+	def build(self, grid):
+		solid, blocked = self.get_cells(grid)
+		walkable = {(col, row - 1) for col, row in solid if (col, row - 1) not in solid and (col, row - 1) not in blocked}
+
+		# segments
+		for col, row in sorted(walkable, key = lambda cell: (cell[1], cell[0])):
+			last = len(self.segment_rows) - 1
+			if last >= 0 and self.segment_rows[last] == row and self.segment_rights[last] == col - 1:
+				self.segment_rights[last] = col
+			else:
+				self.add_segment(last + 1, row, col, col)
+
+		# links
+		for segment in range(len(self.segment_rows)):
+			row = self.segment_rows[segment]
+			links = []
+			for col, side in ((self.segment_lefts[segment] - 1, -1), (self.segment_rights[segment] + 1, 1)):
+				if (col, row) in solid or (col, row) in blocked:
+					continue
+
+				# drop: fall straight down past the edge
+				for below in range(row + 1, row + NAV_MAX_DROP + 1):
+					if (col, below) in solid:
+						break
+					target = self.find_segment_cell((col, below))
+					if target is not None:
+						links.append((target, DROP))
+						break
+
+				# jump: land on another segment across the gap
+				for distance in range(1, NAV_JUMP_DISTANCE + 1):
+					for height in range(-NAV_JUMP_HEIGHT, NAV_JUMP_HEIGHT + 1):
+						target = self.find_segment_cell((col + side * distance, row + height))
+						if target is not None and target != segment and (target, JUMP) not in links:
+							links.append((target, JUMP))
+
+			for target, kind in links:
+				self.link_targets.append(target)
+				self.link_kinds.append(kind)
+			self.link_offsets.append(len(self.link_targets))
+
+	def add_segment(self, segment_id, row, left, right):
+		"""Append a segment, they are added sorted by row and first col"""
+		lefts, ids = self.rows.setdefault(row, (array('i'), array('i')))
+		lefts.append(left)
+		ids.append(len(self.segment_rows))
+		self.segment_ids.append(segment_id)
+		self.segment_rows.append(row)
+		self.segment_lefts.append(left)
+		self.segment_rights.append(right)
+
+	# queries
+	def find_segment_cell(self, cell):
+		"""Segment id containing the cell, or None"""
+		col, row = cell
+		if row not in self.rows:
+			return None
+		lefts, ids = self.rows[row]
+		index = bisect_right(lefts, col) - 1
+		if index >= 0 and col <= self.segment_rights[ids[index]]:
+			return ids[index]
+		return None
+
+	def find_segment(self, pos):
+		"""Segment id below a pixel position (e.g. the midbottom of a sprite), or None"""
+		return self.find_segment_cell((int(pos[0] // TILE_SIZE), int((pos[1] - 1) // TILE_SIZE)))
+
+	def get_bounds(self, segment):
+		"""Pixel limits of a segment as (left, right, floor y)"""
+		return (
+			self.segment_lefts[segment] * TILE_SIZE,
+			(self.segment_rights[segment] + 1) * TILE_SIZE,
+			(self.segment_rows[segment] + 1) * TILE_SIZE)
+
+	def get_links(self, segment):
+		"""List of (target segment id in the level graph, DROP or JUMP)"""
+		start, end = self.link_offsets[segment], self.link_offsets[segment + 1]
+		return list(zip(self.link_targets[start:end], self.link_kinds[start:end]))
+
+	# chunks
+	def get_chunk_segments(self):
+		"""
+		Chunk key (cx, cy) -> segments crossing the chunk or ending one col beside it,
+		so the graph of a chunk has the segment below any enemy standing in it
+		"""
+		chunks = {}
+		for segment in range(len(self.segment_rows)):
+			cy = self.segment_rows[segment] // CHUNK_TILES
+			for cx in range((self.segment_lefts[segment] - 1) // CHUNK_TILES, (self.segment_rights[segment] + 1) // CHUNK_TILES + 1):
+				chunks.setdefault((cx, cy), []).append(segment)
+		return chunks
+
+	def get_subgraph(self, segments):
+		"""NavGraph of some segments (in id order) and their links"""
+		nav_graph = NavGraph()
+		for segment in segments:
+			nav_graph.add_segment(self.segment_ids[segment], self.segment_rows[segment], self.segment_lefts[segment], self.segment_rights[segment])
+			start, end = self.link_offsets[segment], self.link_offsets[segment + 1]
+			nav_graph.link_targets.extend(self.link_targets[start:end])
+			nav_graph.link_kinds.extend(self.link_kinds[start:end])
+			nav_graph.link_offsets.append(len(nav_graph.link_targets))
+		return nav_graph
+
+	# storing
+	def to_arrays(self):
+		"""Segment ids, rows, lefts, rights, link offsets, targets and kinds"""
+		return [self.segment_ids, self.segment_rows, self.segment_lefts, self.segment_rights, self.link_offsets, self.link_targets, self.link_kinds]
+
+	@classmethod
+	def from_arrays(cls, segment_ids, rows, lefts, rights, link_offsets, link_targets, link_kinds):
+		nav_graph = cls()
+		for segment_id, row, left, right in zip(segment_ids, rows, lefts, rights):
+			nav_graph.add_segment(segment_id, row, left, right)
+		nav_graph.link_offsets = array('i', link_offsets)
+		nav_graph.link_targets = array('i', link_targets)
+		nav_graph.link_kinds = array('b', link_kinds)
+		return nav_graph
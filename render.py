@@ -0,0 +1,263 @@
+import pygame
+from weakref import WeakKeyDictionary
+
+from settings import *
+
+text_cache = {} # (font, text, color) -> surface
+
+def render_text(font, text, color):
+	"""font.render with antialiasing, cached so the texts drawn every frame keep their textures"""
+	key = (font, text, tuple(pygame.Color(color)))
+	surf = text_cache.get(key)
+	if surf is None:
+		if len(text_cache) > 512:
+			text_cache.clear()
+		surf = text_cache[key] = font.render(text, True, color)
+	return surf
+
+def get_line_rect(start, end, width):
+	"""Rect covered by a horizontal or vertical line (the lines of the menus and the editor)"""
+	(x1, y1), (x2, y2) = sorted((tuple(map(round, start)), tuple(map(round, end))))
+	if y1 == y2:
+		return pygame.Rect(x1, y1 - width // 2, x2 - x1 + 1, width)
+	return pygame.Rect(x1 - width // 2, y1, width, y2 - y1 + 1)
+
+class SoftwareBackend:
+	"""Everything is blitted onto the display surface of pygame.display.set_mode"""
+	def __init__(self, caption):
+		pygame.display.set_caption(caption)
+		self.surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+		self.shades = {} # (size, color) -> translucent surface for fills with alpha
+
+	def fill(self, color, rect = None):
+		color = pygame.Color(color)
+		if color.a == 255:
+			self.surface.fill(color, rect)
+			return
+
+		# fill ignores alpha, translucent fills are blitted
+		rect = pygame.Rect(rect) if rect else self.surface.get_rect()
+		shade = self.shades.get((rect.size, tuple(color)))
+		if shade is None:
+			shade = pygame.Surface(rect.size)
+			shade.fill(color)
+			shade.set_alpha(color.a)
+			self.shades[(rect.size, tuple(color))] = shade
+		self.surface.blit(shade, rect)
+
+	def blit(self, surf, pos):
+		self.surface.blit(surf, pos)
+
+	def draw_rect(self, color, rect, width = 0, border_radius = 0):
+		if width or border_radius:
+			pygame.draw.rect(self.surface, color, rect, width, border_radius)
+		else:
+			self.fill(color, rect)
+
+	def draw_line(self, color, start, end, width = 1):
+		"""Horizontal or vertical line, the color can have alpha"""
+		self.fill(color, get_line_rect(start, end, width))
+
+	def draw_batch(self, batch):
+		"""Draw a sequence of (surface, position)"""
+		# fblits (pygame-ce) skips building the list of changed rects
+		if hasattr(self.surface, 'fblits'):
+			self.surface.fblits(batch)
+		else:
+			self.surface.blits(batch, False)
+
+	def flush(self):
+		pass # the world is drawn straight onto the display
+
+	def present(self):
+		pygame.display.update()
+
+	def mark_drawn(self, rect):
+		pass # the whole display is updated
+
+class OverlaySurface(pygame.Surface):
+	"""Transparent surface that remembers the area blitted and filled since the last clear"""
+	def __init__(self, size):
+		super().__init__(size, pygame.SRCALPHA)
+		self.dirty = None
+
+	def mark_drawn(self, rect):
+		rect = pygame.Rect(rect).clip(self.get_rect())
+		if rect.width and rect.height:
+			self.dirty = self.dirty.union(rect) if self.dirty else rect
+		return rect
+
+	def blit(self, source, dest, area = None, special_flags = 0):
+		return self.mark_drawn(super().blit(source, dest, area, special_flags))
+
+	def blits(self, blit_sequence, doreturn = 1):
+		rects = [self.blit(*args) for args in blit_sequence]
+		return rects if doreturn else None
+
+	def fill(self, color, rect = None, special_flags = 0):
+		return self.mark_drawn(super().fill(color, rect, special_flags))
+
+	def clear(self):
+		"""Area drawn on since the last clear (None if nothing was), made transparent again"""
+		dirty, self.dirty = self.dirty, None
+		if dirty:
+			pygame.Surface.fill(self, (0, 0, 0, 0), dirty)
+		return dirty
+
+class SDL2Backend:
+	"""
+	Renders with pygame._sdl2.video. The world, the menus and the editor canvas
+	draw through fill, blit, draw_batch, draw_rect and draw_line, which go to the
+	renderer (images are drawn from textures cached per surface). What is still
+	blitted onto self.surface (HUD, slot picker, transition) is uploaded and drawn
+	on top in present(), only the area that was drawn on.
+	"""
+	def __init__(self, caption):
+		from pygame._sdl2 import error as SDLError
+		from pygame._sdl2.video import Window, Renderer, Texture
+
+		# convert() and convert_alpha() need a video mode
+		pygame.display.set_mode((1, 1), pygame.HIDDEN)
+		self.window = Window(caption, (WINDOW_WIDTH, WINDOW_HEIGHT))
+		try:
+			self.renderer = Renderer(self.window, accelerated = 1)
+		except SDLError as e:
+			print(f"No accelerated renderer ({e}), using the software renderer")
+			self.renderer = Renderer(self.window, accelerated = 0)
+
+		self.texture_class = Texture
+		self.textures = WeakKeyDictionary() # surface -> Texture, dropped with the surface
+
+		self.surface = OverlaySurface((WINDOW_WIDTH, WINDOW_HEIGHT))
+		self.overlay = Texture(self.renderer, (WINDOW_WIDTH, WINDOW_HEIGHT), streaming = True)
+		self.overlay.blend_mode = pygame.BLENDMODE_BLEND
+
+	def get_texture(self, surf):
+		texture = self.textures.get(surf)
+		if texture is None:
+			texture = self.texture_class.from_surface(self.renderer, surf)
+			self.textures[surf] = texture
+		return texture
+
+	def fill(self, color, rect = None):
+		color = pygame.Color(color)
+		self.renderer.draw_color = color
+		# blending only for fills with alpha (menu overlays), it is slower for opaque fills
+		self.renderer.draw_blend_mode = pygame.BLENDMODE_BLEND if color.a < 255 else pygame.BLENDMODE_NONE
+		if rect:
+			self.renderer.fill_rect(pygame.Rect(rect))
+		elif color.a == 255:
+			self.renderer.clear()
+		else:
+			self.renderer.fill_rect((0, 0, WINDOW_WIDTH, WINDOW_HEIGHT))
+
+	def blit(self, surf, pos):
+		self.get_texture(surf).draw(dstrect = (pos[0], pos[1], *surf.get_size()))
+
+	def draw_batch(self, batch):
+		for surf, pos in batch:
+			self.get_texture(surf).draw(dstrect = pos)
+
+	def draw_rect(self, color, rect, width = 0, border_radius = 0):
+		"""Filled or outlined rect, the corners are not rounded"""
+		rect = pygame.Rect(rect)
+		if not width:
+			self.fill(color, rect)
+			return
+		for edge in (
+			(rect.left, rect.top, rect.width, width), (rect.left, rect.bottom - width, rect.width, width),
+			(rect.left, rect.top + width, width, rect.height - width * 2), (rect.right - width, rect.top + width, width, rect.height - width * 2)):
+			self.fill(color, edge)
+
+	def draw_line(self, color, start, end, width = 1):
+		"""Horizontal or vertical line, the color can have alpha"""
+		self.fill(color, get_line_rect(start, end, width))
+
+	def flush(self):
+		pass
+
+	def present(self):
+		# only the part of the overlay that was drawn on is uploaded, nothing if it is empty
+		dirty = self.surface.dirty
+		if dirty:
+			self.overlay.update(self.surface.subsurface(dirty), dirty)
+			self.overlay.draw(srcrect = dirty, dstrect = dirty)
+			self.surface.clear()
+		self.renderer.present()
+
+	def mark_drawn(self, rect):
+		self.surface.mark_drawn(rect)
+
+class ScaledWorld:
+	"""
+	Draws the level world at a fraction of the window resolution: sprites are
+	scaled down once and cached, and the finished world is scaled up onto the
+	display in flush(). Everything drawn on the display afterwards (the HUD)
+	keeps the full resolution.
+	"""
+	def __init__(self, backend, scale):
+		self.backend = backend
+		self.scale = scale
+		self.surface = pygame.Surface((WINDOW_WIDTH // scale, WINDOW_HEIGHT // scale)).convert()
+		self.scaled = WeakKeyDictionary() # surface -> scaled down copy, dropped with the surface
+
+	def get_scaled(self, surf):
+		scaled = self.scaled.get(surf)
+		if scaled is None:
+			width, height = surf.get_size()
+			scaled = pygame.transform.scale(surf, (max(1, width // self.scale), max(1, height // self.scale)))
+			self.scaled[surf] = scaled
+		return scaled
+
+	def fill(self, color, rect = None):
+		if rect:
+			rect = pygame.Rect(rect)
+			left, top = rect.left // self.scale, rect.top // self.scale
+			rect = pygame.Rect(left, top, -(-rect.right // self.scale) - left, -(-rect.bottom // self.scale) - top)
+		self.surface.fill(color, rect)
+
+	def draw_batch(self, batch):
+		scale = self.scale
+		self.surface.blits([(self.get_scaled(surf), (x // scale, y // scale)) for surf, (x, y) in batch], False)
+
+	def flush(self):
+		pygame.transform.scale(self.surface, (WINDOW_WIDTH, WINDOW_HEIGHT), self.backend.surface)
+
+backend = None
+world = None
+
+def create_backend(caption, render_scale = 1):
+	"""
+	Create the backend selected by RENDER_BACKEND, falls back to software rendering.
+	A render_scale above 1 draws the level world at a lower resolution (software backend only,
+	the SDL2 renderer scales textures on the GPU anyway)
+	"""
+	global backend, world
+	if RENDER_BACKEND == 'sdl2':
+		try:
+			backend = SDL2Backend(caption)
+		except (ImportError, RuntimeError, pygame.error) as e:
+			print(f"SDL2 renderer not available ({e}), using software rendering")
+	if backend is None:
+		backend = SoftwareBackend(caption)
+
+	world = ScaledWorld(backend, render_scale) if render_scale > 1 and isinstance(backend, SoftwareBackend) else backend
+	return backend
+
+def get_backend():
+	return backend
+
+def get_world():
+	"""Where the level world is drawn: the backend or a ScaledWorld (fill, draw_batch, flush)"""
+	return world
+
+def get_surface():
+	"""Surface the HUD and the modal screens draw on (replaces pygame.display.get_surface)"""
+	return backend.surface
+
+def mark_drawn(rect):
+	"""Report an area of get_surface() drawn without blit or fill (pygame.draw)"""
+	backend.mark_drawn(rect)
+
+def present():
+	backend.present()
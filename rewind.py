@@ -0,0 +1,306 @@
+import struct
+from array import array
+from itertools import chain
+
+from settings import *
+from sprites import Coin, Tooth, Shell, Pearl, Particle
+
+FRAME = struct.Struct('<ffffBBHfHB') # player pos x, y, direction x, y, health, flags, coins collected, play time, entities, coins
+ENTITY = struct.Struct('<HffB') # slot, x, direction (teeth) or frame (shells), flags
+COIN = struct.Struct('<ii') # coin collected since the previous frame
+FLAGS_OFFSET = struct.calcsize('<ffffB') # position of the frame flags
+
+# frame flags
+FACING_RIGHT = 1
+KEYFRAME = 2
+
+# entity flags
+PRESENT = 1
+HAS_SHOT = 2
+COOLDOWN = 4
+
+class RewindBuffer:
+	"""
+	Gameplay history in one preallocated bytearray of REWIND_BUFFER_SIZE bytes:
+	a ring of frames of varying size, written with struct.pack_into, so recording
+	creates no per-frame objects and the memory is fixed. The frame offsets are
+	kept in an array of REWIND_SECONDS * REWIND_RATE entries; when the ring is
+	full the oldest frames are dropped, up to the next keyframe.
+
+	A frame holds the player, the enemy and pearl states and, as a delta, the
+	coins collected since the frame before. Every REWIND_KEYFRAME_INTERVAL frames
+	(and when the history is empty) the state of every entity is written, the
+	frames between only hold the entities that changed or disappeared since the
+	previous frame.
+
+	Teeth, shells and pearls get a fixed slot the first time they are recorded.
+	The slot arrays mirror the entity states of the newest frame, recording
+	compares the sprites with them. A slot is used again once its sprite is dead
+	and in no frame of the buffer any more (pearls that hit something can fly
+	again when rewound). Beyond REWIND_MAX_ENTITIES slots, sprites are not
+	rewound, which is reported once.
+
+	Stepping back undoes the coins of the dropped frames, rebuilds the slot
+	states of the frame reached from its keyframe and puts them into the sprites
+	in place. Enemies of chunks that were built again since keep their own state.
+	"""
+	def __init__(self):
+		self.step = 1 / REWIND_RATE
+		self.capacity = REWIND_SECONDS * REWIND_RATE
+		self.max_frame_size = FRAME.size + REWIND_MAX_ENTITIES * ENTITY.size + REWIND_MAX_COINS * COIN.size
+		self.data = bytearray(REWIND_BUFFER_SIZE)
+
+		# frame ring
+		self.offsets = array('I', bytes(4 * self.capacity)) # frame index -> byte offset
+		self.numbers = array('I', bytes(4 * self.capacity)) # frame index -> number of the frame
+		self.oldest = 0 # frame index
+		self.count = 0
+		self.end = 0 # byte offset after the newest frame
+		self.written = 0 # frames recorded in total
+		self.time = 0
+
+		# entity slots
+		self.slots = [None] * REWIND_MAX_ENTITIES # slot -> sprite
+		self.used_slots = 0 # slots below are or were taken
+		self.x = array('d', bytes(8 * REWIND_MAX_ENTITIES)) # entity state of the newest frame
+		self.value = array('d', bytes(8 * REWIND_MAX_ENTITIES))
+		self.flags = array('B', bytes(REWIND_MAX_ENTITIES))
+		self.last_present = array('I', bytes(4 * REWIND_MAX_ENTITIES)) # number of the newest frame with the sprite
+		self.full_reported = False
+
+		self.new_coins = [] # collected since the newest frame
+
+	def clear(self):
+		self.count = 0
+		self.time = 0
+		for slot in range(self.used_slots):
+			self.flags[slot] = 0
+		self.new_coins.clear()
+
+	def add(self, sprite):
+		"""Give a tooth, shell or pearl its slot, -1 for other sprites and when every slot is taken"""
+		slot = -1
+		if isinstance(sprite, (Tooth, Shell, Pearl)):
+			oldest = self.numbers[self.oldest] if self.count else self.written
+			for index in range(REWIND_MAX_ENTITIES):
+				previous = self.slots[index]
+				if previous is None or (not previous.alive() and self.last_present[index] < oldest and not self.flags[index] & PRESENT):
+					if previous is not None:
+						previous.rewind_slot = -1
+					self.slots[index] = sprite
+					self.used_slots = max(self.used_slots, index + 1)
+					slot = index
+					break
+			else:
+				if not self.full_reported:
+					print(f"Rewind: all {REWIND_MAX_ENTITIES} entity slots are taken, more enemies and pearls are not rewound")
+					self.full_reported = True
+		sprite.rewind_slot = slot
+		return slot
+
+	def collect(self, pos):
+		self.new_coins.append(pos)
+
+	# frames
+	def get_newest(self):
+		return (self.oldest + self.count - 1) % self.capacity
+
+	def is_keyframe(self, frame):
+		return self.data[self.offsets[frame] + FLAGS_OFFSET] & KEYFRAME
+
+	def get_frame_end(self, frame):
+		offset = self.offsets[frame]
+		*_, entities, coins = FRAME.unpack_from(self.data, offset)
+		return offset + FRAME.size + entities * ENTITY.size + coins * COIN.size
+
+	def drop_oldest(self):
+		self.oldest = (self.oldest + 1) % self.capacity
+		self.count -= 1
+
+	def reserve(self):
+		"""Byte offset for the next frame, the oldest frames are dropped to make room"""
+		offset = self.end if self.count else 0
+		if offset + self.max_frame_size > len(self.data):
+			# the frames at the end of the buffer are the oldest ones
+			while self.count and self.offsets[self.oldest] >= offset:
+				self.drop_oldest()
+			offset = 0
+		while self.count and (self.count == self.capacity or offset <= self.offsets[self.oldest] < offset + self.max_frame_size):
+			self.drop_oldest()
+
+		# the oldest frame has to be a keyframe, the deltas after it are built on it
+		while self.count and not self.is_keyframe(self.oldest):
+			self.drop_oldest()
+		return offset
+
+	# recording
+	def record(self, level, dt):
+		"""Write a frame every 1 / REWIND_RATE seconds, called after the level was updated"""
+		self.time += dt
+		if self.time < self.step:
+			return
+		self.time = min(self.time - self.step, self.step)
+
+		offset = self.reserve()
+		keyframe = self.count == 0 or self.written % REWIND_KEYFRAME_INTERVAL == 0
+		number = self.written
+		data = self.data
+		x_states, value_states, flag_states = self.x, self.value, self.flags
+
+		# enemies and pearls, the ones that changed unless this is a keyframe
+		entities = 0
+		entity_offset = offset + FRAME.size
+		for sprite in chain(level.damage_sprites, level.shell_sprites):
+			slot = getattr(sprite, 'rewind_slot', None)
+			if slot is None:
+				slot = self.add(sprite)
+			if slot < 0:
+				continue
+
+			if isinstance(sprite, Tooth):
+				x, value, flags = sprite.pos.x, sprite.direction.x, PRESENT
+			elif isinstance(sprite, Shell):
+				x, value, flags = 0, sprite.frame_index, PRESENT | (HAS_SHOT if sprite.has_shot else 0) | (COOLDOWN if sprite.attack_cooldown.active else 0)
+			else:
+				x, value, flags = sprite.pos.x, 0, PRESENT
+			self.last_present[slot] = number
+
+			if keyframe or x != x_states[slot] or value != value_states[slot] or flags != flag_states[slot]:
+				x_states[slot] = x
+				value_states[slot] = value
+				flag_states[slot] = flags
+				ENTITY.pack_into(data, entity_offset, slot, x, value, flags)
+				entities += 1
+				entity_offset += ENTITY.size
+
+		# sprites that are gone (pearls that hit something, chunks that were removed)
+		for slot in range(self.used_slots):
+			if flag_states[slot] & PRESENT and self.last_present[slot] != number:
+				flag_states[slot] = 0
+				if not keyframe:
+					ENTITY.pack_into(data, entity_offset, slot, 0, 0, 0)
+					entities += 1
+					entity_offset += ENTITY.size
+
+		# collected coins, more than fit are carried into the next frame
+		coins = min(len(self.new_coins), REWIND_MAX_COINS)
+		for index in range(coins):
+			COIN.pack_into(data, entity_offset + index * COIN.size, *self.new_coins[index])
+		del self.new_coins[:coins]
+
+		player = level.player
+		flags = (FACING_RIGHT if player.orientation == 'right' else 0) | (KEYFRAME if keyframe else 0)
+		FRAME.pack_into(data, offset,
+			player.pos.x, player.pos.y, player.direction.x, player.direction.y,
+			max(player.health, 0), flags,
+			level.coins_collected - len(self.new_coins), level.play_time, entities, coins) # the carried coins count from the next frame
+
+		frame = (self.oldest + self.count) % self.capacity
+		self.offsets[frame] = offset
+		self.numbers[frame] = number
+		self.count += 1
+		self.end = entity_offset + coins * COIN.size
+		self.written += 1
+
+	# rewinding
+	def step_back(self, level, dt):
+		"""Go back in time by dt (at most to the oldest frame) and apply the frame reached"""
+		if self.count == 0:
+			return
+		for pos in self.new_coins:
+			self.uncollect(level, pos)
+		self.new_coins.clear()
+
+		self.time += dt
+		while self.time >= self.step and self.count > 1:
+			self.time -= self.step
+			offset = self.offsets[self.get_newest()]
+			*_, entities, coins = FRAME.unpack_from(self.data, offset)
+			coin_offset = offset + FRAME.size + entities * ENTITY.size
+			for pos in COIN.iter_unpack(self.data[coin_offset:coin_offset + coins * COIN.size]):
+				self.uncollect(level, pos)
+			self.count -= 1
+			self.end = self.get_frame_end(self.get_newest())
+		if self.count == 1:
+			self.time = 0
+
+		self.load_entities(self.get_newest())
+		self.apply(level, self.get_newest())
+
+	def uncollect(self, level, pos):
+		level.collected_coins.discard(pos)
+		for sprite in chain.from_iterable(level.loaded_chunks.values()):
+			if isinstance(sprite, Coin) and sprite.rect.center == pos:
+				sprite.add(level.all_sprites, level.coin_sprites)
+				break
+
+	def load_entities(self, frame):
+		"""Set the slot states to the ones of a frame: its keyframe and the deltas up to it"""
+		start = frame
+		while not self.is_keyframe(start):
+			start = (start - 1) % self.capacity
+
+		for slot in range(self.used_slots):
+			self.flags[slot] = 0
+		index = start
+		while True:
+			offset = self.offsets[index]
+			entities = FRAME.unpack_from(self.data, offset)[-2]
+			for slot, x, value, flags in ENTITY.iter_unpack(self.data[offset + FRAME.size:offset + FRAME.size + entities * ENTITY.size]):
+				self.x[slot] = x
+				self.value[slot] = value
+				self.flags[slot] = flags
+			if index == frame:
+				break
+			index = (index + 1) % self.capacity
+
+	def apply(self, level, frame):
+		x, y, direction_x, direction_y, health, flags, coins_collected, play_time, entities, coins = FRAME.unpack_from(self.data, self.offsets[frame])
+
+		player = level.player
+		player.pos.update(x, y)
+		player.hitbox.center = (round(x), round(y))
+		player.rect.center = player.hitbox.center
+		player.direction.update(direction_x, direction_y)
+		player.health = health
+		player.orientation = 'right' if flags & FACING_RIGHT else 'left'
+		level.coins_collected = coins_collected
+		level.play_time = play_time
+		level.level_complete = coins_collected >= level.total_coins
+
+		for slot in range(self.used_slots):
+			sprite = self.slots[slot]
+			if sprite is None:
+				continue
+			x, value, flags = self.x[slot], self.value[slot], self.flags[slot]
+			if isinstance(sprite, Pearl):
+				if flags & PRESENT:
+					sprite.pos.x = x
+					sprite.rect.x = round(x)
+					if not sprite.alive():
+						sprite.add(sprite.shell.pearl_groups)
+						sprite.timer.activate()
+				elif sprite.alive():
+					# shot after the frame
+					sprite.timer.deactivate()
+					sprite.kill()
+			elif not flags & PRESENT or not sprite.alive():
+				continue # its chunk was removed
+			elif isinstance(sprite, Tooth):
+				sprite.pos.x = x
+				sprite.rect.x = round(x)
+				sprite.direction.x = value
+				sprite.orientation = 'left' if value < 0 else 'right'
+			else:
+				sprite.frame_index = value
+				sprite.has_shot = bool(flags & HAS_SHOT)
+				if flags & COOLDOWN and not sprite.attack_cooldown.active:
+					sprite.attack_cooldown.activate()
+				elif not flags & COOLDOWN:
+					sprite.attack_cooldown.deactivate()
+
+		for sprite in level.all_sprites.sprites():
+			if isinstance(sprite, Particle):
+				sprite.kill()
+
+		level.update_chunks()
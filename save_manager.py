@@ -1,13 +1,182 @@
 import pygame
 import json
 import os
+import atexit
+import copy
+import threading
+import sqlite3
+from collections import deque, OrderedDict
 from datetime import datetime
 from pathlib import Path
 
+from settings import *
+from render import get_surface, present
+from timer import Timer
+from level_format import LEVEL_EXTENSION, encode_level, decode_level, load_level_file, read_level_info, grid_from_json
+from thumbnail import Thumbnails
+
+class SaveWriter:
+	"""
+	Writes save files on a background thread. Each file is written to a temp
+	file, fsynced and moved over the old one, so a crash never leaves a half
+	written save. Writes to a path that is still queued replace the queued data.
+	"""
+	
+	def __init__(self):
+		self.pending = {}  # key (a path) -> (job, on_done), oldest first
+		self.writing = None  # key being written right now
+		self.condition = threading.Condition()
+		
+		self.thread = threading.Thread(target=self.run, daemon=True)
+		self.thread.start()
+		atexit.register(self.flush)
+	
+	def write(self, path, get_data, on_done=None):
+		"""
+		Queue a write
+		
+		Args:
+			path (Path): Destination file
+			get_data (callable): Returns the JSON-serializable data or bytes, called on the writer thread
+				(it must only use a snapshot that is not modified afterwards)
+			on_done (callable): Called on the writer thread with True / False when the write finished
+		"""
+		self.submit(path, lambda: self.write_file(path, get_data), on_done)
+	
+	def submit(self, key, job, on_done=None):
+		"""
+		Queue a write that isn't a plain file (e.g. a database row)
+		
+		Args:
+			key: Hashable name of what is written, replaces a queued job with the same key
+			job (callable): Does the write on the writer thread, returns True / False
+			on_done (callable): Called on the writer thread with the result of the job
+		"""
+		with self.condition:
+			self.pending.pop(key, None)
+			self.pending[key] = (job, on_done)
+			self.condition.notify_all()
+	
+	def cancel(self, path):
+		"""Drop a queued write and wait for the path if it is being written"""
+		with self.condition:
+			self.pending.pop(path, None)
+		self.wait(path)
+	
+	def is_pending(self, path):
+		return path in self.pending or self.writing == path
+	
+	def wait(self, path=None):
+		"""Block until the writes of a path (or all writes) are on disk"""
+		with self.condition:
+			while (self.is_pending(path) if path else (self.pending or self.writing)):
+				self.condition.wait()
+	
+	def flush(self):
+		self.wait()
+	
+	def run(self):
+		while True:
+			with self.condition:
+				while not self.pending:
+					self.condition.wait()
+				key = next(iter(self.pending))
+				job, on_done = self.pending.pop(key)
+				self.writing = key
+			
+			try:
+				try:
+					success = job()
+				except Exception as e:
+					print(f"Error writing {key}: {e}")
+					success = False
+				if on_done:
+					on_done(success)
+			except Exception as e:
+				print(f"Error finishing write of {key}: {e}")
+			finally:
+				# always let waiters go, a failing callback must not stop the queue
+				with self.condition:
+					self.writing = None
+					self.condition.notify_all()
+	
+	def write_file(self, path, get_data):
+		temp_path = path.with_name(path.name + '.tmp')
+		try:
+			data = get_data()
+			if not isinstance(data, bytes):
+				data = json.dumps(data).encode()
+			with open(temp_path, 'wb') as f:
+				f.write(data)
+				f.flush()
+				os.fsync(f.fileno())
+			os.replace(temp_path, path)
+			return True
+		except Exception as e:
+			print(f"Error writing {path}: {e}")
+			return False
+
+class LevelCache:
+	"""
+	Bounded LRU of loaded level grids by file path. An entry is only used while
+	the file's mtime and size are unchanged, so files replaced by the writer or
+	by hand are read again.
+	"""
+	
+	def __init__(self, max_levels=4):
+		self.max_levels = max_levels
+		self.entries = OrderedDict()  # path -> (mtime_ns, size, grid), least recently used first
+		self.lock = threading.Lock()
+		self.prefetches = {}  # path -> prefetch thread
+		self.failed = {}  # path -> (mtime_ns, size) of a file the prefetch couldn't read
+	
+	def get(self, path):
+		"""Cached grid of a file, or None if it is not cached or the file changed"""
+		try:
+			stat = path.stat()
+		except OSError:
+			return None
+		with self.lock:
+			entry = self.entries.get(path)
+			if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+				return None
+			self.entries.move_to_end(path)
+			return entry[2]
+	
+	def put(self, path, stat, grid):
+		"""Store a grid, stat is the os.stat_result of the file taken before it was read"""
+		with self.lock:
+			self.entries.pop(path, None)
+			self.entries[path] = (stat.st_mtime_ns, stat.st_size, grid)
+			while len(self.entries) > self.max_levels:
+				self.entries.popitem(last=False)
+	
+	def discard(self, path):
+		with self.lock:
+			self.entries.pop(path, None)
+	
+	def wait(self, path):
+		"""Block until a prefetch of the path has finished"""
+		thread = self.prefetches.get(path)
+		if thread:
+			thread.join()
+
 class SaveManager:
 	"""Manages save and load functionality for levels and game state with multiple save slots"""
 	
+	# one writer and level cache shared by all managers, so writes to the same file are queued
+	# together and a level prefetched by the menu is found by the level
+	writer = None
+	level_cache = None
+	thumbnails = None  # rendered on their own worker, so they never delay a save
+	
 	def __init__(self, num_slots=3):
+		if SaveManager.writer is None:
+			SaveManager.writer = SaveWriter()
+			SaveManager.level_cache = LevelCache()
+			SaveManager.thumbnails = Thumbnails(SaveWriter())
+		self.completed = deque()  # (save_type, slot, success) of finished writes
+		
 		self.num_slots = num_slots
 		self.save_directory = Path('save_data')
 		self.save_directory.mkdir(exist_ok=True)
@@ -17,18 +186,32 @@ class SaveManager:
 		self.gamestate_directory = self.save_directory / 'gamestates'
 		self.level_directory.mkdir(exist_ok=True)
 		self.gamestate_directory.mkdir(exist_ok=True)
+		
+		# Slot metadata (name, timestamp) so menus don't parse the save files
+		self.index_path = self.save_directory / 'index.json'
+		self.slot_index = self._load_index()
 	
 	def get_level_save_path(self, slot):
 		"""Get the file path for a level save slot"""
+		return self.level_directory / f'level_slot_{slot}{LEVEL_EXTENSION}'
+	
+	def get_level_json_path(self, slot):
+		"""Level save of the previous JSON format, still loaded if there is no binary save"""
 		return self.level_directory / f'level_slot_{slot}.json'
 	
+	def get_level_load_path(self, slot):
+		save_path = self.get_level_save_path(slot)
+		if self.writer.is_pending(save_path) or save_path.exists():
+			return save_path
+		return self.get_level_json_path(slot)
+	
 	def get_gamestate_save_path(self, slot):
 		"""Get the file path for a game state save slot"""
 		return self.gamestate_directory / f'gamestate_slot_{slot}.json'
 	
 	def save_level(self, slot, level_data, level_name="Custom Level"):
 		"""
-		Save level data to a specific slot
+		Save level data to a specific slot, the file is written in the background
 		
 		Args:
 			slot (int): Save slot number (0 to num_slots-1)
@@ -36,26 +219,31 @@ class SaveManager:
 			level_name (str): Name of the level
 		
 		Returns:
-			bool: True if save was successful
+			bool: True if the save was queued, see get_completed_saves for the result
 		"""
 		if not 0 <= slot < self.num_slots:
 			print(f"Invalid slot number: {slot}")
 			return False
 		
 		try:
-			# Prepare save data
+			# Prepare save data (the layers are copied here, packed on the writer thread)
+			snapshot = {layer_name: dict(layer_data) for layer_name, layer_data in level_data.items()}
 			save_data = {
 				'level_name': level_name,
-				'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-				'level_data': self._serialize_level_data(level_data)
+				'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 			}
 			
-			# Write to file
 			save_path = self.get_level_save_path(slot)
-			with open(save_path, 'w') as f:
-				json.dump(save_data, f, indent=4)
 			
-			print(f"Level saved successfully to slot {slot}")
+			def get_data():
+				# runs on the writer thread, the thumbnail is queued with the encoded level
+				data = encode_level(snapshot, save_data)
+				self.thumbnails.render(self.level_directory, save_path.stem, data, snapshot)
+				return data
+			
+			# Write to file
+			self.level_cache.discard(save_path)
+			self._write_save(save_path, save_data, 'level', slot, get_data)
 			return True
 			
 		except Exception as e:
@@ -76,23 +264,84 @@ class SaveManager:
 			print(f"Invalid slot number: {slot}")
 			return None
 		
-		save_path = self.get_level_save_path(slot)
+		self.writer.wait(self.get_level_save_path(slot))
+		save_path = self.get_level_load_path(slot)
+		self.level_cache.wait(save_path)
 		
 		if not save_path.exists():
 			print(f"No save found in slot {slot}")
 			return None
 		
 		try:
-			with open(save_path, 'r') as f:
-				save_data = json.load(f)
+			level_data = self.level_cache.get(save_path)
+			if level_data is None:
+				level_data = self._read_level(save_path)
 			
-			# Deserialize and return level data
-			return self._deserialize_level_data(save_data['level_data'])
+			# copy the layers, the cached grid is shared
+			return {layer_name: dict(layer_data) for layer_name, layer_data in level_data.items()}
 			
 		except Exception as e:
 			print(f"Error loading level: {e}")
 			return None
 	
+	def prefetch_level(self, slot):
+		"""
+		Load a level slot into the level cache on a background thread (the menu
+		prefetches slot 0 so 'Start Game' doesn't wait for the file)
+		
+		Args:
+			slot (int): Save slot number (0 to num_slots-1)
+		"""
+		save_path = self.get_level_load_path(slot)
+		thread = self.level_cache.prefetches.get(save_path)
+		if self.writer.is_pending(save_path) or (thread and thread.is_alive()):
+			return
+		try:
+			stat = save_path.stat()
+		except OSError:
+			return
+		if self.level_cache.failed.get(save_path) == (stat.st_mtime_ns, stat.st_size):
+			return  # unreadable, tried again once the file changes
+		if self.level_cache.get(save_path) is not None:
+			return
+		
+		def prefetch():
+			try:
+				self._read_level(save_path)
+			except Exception as e:
+				print(f"Error prefetching level: {e}")
+				self.level_cache.failed[save_path] = (stat.st_mtime_ns, stat.st_size)
+		
+		thread = threading.Thread(target=prefetch, daemon=True)
+		self.level_cache.prefetches[save_path] = thread
+		thread.start()
+	
+	def get_thumbnail(self, slot):
+		"""
+		Thumbnail of a level slot for the save lists, loaded in the background the first
+		time it is asked for
+		
+		Args:
+			slot (int): Save slot number
+		
+		Returns:
+			pygame.Surface or None: None if the slot is empty or the thumbnail isn't ready yet
+		"""
+		save_path = self.get_level_load_path(slot)
+		if self.writer.is_pending(save_path):
+			return None
+		try:
+			stat = save_path.stat()
+		except OSError:
+			return None
+		
+		if save_path.suffix == LEVEL_EXTENSION:
+			decode = lambda data: decode_level(data)[1]
+		else:
+			decode = lambda data: grid_from_json(json.loads(data)['level_data'])
+		return self.thumbnails.get(save_path, (stat.st_mtime_ns, stat.st_size),
+			self.level_directory, save_path.stem, save_path.read_bytes, decode)
+	
 	def save_game_state(self, slot, player_data, level_progress):
 		"""
 		Save game state (player progress, coins, etc.)
@@ -103,7 +352,7 @@ class SaveManager:
 			level_progress (dict): Level completion data
 		
 		Returns:
-			bool: True if save was successful
+			bool: True if the save was queued, see get_completed_saves for the result
 		"""
 		if not 0 <= slot < self.num_slots:
 			print(f"Invalid slot number: {slot}")
@@ -112,15 +361,11 @@ class SaveManager:
 		try:
 			save_data = {
 				'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-				'player_data': player_data,
-				'level_progress': level_progress
+				'player_data': copy.deepcopy(player_data),
+				'level_progress': copy.deepcopy(level_progress)
 			}
 			
-			save_path = self.get_gamestate_save_path(slot)
-			with open(save_path, 'w') as f:
-				json.dump(save_data, f, indent=4)
-			
-			print(f"Game state saved to slot {slot}")
+			self._write_save(self.get_gamestate_save_path(slot), save_data, 'gamestate', slot, lambda: save_data)
 			return True
 			
 		except Exception as e:
@@ -142,6 +387,7 @@ class SaveManager:
 			return None
 		
 		save_path = self.get_gamestate_save_path(slot)
+		self.writer.wait(save_path)
 		
 		if not save_path.exists():
 			print(f"No game state found in slot {slot}")
@@ -166,26 +412,20 @@ class SaveManager:
 			dict or None: Save slot info (name, timestamp, etc.)
 		"""
 		if save_type == 'level':
-			save_path = self.get_level_save_path(slot)
+			save_path = self.get_level_load_path(slot)
 		else:
 			save_path = self.get_gamestate_save_path(slot)
 		
-		if not save_path.exists():
+		entry = self._get_index_entry(save_path)
+		if entry is None:
 			return None
 		
-		try:
-			with open(save_path, 'r') as f:
-				data = json.load(f)
-			
-			return {
-				'slot': slot,
-				'timestamp': data.get('timestamp', 'Unknown'),
-				'level_name': data.get('level_name', f'Slot {slot}'),
-				'exists': True
-			}
-		except Exception as e:
-			print(f"Error reading slot info: {e}")
-			return None
+		return {
+			'slot': slot,
+			'timestamp': entry['timestamp'] or 'Unknown',
+			'level_name': entry['level_name'] or f'Slot {slot}',
+			'exists': True
+		}
 	
 	def delete_save(self, slot, save_type='level'):
 		"""
@@ -199,13 +439,24 @@ class SaveManager:
 			bool: True if deletion was successful
 		"""
 		if save_type == 'level':
-			save_path = self.get_level_save_path(slot)
+			save_paths = [self.get_level_save_path(slot), self.get_level_json_path(slot)]
 		else:
-			save_path = self.get_gamestate_save_path(slot)
+			save_paths = [self.get_gamestate_save_path(slot)]
 		
 		try:
-			if save_path.exists():
-				save_path.unlink()
+			deleted = False
+			for save_path in save_paths:
+				self.writer.cancel(save_path)
+				self.level_cache.discard(save_path)
+				if save_path.exists():
+					save_path.unlink()
+					self.slot_index.pop(self._get_index_key(save_path), None)
+					deleted = True
+			
+			if deleted:
+				self._write_index()
+				if save_type == 'level':
+					self.thumbnails.remove(self.level_directory, save_paths[0].stem)
 				print(f"Deleted save in slot {slot}")
 				return True
 			else:
@@ -225,77 +476,472 @@ class SaveManager:
 		Returns:
 			list: List of slot info dictionaries
 		"""
+		return self.get_slots_info(save_type, 0, self.num_slots)
+	
+	def get_slots_info(self, save_type='level', start=0, count=1):
+		"""
+		Get information about a range of save slots (a page of SaveSlotUI)
+		
+		Args:
+			save_type (str): 'level' or 'gamestate'
+			start (int): First slot
+			count (int): Number of slots
+		
+		Returns:
+			list: List of slot info dictionaries, empty slots included
+		"""
 		slots_info = []
-		for slot in range(self.num_slots):
+		for slot in range(start, min(start + count, self.num_slots)):
 			info = self.get_slot_info(slot, save_type)
-			if info is None:
-				info = {
-					'slot': slot,
-					'timestamp': None,
-					'level_name': f'Empty Slot {slot + 1}',
-					'exists': False
-				}
-			slots_info.append(info)
+			slots_info.append(info if info else self._get_empty_slot_info(slot))
 		return slots_info
 	
-	def _serialize_level_data(self, level_data):
+	def get_used_slots(self, save_type='level'):
+		"""Numbers of the slots holding a save"""
+		return [slot for slot in range(self.num_slots) if self.get_slot_info(slot, save_type)]
+	
+	def get_completed_saves(self):
 		"""
-		Convert level data to JSON-serializable format
-		
-		Args:
-			level_data (dict): Level grid data with tuples as keys
+		Saves of this manager that finished since the last call
 		
 		Returns:
-			dict: Serialized level data
+			list: (save_type, slot, success) tuples
 		"""
-		serialized = {}
+		completed = []
+		while self.completed:
+			completed.append(self.completed.popleft())
+		return completed
+	
+	def _write_save(self, save_path, save_data, save_type, slot, get_data):
+		"""Queue a save file, its index entry is kept without mtime until it is on disk"""
+		key = self._get_index_key(save_path)
+		self.slot_index[key] = {
+			'mtime': None,
+			'size': None,
+			'timestamp': save_data.get('timestamp'),
+			'level_name': save_data.get('level_name')
+		}
 		
-		for layer_name, layer_data in level_data.items():
-			serialized[layer_name] = {}
-			for pos, value in layer_data.items():
-				# Convert tuple keys to string
-				key = f"{pos[0]},{pos[1]}"
-				serialized[layer_name][key] = value
+		def on_done(success):
+			# runs on the writer thread
+			if success:
+				self._update_index(save_path, save_data)
+				print(f"Saved {save_type} to slot {slot}")
+			else:
+				self.slot_index.pop(key, None)
+			self.completed.append((save_type, slot, success))
 		
-		return serialized
+		self.writer.write(save_path, get_data, on_done)
+	
+	def _get_empty_slot_info(self, slot):
+		return {
+			'slot': slot,
+			'timestamp': None,
+			'level_name': f'Empty Slot {slot + 1}',
+			'exists': False
+		}
 	
-	def _deserialize_level_data(self, serialized_data):
+	def _read_level(self, save_path):
+		"""Read a level save (binary or the previous JSON format) and put it in the level cache"""
+		stat = save_path.stat()
+		if save_path.suffix == LEVEL_EXTENSION:
+			info, level_data = load_level_file(save_path)
+		else:
+			with open(save_path, 'r') as f:
+				level_data = grid_from_json(json.load(f)['level_data'])
+		self.level_cache.put(save_path, stat, level_data)
+		return level_data
+	
+	def _get_index_key(self, save_path):
+		return save_path.relative_to(self.save_directory).as_posix()
+	
+	def _load_index(self):
+		"""Read the slot index file, an empty index if it is missing or broken"""
+		try:
+			with open(self.index_path, 'r') as f:
+				return json.load(f)
+		except (OSError, ValueError):
+			return {}
+	
+	def _write_index(self):
+		slot_index = dict(self.slot_index)
+		self.writer.write(self.index_path, lambda: slot_index)
+	
+	def _update_index(self, save_path, save_data):
 		"""
-		Convert serialized level data back to original format
+		Store the metadata of a save file in the index
 		
 		Args:
-			serialized_data (dict): Serialized level data
+			save_path (Path): Save file that was just written
+			save_data (dict): Data of the file (only the name and timestamp are kept)
+		"""
+		stat = save_path.stat()
+		self.slot_index[self._get_index_key(save_path)] = {
+			'mtime': stat.st_mtime_ns,
+			'size': stat.st_size,
+			'timestamp': save_data.get('timestamp'),
+			'level_name': save_data.get('level_name')
+		}
+		self._write_index()
+	
+	def _get_index_entry(self, save_path):
+		"""
+		Metadata of a save file, the file is only parsed when it changed since it was indexed
+		(e.g. written by another SaveManager or by hand)
 		
 		Returns:
-			dict: Deserialized level data with tuple keys
+			dict or None: Index entry, None if there is no readable save
 		"""
-		deserialized = {}
+		key = self._get_index_key(save_path)
+		if self.writer.is_pending(save_path) and key in self.slot_index:
+			return self.slot_index[key]
+		
+		try:
+			stat = save_path.stat()
+		except OSError:
+			if self.slot_index.pop(key, None):
+				self._write_index()
+			return None
 		
-		for layer_name, layer_data in serialized_data.items():
-			deserialized[layer_name] = {}
-			for key_str, value in layer_data.items():
-				# Convert string keys back to tuples
-				x, y = map(int, key_str.split(','))
-				deserialized[layer_name][(x, y)] = value
+		entry = self.slot_index.get(key)
+		if entry is None or entry['mtime'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+			# stale entry, the index file may have been updated by another SaveManager
+			entry = self._load_index().get(key)
+			if entry is None or entry['mtime'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+				try:
+					if save_path.suffix == LEVEL_EXTENSION:
+						self._update_index(save_path, read_level_info(save_path))
+					else:
+						with open(save_path, 'r') as f:
+							self._update_index(save_path, json.load(f))
+				except Exception as e:
+					# remembered, so the file isn't parsed again until it changes
+					print(f"Error reading slot info: {e}")
+					self.slot_index[key] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'error': True}
+					self._write_index()
+			else:
+				self.slot_index[key] = entry
+			entry = self.slot_index[key]
+		return None if entry.get('error') else entry
+
+
+class SaveDatabase:
+	"""
+	Levels and game states in one SQLite file, a row per slot. The metadata columns
+	come before the data blob and are indexed, so listing slots never reads the
+	blobs. Every write is one transaction.
+	"""
+	
+	def __init__(self, path):
+		self.path = path
+		self.is_new = not path.exists()
+		self.local = threading.local()
+		
+		db = self.connect()
+		db.execute('PRAGMA journal_mode=WAL')  # the menu can read while the writer thread writes
+		with db:
+			for table in ('levels', 'gamestates'):
+				db.execute(f"""CREATE TABLE IF NOT EXISTS {table} (
+					slot INTEGER PRIMARY KEY,
+					name TEXT,
+					timestamp TEXT,
+					size INTEGER,
+					coins INTEGER,
+					data BLOB NOT NULL)""")
+				db.execute(f'CREATE INDEX IF NOT EXISTS {table}_name ON {table} (name)')
+				db.execute(f'CREATE INDEX IF NOT EXISTS {table}_timestamp ON {table} (timestamp)')
+	
+	def connect(self):
+		"""Connection of the calling thread, sqlite3 connections can't be shared between threads"""
+		db = getattr(self.local, 'connection', None)
+		if db is None:
+			db = self.local.connection = sqlite3.connect(self.path)
+		return db
+	
+	def put(self, table, slot, data, name=None, timestamp=None, coins=None):
+		with self.connect() as db:
+			db.execute(f'INSERT OR REPLACE INTO {table} (slot, name, timestamp, size, coins, data) VALUES (?, ?, ?, ?, ?, ?)',
+				(slot, name, timestamp, len(data), coins, data))
+		return True
+	
+	def get(self, table, slot):
+		"""Data blob of a slot, None if it is empty"""
+		row = self.connect().execute(f'SELECT data FROM {table} WHERE slot = ?', (slot,)).fetchone()
+		return row[0] if row else None
+	
+	def get_info(self, table, start, count):
+		"""Metadata of the used slots in a range, {slot: (name, timestamp, size, coins)}"""
+		rows = self.connect().execute(
+			f'SELECT slot, name, timestamp, size, coins FROM {table} WHERE slot >= ? AND slot < ?', (start, start + count))
+		return {row[0]: row[1:] for row in rows}
+	
+	def get_slots(self, table):
+		return [row[0] for row in self.connect().execute(f'SELECT slot FROM {table} ORDER BY slot')]
+	
+	def delete(self, table, slot):
+		with self.connect() as db:
+			return db.execute(f'DELETE FROM {table} WHERE slot = ?', (slot,)).rowcount > 0
+
+
+class DatabaseSaveManager(SaveManager):
+	"""
+	SaveManager keeping the slots in a SaveDatabase (save_data/saves.db) instead of
+	files. Writes still go through the background writer, the existing file saves
+	are copied in when the database is created.
+	"""
+	
+	database = None
+	
+	def __init__(self, num_slots=SAVE_DATABASE_SLOTS):
+		super().__init__(num_slots)
+		self.pending_info = {}  # (table, slot) -> slot info of queued writes
+		self.thumbnail_directory = self.save_directory / 'thumbnails'
+		if DatabaseSaveManager.database is None:
+			DatabaseSaveManager.database = SaveDatabase(self.save_directory / 'saves.db')
+			if self.database.is_new:
+				self._import_file_saves()
+	
+	def get_table(self, save_type):
+		return 'levels' if save_type == 'level' else 'gamestates'
+	
+	def save_level(self, slot, level_data, level_name="Custom Level"):
+		if not 0 <= slot < self.num_slots:
+			print(f"Invalid slot number: {slot}")
+			return False
+		
+		try:
+			snapshot = {layer_name: dict(layer_data) for layer_name, layer_data in level_data.items()}
+			save_data = {
+				'level_name': level_name,
+				'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+			}
+			coins = len(snapshot.get('coins', {}))
+			
+			def get_data():
+				data = encode_level(snapshot, save_data)
+				self.thumbnails.render(self.thumbnail_directory, f'levels_{slot}', data, snapshot)
+				return data
+			
+			self._write_row('level', slot, save_data, coins, get_data)
+			return True
+			
+		except Exception as e:
+			print(f"Error saving level: {e}")
+			return False
+	
+	def load_level(self, slot):
+		if not 0 <= slot < self.num_slots:
+			print(f"Invalid slot number: {slot}")
+			return None
+		
+		self.writer.wait(('levels', slot))
+		try:
+			data = self.database.get('levels', slot)
+			if data is None:
+				print(f"No save found in slot {slot}")
+				return None
+			info, level_data = decode_level(data)
+			return level_data
+		except Exception as e:
+			print(f"Error loading level: {e}")
+			return None
+	
+	def prefetch_level(self, slot):
+		pass  # a slot is one indexed row, read when it is loaded
+	
+	def get_thumbnail(self, slot):
+		if ('levels', slot) in self.pending_info:
+			return None
+		info = self.get_slot_info(slot)
+		if info is None:
+			return None
+		return self.thumbnails.get(('levels', slot), (info['timestamp'], info['size']),
+			self.thumbnail_directory, f'levels_{slot}', lambda: self.database.get('levels', slot))
+	
+	def save_game_state(self, slot, player_data, level_progress):
+		if not 0 <= slot < self.num_slots:
+			print(f"Invalid slot number: {slot}")
+			return False
+		
+		try:
+			save_data = {
+				'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+				'player_data': copy.deepcopy(player_data),
+				'level_progress': copy.deepcopy(level_progress)
+			}
+			coins = player_data.get('coins_collected')
+			self._write_row('gamestate', slot, save_data, coins, lambda: json.dumps(save_data).encode())
+			return True
+			
+		except Exception as e:
+			print(f"Error saving game state: {e}")
+			return False
+	
+	def load_game_state(self, slot):
+		if not 0 <= slot < self.num_slots:
+			print(f"Invalid slot number: {slot}")
+			return None
+		
+		self.writer.wait(('gamestates', slot))
+		try:
+			data = self.database.get('gamestates', slot)
+			if data is None:
+				print(f"No game state found in slot {slot}")
+				return None
+			return json.loads(data)
+		except Exception as e:
+			print(f"Error loading game state: {e}")
+			return None
+	
+	def get_slot_info(self, slot, save_type='level'):
+		info = self.get_slots_info(save_type, slot, 1)
+		return info[0] if info and info[0]['exists'] else None
+	
+	def get_slots_info(self, save_type='level', start=0, count=1):
+		table = self.get_table(save_type)
+		count = max(0, min(start + count, self.num_slots) - start)
+		try:
+			rows = self.database.get_info(table, start, count)
+		except sqlite3.Error as e:
+			print(f"Error reading slot info: {e}")
+			rows = {}
 		
-		return deserialized
+		slots_info = []
+		for slot in range(start, start + count):
+			pending = self.pending_info.get((table, slot))  # entries are removed by the writer thread
+			if pending:
+				slots_info.append(pending)
+			elif slot in rows:
+				name, timestamp, size, coins = rows[slot]
+				slots_info.append({
+					'slot': slot,
+					'timestamp': timestamp or 'Unknown',
+					'level_name': name or f'Slot {slot}',
+					'exists': True,
+					'size': size,
+					'coins': coins
+				})
+			else:
+				slots_info.append(self._get_empty_slot_info(slot))
+		return slots_info
+	
+	def get_used_slots(self, save_type='level'):
+		table = self.get_table(save_type)
+		pending = {slot for pending_table, slot in list(self.pending_info) if pending_table == table}
+		return sorted(set(self.database.get_slots(table)) | pending)
+	
+	def delete_save(self, slot, save_type='level'):
+		table = self.get_table(save_type)
+		try:
+			self.writer.cancel((table, slot))
+			self.pending_info.pop((table, slot), None)
+			if self.database.delete(table, slot):
+				if table == 'levels':
+					self.thumbnails.remove(self.thumbnail_directory, f'levels_{slot}')
+				print(f"Deleted save in slot {slot}")
+				return True
+			else:
+				print(f"No save to delete in slot {slot}")
+				return False
+		except Exception as e:
+			print(f"Error deleting save: {e}")
+			return False
+	
+	def _write_row(self, save_type, slot, save_data, coins, get_data):
+		"""Queue a save on the writer thread, get_data returns the blob"""
+		table = self.get_table(save_type)
+		key = (table, slot)
+		self.pending_info[key] = {
+			'slot': slot,
+			'timestamp': save_data['timestamp'],
+			'level_name': save_data.get('level_name') or f'Slot {slot}',
+			'exists': True,
+			'coins': coins
+		}
+		
+		def on_done(success):
+			# runs on the writer thread
+			self.pending_info.pop(key, None)
+			if success:
+				print(f"Saved {save_type} to slot {slot}")
+			self.completed.append((save_type, slot, success))
+		
+		self.writer.submit(key, lambda: self.database.put(
+			table, slot, get_data(), save_data.get('level_name'), save_data['timestamp'], coins), on_done)
+	
+	def _import_file_saves(self):
+		"""Copy the saves of the file backend into the new database"""
+		for slot in range(3):
+			info = SaveManager.get_slot_info(self, slot, 'level')
+			if info:
+				level_data = SaveManager.load_level(self, slot)
+				if level_data is None:
+					print(f"Skipping unreadable level in slot {slot}")
+				else:
+					self.database.put('levels', slot, encode_level(level_data, {'level_name': info['level_name'], 'timestamp': info['timestamp']}),
+						info['level_name'], info['timestamp'], len(level_data.get('coins', {})))
+			
+			if SaveManager.get_slot_info(self, slot, 'gamestate'):
+				game_state = SaveManager.load_game_state(self, slot)
+				if game_state is None:
+					print(f"Skipping unreadable game state in slot {slot}")
+					continue
+				self.database.put('gamestates', slot, json.dumps(game_state).encode(),
+					None, game_state.get('timestamp'), game_state['player_data'].get('coins_collected'))
+
+
+def create_save_manager():
+	"""SaveManager of the backend selected by SAVE_BACKEND"""
+	if SAVE_BACKEND == 'sqlite':
+		return DatabaseSaveManager()
+	return SaveManager(num_slots=3)
+
+
+class SaveNotice:
+	"""Short message in the bottom right corner when a background save has finished"""
+	
+	def __init__(self, save_manager, timers):
+		self.display_surface = get_surface()
+		self.save_manager = save_manager
+		self.font = pygame.font.Font(None, 32)
+		self.text = None
+		self.timer = Timer(2000, timers)
+	
+	def update(self):
+		for save_type, slot, success in self.save_manager.get_completed_saves():
+			self.text = f"Saved to slot {slot + 1}" if success else f"Saving slot {slot + 1} failed"
+			self.timer.activate()
+	
+	def draw(self):
+		if not self.timer.active or not self.text:
+			return
+		
+		text_surf = self.font.render(self.text, True, (255, 255, 255))
+		text_rect = text_surf.get_rect(bottomright=(self.display_surface.get_width() - 20, self.display_surface.get_height() - 20))
+		bg_rect = text_rect.inflate(20, 10)
+		bg_surf = pygame.Surface(bg_rect.size, pygame.SRCALPHA)
+		bg_surf.fill((0, 0, 0, 180))
+		self.display_surface.blit(bg_surf, bg_rect)
+		self.display_surface.blit(text_surf, text_rect)
 
 
 class SaveSlotUI:
 	"""UI for displaying and selecting save slots"""
 	
 	def __init__(self, save_manager, mode='save'):
-		self.display_surface = pygame.display.get_surface()
+		self.display_surface = get_surface()
 		self.save_manager = save_manager
 		self.mode = mode  # 'save' or 'load'
 		self.selected_slot = 0
+		self.first_slot = 0  # scroll position, the database backend has more slots than fit on screen
 		self.active = False
 		
 		# UI settings
 		self.slot_height = 100
 		self.slot_margin = 20
+		self.visible_slots = min(save_manager.num_slots, 4)
 		self.ui_width = 600
-		self.ui_height = (self.slot_height + self.slot_margin) * save_manager.num_slots + 100
+		self.ui_height = (self.slot_height + self.slot_margin) * self.visible_slots + 100
 		
 		# Colors
 		self.bg_color = (50, 50, 50, 200)
@@ -335,8 +981,16 @@ class SaveSlotUI:
 						return None
 					elif event.key == pygame.K_UP:
 						self.selected_slot = (self.selected_slot - 1) % self.save_manager.num_slots
+						self.scroll_to_selected()
 					elif event.key == pygame.K_DOWN:
 						self.selected_slot = (self.selected_slot + 1) % self.save_manager.num_slots
+						self.scroll_to_selected()
+					elif event.key == pygame.K_PAGEUP:
+						self.selected_slot = max(0, self.selected_slot - self.visible_slots)
+						self.scroll_to_selected()
+					elif event.key == pygame.K_PAGEDOWN:
+						self.selected_slot = min(self.save_manager.num_slots - 1, self.selected_slot + self.visible_slots)
+						self.scroll_to_selected()
 					elif event.key == pygame.K_RETURN:
 						return self.selected_slot
 					elif event.key == pygame.K_DELETE or event.key == pygame.K_d:
@@ -345,16 +999,26 @@ class SaveSlotUI:
 						if slot_info:
 							self.save_manager.delete_save(self.selected_slot, save_type)
 				
-				if event.type == pygame.MOUSEBUTTONDOWN:
+				if event.type == pygame.MOUSEWHEEL:
+					last_first = self.save_manager.num_slots - self.visible_slots
+					self.first_slot = max(0, min(self.first_slot - event.y, last_first))
+				
+				if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
 					result = self.handle_click(event.pos, save_type)
 					if result is not None:
 						return result
 			
 			self.draw(save_type)
-			pygame.display.update()
+			present()
 		
 		return None
 	
+	def scroll_to_selected(self):
+		if self.selected_slot < self.first_slot:
+			self.first_slot = self.selected_slot
+		elif self.selected_slot >= self.first_slot + self.visible_slots:
+			self.first_slot = self.selected_slot - self.visible_slots + 1
+	
 	def handle_click(self, mouse_pos, save_type):
 		"""Handle mouse clicks on save slots"""
 		window_width = self.display_surface.get_width()
@@ -365,12 +1029,12 @@ class SaveSlotUI:
 		
 		start_y = ui_y + 80
 		
-		for i in range(self.save_manager.num_slots):
+		for i in range(self.visible_slots):
 			slot_y = start_y + i * (self.slot_height + self.slot_margin)
 			slot_rect = pygame.Rect(ui_x + 50, slot_y, self.ui_width - 100, self.slot_height)
 			
 			if slot_rect.collidepoint(mouse_pos):
-				return i
+				return self.first_slot + i
 		
 		return None
 	
@@ -400,17 +1064,18 @@ class SaveSlotUI:
 		title_rect = title_surf.get_rect(center=(window_width // 2, ui_y + 40))
 		self.display_surface.blit(title_surf, title_rect)
 		
-		# Get slot info
-		slots_info = self.save_manager.get_all_slots_info(save_type)
+		# Get slot info of the visible slots
+		slots_info = self.save_manager.get_slots_info(save_type, self.first_slot, self.visible_slots)
 		
 		# Draw slots
 		start_y = ui_y + 80
 		
 		for i, slot_info in enumerate(slots_info):
 			slot_y = start_y + i * (self.slot_height + self.slot_margin)
+			slot = slot_info['slot']
 			
 			# Slot background
-			color = self.selected_color if i == self.selected_slot else self.slot_color
+			color = self.selected_color if slot == self.selected_slot else self.slot_color
 			if not slot_info['exists']:
 				color = self.empty_color
 			
@@ -420,7 +1085,7 @@ class SaveSlotUI:
 							(ui_x + 50, slot_y, self.ui_width - 100, self.slot_height), 2)
 			
 			# Slot number
-			slot_text = f"Slot {i + 1}"
+			slot_text = f"Slot {slot + 1}"
 			slot_surf = self.slot_font.render(slot_text, True, self.text_color)
 			self.display_surface.blit(slot_surf, (ui_x + 70, slot_y + 15))
 			
@@ -430,6 +1095,13 @@ class SaveSlotUI:
 				time_surf = self.info_font.render(slot_info['timestamp'], True, (180, 180, 180))
 				self.display_surface.blit(name_surf, (ui_x + 70, slot_y + 50))
 				self.display_surface.blit(time_surf, (ui_x + 70, slot_y + 75))
+				
+				# Thumbnail (None until the worker has it ready)
+				thumbnail = self.save_manager.get_thumbnail(slot) if save_type == 'level' else None
+				if thumbnail:
+					thumb_rect = thumbnail.get_rect(midright=(ui_x + self.ui_width - 65, slot_y + self.slot_height // 2))
+					self.display_surface.blit(thumbnail, thumb_rect)
+					pygame.draw.rect(self.display_surface, self.text_color, thumb_rect, 1)
 			else:
 				empty_surf = self.info_font.render("Empty", True, (150, 150, 150))
 				self.display_surface.blit(empty_surf, (ui_x + 70, slot_y + 50))
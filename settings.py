@@ -2,7 +2,44 @@
 TILE_SIZE = 64
 WINDOW_WIDTH = 1280
 WINDOW_HEIGHT = 720
+RENDER_BACKEND = 'software' # 'software' or 'sdl2' (pygame._sdl2.video renderer)
+RENDER_SCALE = 1 # levels are drawn at 1 / RENDER_SCALE of the window size and upscaled, can be overridden with 'render_scale' in game_settings.json
 ANIMATION_SPEED = 8
+TRIGGER_CELL_SIZE = 512
+
+# enemy navigation (in tiles)
+NAV_MAX_DROP = 10
+NAV_JUMP_DISTANCE = 3
+NAV_JUMP_HEIGHT = 2
+
+# level streaming: chunks of CHUNK_TILES x CHUNK_TILES tiles are built when they come within
+# CHUNK_LOAD_MARGIN pixels of the screen and removed beyond CHUNK_EVICT_MARGIN
+CHUNK_TILES = 16
+CHUNK_LOAD_MARGIN = 256
+CHUNK_EVICT_MARGIN = 1024
+
+# saves: 'files' (one file per slot, 3 slots) or 'sqlite' (save_data/saves.db, SAVE_DATABASE_SLOTS slots)
+SAVE_BACKEND = 'files'
+SAVE_DATABASE_SLOTS = 1000
+
+# autosave journal of the running level (ms between records, records before a snapshot)
+AUTOSAVE_INTERVAL = 1000
+AUTOSAVE_COMPACT_RECORDS = 300
+
+# save slot thumbnails (the whole level, one pixel per tile scaled to fit)
+THUMBNAIL_SIZE = (168, 64)
+
+# rewind (hold backspace): REWIND_SECONDS of history recorded REWIND_RATE times per second into
+# REWIND_BUFFER_SIZE bytes (the oldest frames are dropped sooner when it is full). Every
+# REWIND_KEYFRAME_INTERVAL frames all entities are written, the frames between hold what changed.
+# REWIND_MAX_ENTITIES enemies / pearls are rewound (more are not, which is printed once),
+# a frame holds REWIND_MAX_COINS coins collected (more are carried into the next frame)
+REWIND_SECONDS = 30
+REWIND_RATE = 60
+REWIND_BUFFER_SIZE = 4 * 1024 * 1024
+REWIND_KEYFRAME_INTERVAL = 30
+REWIND_MAX_ENTITIES = 256
+REWIND_MAX_COINS = 8
 
 # editor graphics 
 EDITOR_DATA = {
@@ -32,6 +69,73 @@ EDITOR_DATA = {
 	18: {'style': 'palm_bg', 'type': 'object', 'menu': 'palm bg', 'menu_surf': 'graphics/menu/right_bg.png', 'preview': 'graphics/preview/right_bg.png', 'graphics': 'graphics/terrain/palm/right_bg'},
 }
 
+# asset groups per game state, loaded by the AssetManager
+# leaves are (kind, path) with kind: 'image', 'folder' (list of frames),
+# 'folder dict' (frames by file name), 'subfolders' (frames per sub folder) or 'sound'
+ASSET_GROUPS = {
+	'level': {
+		'land': ('folder dict', 'graphics/terrain/land'),
+		'water bottom': ('image', 'graphics/terrain/water/water_bottom.png'),
+		'water top': ('folder', 'graphics/terrain/water/animation'),
+		'gold': ('folder', 'graphics/items/gold'),
+		'silver': ('folder', 'graphics/items/silver'),
+		'diamond': ('folder', 'graphics/items/diamond'),
+		'particle': ('folder', 'graphics/items/particle'),
+		'palms': ('subfolders', 'graphics/terrain/palm'),
+		'spikes': ('image', 'graphics/enemies/spikes/spikes.png'),
+		'tooth': ('subfolders', 'graphics/enemies/tooth'),
+		'shell': ('subfolders', 'graphics/enemies/shell_left'),
+		'pearl': ('image', 'graphics/enemies/pearl/pearl.png'),
+		'player': ('subfolders', 'graphics/player'),
+		'clouds': ('folder', 'graphics/clouds'),
+	},
+	'editor': {
+		'land': ('folder dict', 'graphics/terrain/land'),
+		'water bottom': ('image', 'graphics/terrain/water/water_bottom.png'),
+		'sky handle': ('image', 'graphics/cursors/handle.png'),
+		'cursor': ('image', 'graphics/cursors/mouse.png'),
+		'clouds': ('folder', 'graphics/clouds'),
+		'animations': {key: ('folder', value['graphics']) for key, value in EDITOR_DATA.items() if value['graphics']},
+		'previews': {key: ('image', value['preview']) for key, value in EDITOR_DATA.items() if value['preview']},
+		'menu': {key: ('image', value['menu_surf']) for key, value in EDITOR_DATA.items() if value['menu_surf']},
+	},
+}
+
+# texture atlases (python atlas.py), one sheet per animation family
+ATLAS_DIRECTORY = 'graphics/atlas'
+ATLAS_WIDTH = 1024
+ATLAS_SOURCES = {
+	'player': 'graphics/player',
+	'enemies': 'graphics/enemies',
+	'items': 'graphics/items',
+	'palms': 'graphics/terrain/palm',
+	'water': 'graphics/terrain/water',
+	'land': 'graphics/terrain/land',
+}
+
+# image formats: images under these paths are not RLE encoded, their masks are rebuilt
+# every frame (locking an RLE surface decodes it) or they are cut into subsurfaces
+NO_RLE_PATHS = ('graphics/player', 'graphics/enemies', ATLAS_DIRECTORY)
+
+# pre-decoded asset bundle, baked again whenever a source file changes
+ASSET_BUNDLE = 'assets.bundle'
+BUNDLE_SOUNDS = ['audio/coin.wav', 'audio/hit.wav', 'audio/jump.wav']
+
+# background music, streamed with pygame.mixer.music
+MUSIC_TRACKS = {
+	'editor': 'audio/Explorer.ogg',
+	'level': 'audio/SuperHero.ogg',
+}
+MUSIC_FADE = 500
+
+# sound effects
+MIXER_BUFFER = 512 # samples, can be overridden with 'audio_buffer' in game_settings.json
+SFX_CHANNELS = 16
+SFX_RESERVED = ['jump'] # sounds with a channel of their own
+SFX_VOICE_LIMITS = {'coin': 3, 'hit': 1} # voices of a sound playing at the same time
+SFX_FULL_RADIUS = 400 # distance from the screen center heard at full volume
+SFX_AUDIBLE_RADIUS = 1200 # sounds further away are not played
+
 NEIGHBOR_DIRECTIONS = {
 	'A': (0,-1),
 	'B': (1,-1),
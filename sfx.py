@@ -0,0 +1,73 @@
+import pygame
+from math import hypot
+
+from settings import *
+
+class SoundEffects:
+	"""
+	Sound effect dispatcher. Play requests are collected during a frame and
+	played once in update(), so a sound requested many times in one frame
+	(a cluster of coins, a hit on every overlapping frame) plays once.
+	Each sound has a limit of voices playing at the same time, and the
+	sounds in SFX_RESERVED get their own channel so they are never starved.
+
+	Sounds played with a world position are attenuated and panned relative to
+	the listener, the camera offset of the level, and dropped when they are
+	outside SFX_AUDIBLE_RADIUS.
+	"""
+	def __init__(self, sounds):
+		self.sounds = sounds
+		self.requests = {} # name -> (volume, pan) of the loudest request this frame
+		self.listener = None # camera offset (top left of the screen in the world)
+
+		self.enabled = pygame.mixer.get_init() is not None
+		self.reserved = {}
+		if self.enabled:
+			pygame.mixer.set_num_channels(SFX_CHANNELS)
+			pygame.mixer.set_reserved(len(SFX_RESERVED))
+			self.reserved = {name: pygame.mixer.Channel(index) for index, name in enumerate(SFX_RESERVED)}
+
+	def get_spatial(self, pos):
+		"""(volume, pan) of a world position, None if it is out of earshot"""
+		x = pos[0] - self.listener.x
+		y = pos[1] - self.listener.y
+		distance = hypot(x - WINDOW_WIDTH / 2, y - WINDOW_HEIGHT / 2)
+		if distance > SFX_AUDIBLE_RADIUS:
+			return None
+
+		volume = min(1, (SFX_AUDIBLE_RADIUS - distance) / (SFX_AUDIBLE_RADIUS - SFX_FULL_RADIUS))
+		pan = min(max(x / WINDOW_WIDTH, 0), 1)
+		return volume, pan
+
+	def play(self, name, pos = None):
+		"""Request a sound for this frame, pos is the world position of its source"""
+		spatial = self.get_spatial(pos) if pos is not None and self.listener is not None else (1, 0.5)
+		if spatial is None:
+			return
+		if name not in self.requests or spatial[0] > self.requests[name][0]:
+			self.requests[name] = spatial
+
+	def set_volume(self, volume):
+		for sound in self.sounds.values():
+			sound.set_volume(volume)
+
+	def update(self):
+		"""Play the requests of this frame"""
+		if not self.enabled:
+			self.requests.clear()
+			return
+
+		for name, (volume, pan) in self.requests.items():
+			sound = self.sounds[name]
+			if name in self.reserved:
+				channel = self.reserved[name]
+				channel.play(sound)
+			elif sound.get_num_channels() < SFX_VOICE_LIMITS.get(name, SFX_CHANNELS):
+				channel = sound.play()
+			else:
+				continue
+
+			if channel:
+				# the channel volume is multiplied with the volume of the sound
+				channel.set_volume(volume * min(1, 2 * (1 - pan)), volume * min(1, 2 * pan))
+		self.requests.clear()
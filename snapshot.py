@@ -0,0 +1,105 @@
+from array import array
+from itertools import chain
+from pygame.math import Vector2 as vector
+
+from sprites import Coin, Tooth, Shell, Pearl, Particle
+
+class LevelSnapshot:
+	"""
+	Mutable state of a running level, taken by Level.snapshot and put back in
+	place by Level.restore. The entities are kept as references plus flat
+	arrays of their state (positions, directions, frames, flags), so taking and
+	restoring a snapshot is a pass over the sprites of the loaded chunks.
+
+	Chunks that were built again or dropped since the snapshot can't be restored
+	in place: they are rebuilt from the level file with the snapshot's coins.
+	"""
+	def __init__(self, level):
+		player = level.player
+		self.player = (player.rect.topleft, player.hitbox.topleft, tuple(player.pos), tuple(player.direction), player.health, player.orientation)
+		self.counters = (level.coins_collected, level.play_time, level.level_complete)
+		self.collected_coins = set(level.collected_coins)
+		self.chunks = dict(level.loaded_chunks) # chunk key -> its sprite list, compared by identity on restore
+
+		sprites = list(chain.from_iterable(self.chunks.values()))
+
+		# teeth: pos.x, direction.x
+		self.teeth = [sprite for sprite in sprites if isinstance(sprite, Tooth)]
+		self.tooth_state = array('d', chain.from_iterable((tooth.pos.x, tooth.direction.x) for tooth in self.teeth))
+		self.tooth_alive = array('b', [tooth.alive() for tooth in self.teeth])
+
+		# shells: frame, has shot, cooldown running
+		self.shells = [sprite for sprite in sprites if isinstance(sprite, Shell)]
+		self.shell_frames = array('d', [shell.frame_index for shell in self.shells])
+		self.shell_flags = array('b', chain.from_iterable((shell.has_shot, shell.attack_cooldown.active) for shell in self.shells))
+
+		# pearls in flight: pos.x
+		self.pearls = [sprite for sprite in level.damage_sprites if isinstance(sprite, Pearl)]
+		self.pearl_state = array('d', [pearl.pos.x for pearl in self.pearls])
+
+	def restore(self, level):
+		# chunks built again since the snapshot are dropped and built below with the snapshot's coins
+		for key in [key for key, sprites in level.loaded_chunks.items() if self.chunks.get(key) is not sprites]:
+			for sprite in level.loaded_chunks.pop(key):
+				sprite.kill()
+		loaded = set(chain.from_iterable(level.loaded_chunks.values()))
+
+		# counters and coins
+		level.coins_collected, level.play_time, level.level_complete = self.counters
+		level.collected_coins = set(self.collected_coins)
+		for sprite in loaded:
+			if isinstance(sprite, Coin):
+				collected = sprite.rect.center in level.collected_coins
+				if collected and sprite.alive():
+					sprite.kill()
+				elif not collected and not sprite.alive():
+					sprite.add(level.all_sprites, level.coin_sprites)
+
+		# player
+		player = level.player
+		rect_pos, hitbox_pos, pos, direction, player.health, player.orientation = self.player
+		player.rect.topleft = rect_pos
+		player.hitbox.topleft = hitbox_pos
+		player.pos = vector(pos)
+		player.direction = vector(direction)
+		player.is_dead = False
+		player.invul_timer.deactivate()
+
+		# enemies
+		for index, tooth in enumerate(self.teeth):
+			if tooth not in loaded:
+				continue
+			tooth.pos.x, tooth.direction.x = self.tooth_state[index * 2:index * 2 + 2]
+			tooth.rect.x = round(tooth.pos.x)
+			tooth.orientation = 'left' if tooth.direction.x < 0 else 'right'
+			if self.tooth_alive[index] and not tooth.alive():
+				tooth.add(level.all_sprites, level.damage_sprites)
+
+		# shells see the player again through the trigger zones on the next update
+		level.triggers.inside = set()
+		for index, shell in enumerate(self.shells):
+			if shell not in loaded:
+				continue
+			shell.frame_index = self.shell_frames[index]
+			shell.has_shot = bool(self.shell_flags[index * 2])
+			shell.player_near = False
+			if self.shell_flags[index * 2 + 1]:
+				shell.attack_cooldown.activate()
+			else:
+				shell.attack_cooldown.deactivate()
+
+		# pearls: the ones shot since are removed, the ones in flight fly again (with a new timeout)
+		for sprite in level.damage_sprites.sprites():
+			if isinstance(sprite, Pearl) and sprite not in self.pearls:
+				sprite.timer.deactivate()
+				sprite.kill()
+		for index, pearl in enumerate(self.pearls):
+			pearl.pos.x = self.pearl_state[index]
+			pearl.rect.x = round(pearl.pos.x)
+			if not pearl.alive():
+				pearl.add(pearl.shell.pearl_groups)
+			pearl.timer.activate()
+
+		for sprite in level.all_sprites.sprites():
+			if isinstance(sprite, Particle):
+				sprite.kill()
@@ -3,6 +3,7 @@ from pygame.math import Vector2 as vector
 
 from settings import *
 from timer import Timer
+from collision import sweep
 
 from random import choice, randint
 
@@ -75,7 +76,7 @@ class Spikes(Generic):
 		self.mask = pygame.mask.from_surface(self.image)
 
 class Tooth(Generic):
-	def __init__(self, assets, pos, group, collision_sprites):
+	def __init__(self, assets, pos, group, nav_graph):
 
 		# general setup
 		self.animation_frames = assets
@@ -91,11 +92,17 @@ class Tooth(Generic):
 		self.orientation = 'left' if self.direction.x < 0 else 'right'
 		self.pos = vector(self.rect.topleft)
 		self.speed = 120
-		self.collision_sprites = collision_sprites
+		self.spawn_pos = pos # tile of the level file, the level streams teeth by it
+
+		# walk between the edges of the platform segment below
+		self.segment = nav_graph.find_segment(self.rect.midbottom)
+		self.nav_graph = nav_graph
 
 		# destory tooth at the beginning if he is not on a floor
-		if not [sprite for sprite in collision_sprites if sprite.rect.collidepoint(self.rect.midbottom + vector(0,10))]:
+		if self.segment is None:
 			self.kill()
+		else:
+			self.left_limit, self.right_limit, floor_y = nav_graph.get_bounds(self.segment)
 
 	def animate(self, dt):
 		current_animation = self.animation_frames[f'run_{self.orientation}']
@@ -105,26 +112,14 @@ class Tooth(Generic):
 		self.mask = pygame.mask.from_surface(self.image)
 
 	def move(self, dt):
-		right_gap = self.rect.bottomright + vector(1,1)
-		right_block = self.rect.midright + vector(1,0)
-		left_gap = self.rect.bottomleft + vector(-1,1)
-		left_block = self.rect.midleft + vector(-1,0)
-
-		if self.direction.x > 0: # moving right
-			# 1. no floor collision
-			floor_sprites = [sprite for sprite in self.collision_sprites if sprite.rect.collidepoint(right_gap)]
-			# 2. wall collision
-			wall_sprites = [sprite for sprite in self.collision_sprites if sprite.rect.collidepoint(right_block)]
-			if wall_sprites or not floor_sprites:
-				self.direction.x *= -1
-				self.orientation = 'left'
-
-		# exercise
-		if self.direction.x < 0:  
-			if not [sprite for sprite in self.collision_sprites if sprite.rect.collidepoint(left_gap)] \
-			or [sprite for sprite in self.collision_sprites if sprite.rect.collidepoint(left_block)]:
-				self.direction.x *= -1
-				self.orientation = 'right'
+		# the segment ends at gaps and walls
+		if self.direction.x > 0 and self.rect.right + 1 >= self.right_limit:
+			self.direction.x *= -1
+			self.orientation = 'left'
+
+		if self.direction.x < 0 and self.rect.left - 1 < self.left_limit:
+			self.direction.x *= -1
+			self.orientation = 'right'
 
 		self.pos.x += self.direction.x * self.speed * dt
 		self.rect.x = round(self.pos.x)
@@ -134,7 +129,7 @@ class Tooth(Generic):
 		self.move(dt)
 
 class Shell(Generic):
-	def __init__(self, orientation, assets, pos, group, pearl_surf, damage_sprites):
+	def __init__(self, orientation, assets, pos, group, pearl_surf, damage_sprites, collision_sprites, triggers, timers):
 		self.orientation = orientation
 		self.animation_frames = assets.copy()
 		if orientation == 'right':
@@ -149,8 +144,21 @@ class Shell(Generic):
 		# pearl 
 		self.pearl_surf = pearl_surf
 		self.has_shot = False
-		self.attack_cooldown = Timer(2000)
+		self.attack_cooldown = Timer(2000, timers)
+		self.timers = timers
 		self.damage_sprites = damage_sprites 
+		self.collision_sprites = collision_sprites
+		self.pearl_groups = [group[0], damage_sprites]
+
+		# player detection
+		self.player_near = False
+		self.triggers = triggers
+		self.trigger = triggers.add(self.rect.center, 500, self.player_entered, self.player_left)
+
+	def kill(self):
+		# removed with its level chunk
+		self.triggers.remove(self.trigger)
+		super().kill()
 
 	def animate(self, dt):
 		current_animation = self.animation_frames[self.status]
@@ -165,11 +173,17 @@ class Shell(Generic):
 		if int(self.frame_index) == 2 and self.status == 'attack' and not self.has_shot:
 			pearl_direction = vector(-1,0) if self.orientation == 'left' else vector(1,0)
 			offset = (pearl_direction * 50) + vector(0,-10) if self.orientation == 'left' else (pearl_direction * 20) + vector(0,-10)
-			Pearl(self.rect.center + offset, pearl_direction, self.pearl_surf, [self.groups()[0], self.damage_sprites])
+			Pearl(self.rect.center + offset, pearl_direction, self.pearl_surf, self.pearl_groups, self.collision_sprites, self, self.timers)
 			self.has_shot = True
 
+	def player_entered(self):
+		self.player_near = True
+
+	def player_left(self):
+		self.player_near = False
+
 	def get_status(self):
-		if vector(self.player.rect.center).distance_to(vector(self.rect.center)) < 500 and not self.attack_cooldown.active:
+		if self.player_near and not self.attack_cooldown.active:
 			self.status = 'attack'
 		else:
 			self.status = 'idle'
@@ -177,34 +191,38 @@ class Shell(Generic):
 	def update(self, dt):
 		self.get_status()
 		self.animate(dt)
-		self.attack_cooldown.update()
 
 class Pearl(Generic):
-	def __init__(self, pos, direction, surf, group):
+	def __init__(self, pos, direction, surf, group, collision_sprites, shell, timers):
 		super().__init__(pos, surf, group)
 		self.mask = pygame.mask.from_surface(self.image)
 
+		# collision 
+		self.collision_sprites = collision_sprites
+		self.shell = shell
+
 		# movement 
 		self.pos = vector(self.rect.topleft)
 		self.direction = direction
 		self.speed = 150
 
 		# self destruct 
-		self.timer = Timer(6000)
+		self.timer = Timer(6000, timers, self.kill)
 		self.timer.activate()
 
 	def update(self, dt):
 		# movement 
-		self.pos.x += self.direction.x * self.speed * dt
-		self.rect.x = round(self.pos.x)
-
-		# timer 
-		self.timer.update()
-		if not self.timer.active:
+		delta = self.direction.x * self.speed * dt
+		time, obstacle = sweep(self.rect, (delta, 0), self.collision_sprites, self.shell)
+		if obstacle:
+			self.timer.deactivate()
 			self.kill()
+			return
+		self.pos.x += delta
+		self.rect.x = round(self.pos.x)
 
 class Player(Generic):
-	def __init__(self, pos, assets, group, collision_sprites, jump_sound):
+	def __init__(self, pos, assets, group, collision_sprites, sfx, timers):
 		
 		# animation
 		self.animation_frames = assets
@@ -227,15 +245,15 @@ class Player(Generic):
 		self.hitbox = self.rect.inflate(-50,0)
 
 		# timer 
-		self.invul_timer = Timer(200)
+		self.invul_timer = Timer(200, timers)
+		self.frame_masks = {} # animation frame -> (mask, white silhouette drawn while invulnerable)
 
 		# health
 		self.health = 3
 		self.is_dead = False
 
 		# sound
-		self.jump_sound = jump_sound
-		self.jump_sound.set_volume(0.2)
+		self.sfx = sfx
 
 	def damage(self):
 		if not self.invul_timer.active and not self.is_dead:
@@ -245,6 +263,12 @@ class Player(Generic):
 			if self.health <= 0:
 				self.is_dead = True
 
+	def teleport(self, topleft):
+		"""Put the player somewhere without sweeping (respawn, loaded saves), rect, hitbox and pos move together"""
+		self.rect.topleft = topleft
+		self.hitbox.center = self.rect.center
+		self.pos = vector(self.rect.center)
+
 	def get_status(self):
 		if self.direction.y < 0:
 			self.status = 'jump'
@@ -257,13 +281,14 @@ class Player(Generic):
 		current_animation = self.animation_frames[f'{self.status}_{self.orientation}']
 		self.frame_index += ANIMATION_SPEED * dt
 		self.frame_index = 0 if self.frame_index >= len(current_animation) else self.frame_index
-		self.image = current_animation[int(self.frame_index)]
-		self.mask = pygame.mask.from_surface(self.image)
-
-		if self.invul_timer.active:
-			surf = self.mask.to_surface()
+		frame = current_animation[int(self.frame_index)]
+		if frame not in self.frame_masks:
+			mask = pygame.mask.from_surface(frame)
+			surf = mask.to_surface()
 			surf.set_colorkey('black')
-			self.image = surf
+			self.frame_masks[frame] = (mask, surf)
+		self.mask, invul_surf = self.frame_masks[frame]
+		self.image = invul_surf if self.invul_timer.active else frame
 
 	def input(self):
 		keys = pygame.key.get_pressed()
@@ -278,20 +303,28 @@ class Player(Generic):
 
 		if keys[pygame.K_SPACE] and self.on_floor:
 			self.direction.y = -2
-			self.jump_sound.play()
+			self.sfx.play('jump')
 
 	def move(self, dt):
+		# each axis is swept against the collision sprites first,
+		# so a long frame cannot carry the hitbox through a tile
 		
 		# horizontal movement
-		self.pos.x += self.direction.x * self.speed * dt
+		delta = self.direction.x * self.speed * dt
+		time, obstacle = sweep(self.hitbox, (delta, 0), self.collision_sprites)
+		self.pos.x += delta * time
 		self.hitbox.centerx = round(self.pos.x)
 		self.rect.centerx = self.hitbox.centerx
 		self.collision('horizontal')
 
 		# vertical movement
-		self.pos.y += self.direction.y * self.speed * dt
+		delta = self.direction.y * self.speed * dt
+		time, obstacle = sweep(self.hitbox, (0, delta), self.collision_sprites)
+		self.pos.y += delta * time
 		self.hitbox.centery = round(self.pos.y)
 		self.rect.centery = self.hitbox.centery
+		if obstacle:
+			self.direction.y = 0
 		self.collision('vertical')
 
 	def apply_gravity(self, dt):
@@ -321,7 +354,6 @@ class Player(Generic):
 		self.apply_gravity(dt)
 		self.move(dt)
 		self.check_on_floor()
-		self.invul_timer.update()
 
 		self.get_status()
 		self.animate(dt)
@@ -1,11 +1,18 @@
 import pygame
 from os import walk
+from re import split
+
+from render import get_surface, mark_drawn
+
+def natural_key(name):
+	"""Sort key that orders frame files numerically ('2.png' before '10.png')"""
+	return [int(part) if part.isdigit() else part for part in split(r'(\d+)', name)]
 
 def import_folder(path):
 	surface_list = []
 
 	for folder_name, sub_folders, img_files in walk(path):
-		for image_name in img_files:
+		for image_name in sorted(img_files, key = natural_key):
 			full_path = path + '/' + image_name
 			image_surf = pygame.image.load(full_path).convert_alpha()
 			surface_list.append(image_surf)
@@ -15,7 +22,7 @@ def import_folder_dict(path):
 	surface_dict = {}
 
 	for folder_name, sub_folders, img_files in walk(path):
-		for image_name in img_files:
+		for image_name in sorted(img_files, key = natural_key):
 			full_path = path + '/' + image_name
 			image_surf = pygame.image.load(full_path).convert_alpha()
 			surface_dict[image_name.split('.')[0]] = image_surf
@@ -26,7 +33,7 @@ def import_folder_dict(path):
 class Transition:
 	"""Handles transitions between editor and game modes"""
 	def __init__(self, toggle_callback):
-		self.display_surface = pygame.display.get_surface()
+		self.display_surface = get_surface()
 		self.toggle_callback = toggle_callback
 		self.active = False
 		self.border_width = 0
@@ -47,4 +54,4 @@ class Transition:
 				self.border_width = 0
 				self.direction = 1
 			
-			pygame.draw.circle(self.display_surface, 'black', self.center, self.radius, int(self.border_width))
+			mark_drawn(pygame.draw.circle(self.display_surface, 'black', self.center, self.radius, int(self.border_width)))
@@ -0,0 +1,160 @@
+import io
+import zlib
+import threading
+from collections import OrderedDict
+
+import pygame
+
+from settings import *
+from level_format import decode_level
+
+# layers drawn into the thumbnails, back to front
+LAYER_COLORS = (
+	('bg palms', (96, 128, 80)),
+	('water', tuple(pygame.Color(SEA_COLOR))[:3]),
+	('terrain', (108, 78, 62)),
+	('fg objects', (64, 112, 56)),
+	('enemies', (196, 52, 52)),
+	('coins', (248, 208, 40)),
+)
+
+def render_thumbnail(grid, size=THUMBNAIL_SIZE):
+	"""
+	Draw a level grid offscreen, one pixel per tile scaled to fit size
+
+	Args:
+		grid (dict): layer name -> {(x, y): tile value}
+		size (tuple): Width and height of the thumbnail
+
+	Returns:
+		pygame.Surface: The thumbnail, the level is centered on the sky color
+	"""
+	layers = [(color, {(x // TILE_SIZE, y // TILE_SIZE) for x, y in grid.get(name, ())}) for name, color in LAYER_COLORS]
+	cells = set().union(*(layer_cells for color, layer_cells in layers))
+
+	thumbnail = pygame.Surface(size)
+	thumbnail.fill(SKY_COLOR)
+	if not cells:
+		return thumbnail
+
+	left = min(x for x, y in cells)
+	top = min(y for x, y in cells)
+	cols = max(x for x, y in cells) - left + 1
+	rows = max(y for x, y in cells) - top + 1
+
+	# one RGB pixel per tile, written into a buffer instead of a set_at call per tile
+	pixels = bytearray(bytes(tuple(pygame.Color(SKY_COLOR))[:3]) * (cols * rows))
+	for color, layer_cells in layers:
+		color = bytes(color)
+		for x, y in layer_cells:
+			index = ((y - top) * cols + x - left) * 3
+			pixels[index:index + 3] = color
+	image = pygame.image.frombuffer(pixels, (cols, rows), 'RGB')
+
+	scale = min(size[0] / cols, size[1] / rows)
+	scaled_size = (max(1, round(cols * scale)), max(1, round(rows * scale)))
+	if scale >= 1:
+		image = pygame.transform.scale(image, scaled_size) # keep the tiles sharp
+	else:
+		image = pygame.transform.smoothscale(image, scaled_size)
+	thumbnail.blit(image, image.get_rect(center=thumbnail.get_rect().center))
+	return thumbnail
+
+def get_png(surface):
+	buffer = io.BytesIO()
+	pygame.image.save(surface, buffer, 'thumbnail.png')
+	return buffer.getvalue()
+
+class Thumbnails:
+	"""
+	Thumbnails of the level saves. They are rendered on a worker thread (a
+	SaveWriter, so saving never waits for them) and stored as PNG files next to
+	the saves, named after the crc32 of the level data: a thumbnail is only
+	rendered again when its level changed.
+
+	The save lists ask for the thumbnails of their visible rows, get() never
+	blocks and returns None until the worker has loaded (or rendered) the image.
+	"""
+
+	def __init__(self, worker, max_thumbnails=64):
+		self.worker = worker
+		self.max_thumbnails = max_thumbnails
+		self.surfaces = OrderedDict()  # key -> (stamp, surface or None if it couldn't be made), least recently used first
+		self.lock = threading.Lock()
+
+	def get_path(self, directory, name, data):
+		return directory / f'{name}_{zlib.crc32(data):08x}.png'
+
+	def get(self, key, stamp, directory, name, read_data, decode=lambda data: decode_level(data)[1]):
+		"""
+		Thumbnail of a save, queued for loading the first time it is asked for
+
+		Args:
+			key: Hashable name of the save (e.g. its path)
+			stamp: Anything that changes when the save is written again (e.g. mtime and size)
+			directory (Path): Folder of the thumbnail files
+			name (str): File name prefix of the save's thumbnails
+			read_data (callable): Returns the saved level data (bytes), called on the worker
+			decode (callable): Level grid of the data, only called if the thumbnail must be rendered
+
+		Returns:
+			pygame.Surface or None: None while the thumbnail isn't ready
+		"""
+		with self.lock:
+			entry = self.surfaces.get(key)
+			if entry and entry[0] == stamp:
+				self.surfaces.move_to_end(key)
+				return entry[1]
+
+		if not self.worker.is_pending(key):
+			self.worker.submit(key, lambda: self.load(key, stamp, directory, name, read_data, decode))
+		return None
+
+	def load(self, key, stamp, directory, name, read_data, decode):
+		"""Read the thumbnail file of a save, rendered first if the level changed (runs on the worker)"""
+		try:
+			data = read_data()
+			path = self.get_path(directory, name, data)
+			if path.exists():
+				surface = pygame.image.load(path)
+			else:
+				surface = self.create(directory, name, data, decode(data))
+			surface = surface.convert() # thumbnails are opaque, blitted every frame of the save lists
+		except Exception as e:
+			print(f"Error loading thumbnail {name}: {e}")
+			surface = None
+
+		with self.lock:
+			self.surfaces.pop(key, None)
+			self.surfaces[key] = (stamp, surface)
+			while len(self.surfaces) > self.max_thumbnails:
+				self.surfaces.popitem(last=False)
+		return surface is not None
+
+	def render(self, directory, name, data, grid):
+		"""
+		Queue the thumbnail of a level that is being saved
+
+		Args:
+			directory (Path): Folder of the thumbnail files
+			name (str): File name prefix of the save's thumbnails
+			data (bytes): Saved level data, names the thumbnail
+			grid (dict): Level grid the data was encoded from (not modified afterwards)
+		"""
+		path = self.get_path(directory, name, data)
+		self.worker.submit(path, lambda: self.create(directory, name, data, grid) is not None)
+
+	def create(self, directory, name, data, grid):
+		"""Render and write a thumbnail, the older thumbnails of the save are deleted"""
+		path = self.get_path(directory, name, data)
+		surface = render_thumbnail(grid)
+		directory.mkdir(parents=True, exist_ok=True)
+		if self.worker.write_file(path, lambda: get_png(surface)):
+			self.remove(directory, name, keep=path)
+		return surface
+
+	def remove(self, directory, name, keep=None):
+		"""Delete the thumbnail files of a save"""
+		for path in directory.glob(f'{name}_*.png'):
+			if path != keep:
+				path.unlink(missing_ok=True)
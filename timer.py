@@ -1,20 +1,111 @@
 import pygame
 
 class Timer:
-	def __init__(self, duration):
+	def __init__(self, duration, wheel = None, func = None, repeat = False):
 		self.duration = duration
 		self.active = False
 		self.start_time = 0
 
+		# scheduled timers expire through the wheel instead of polling
+		self.wheel = wheel
+		self.func = func
+		self.repeat = repeat
+		self.entry = None
+
 	def activate(self):
 		self.active = True
-		self.start_time = pygame.time.get_ticks()
+		if self.wheel:
+			self.wheel.cancel(self.entry)
+			self.entry = self.wheel.schedule(self.duration, self.expire)
+		else:
+			self.start_time = pygame.time.get_ticks()
 
 	def deactivate(self):
 		self.active = False
 		self.start_time = 0
+		if self.wheel:
+			self.wheel.cancel(self.entry)
+			self.entry = None
+
+	def expire(self):
+		self.entry = None
+		self.deactivate()
+		if self.repeat:
+			self.activate()
+		if self.func:
+			self.func()
 
 	def update(self):
+		if self.wheel:
+			return
+
 		current_time = pygame.time.get_ticks()
-		if current_time - self.start_time >= self.duration:
-			self.deactivate()
\ No newline at end of file
+		if self.active and current_time - self.start_time >= self.duration:
+			self.deactivate()
+			if self.func:
+				self.func()
+
+class TimerWheel:
+	"""Hierarchical timer wheel, advanced once per frame for the state that owns it"""
+	def __init__(self, resolution = 10, slots = 64, levels = 3):
+		self.resolution = resolution # ms per tick
+		self.slots = slots
+		self.wheels = [[[] for slot in range(slots)] for level in range(levels)]
+
+		self.tick = 0
+		self.remainder = 0
+
+	def schedule(self, delay, callback):
+		"""Call callback after delay ms, returns an entry that can be cancelled"""
+		ticks = max(1, -(-int(delay) // self.resolution))
+		entry = [self.tick + ticks, callback]
+		self.insert(entry)
+		return entry
+
+	def cancel(self, entry):
+		if entry:
+			entry[1] = None
+
+	def insert(self, entry):
+		delta = entry[0] - self.tick
+		level = 0
+		span = self.slots
+		while delta >= span and level < len(self.wheels) - 1:
+			level += 1
+			span *= self.slots
+		slot = (entry[0] // self.slots ** level) % self.slots
+		self.wheels[level][slot].append(entry)
+
+	def cascade(self):
+		# move the entries of the higher wheels down once the lower wheel wrapped around
+		span = 1
+		for level in range(1, len(self.wheels)):
+			span *= self.slots
+			if self.tick % span:
+				break
+			bucket = self.wheels[level][(self.tick // span) % self.slots]
+			self.wheels[level][(self.tick // span) % self.slots] = []
+			for entry in bucket:
+				if entry[1]:
+					self.insert(entry)
+
+	def update(self, dt):
+		self.remainder += dt * 1000
+		while self.remainder >= self.resolution:
+			self.remainder -= self.resolution
+			self.tick += 1
+			self.cascade()
+
+			bucket = self.wheels[0][self.tick % self.slots]
+			if not bucket:
+				continue
+			self.wheels[0][self.tick % self.slots] = []
+			for entry in bucket:
+				if not entry[1]:
+					continue
+				if entry[0] > self.tick:
+					self.insert(entry)
+				else:
+					callback = entry[1]
+					entry[1] = None
+					callback()
@@ -0,0 +1,53 @@
+from settings import *
+
+class TriggerZone:
+	def __init__(self, center, radius, on_enter, on_exit):
+		self.center = center
+		self.radius_squared = radius * radius
+		self.on_enter = on_enter
+		self.on_exit = on_exit
+
+	def contains(self, pos):
+		dx = pos[0] - self.center[0]
+		dy = pos[1] - self.center[1]
+		return dx * dx + dy * dy < self.radius_squared
+
+class TriggerZones:
+	"""Spatial hash of circular activation zones, notifies their owners when a point enters or leaves them"""
+	def __init__(self, cell_size = TRIGGER_CELL_SIZE):
+		self.cell_size = cell_size
+		self.cells = {}
+		self.inside = set()
+
+	def get_cell(self, pos):
+		return int(pos[0] // self.cell_size), int(pos[1] // self.cell_size)
+
+	def add(self, center, radius, on_enter, on_exit):
+		"""Register a zone, on_enter/on_exit are called without arguments"""
+		zone = TriggerZone(center, radius, on_enter, on_exit)
+		left, top = self.get_cell((center[0] - radius, center[1] - radius))
+		right, bottom = self.get_cell((center[0] + radius, center[1] + radius))
+		for col in range(left, right + 1):
+			for row in range(top, bottom + 1):
+				self.cells.setdefault((col, row), []).append(zone)
+		return zone
+
+	def remove(self, zone):
+		for cell, zones in list(self.cells.items()):
+			if zone in zones:
+				zones.remove(zone)
+				if not zones:
+					del self.cells[cell]
+		self.inside.discard(zone)
+
+	def update(self, pos):
+		"""Check the point against the zones of its cell only and fire the enter/exit callbacks"""
+		current = {zone for zone in self.cells.get(self.get_cell(pos), ()) if zone.contains(pos)}
+		if current == self.inside:
+			return
+
+		for zone in self.inside - current:
+			zone.on_exit()
+		for zone in current - self.inside:
+			zone.on_enter()
+		self.inside = current